@@ -0,0 +1,14 @@
+from app.config.settings import settings
+from .engine import AlertEngine, PriceAlert
+from .store import AlertStore
+
+# Общий движок алертов процесса; запускается в lifespan приложения,
+# алерты хранятся в файле журнала сделок
+alert_engine = AlertEngine(AlertStore(settings.journal_path), settings.alert_sync_interval)
+
+__all__ = [
+    "AlertEngine",
+    "AlertStore",
+    "PriceAlert",
+    "alert_engine",
+]
@@ -0,0 +1,294 @@
+import asyncio
+import itertools
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+
+from app.alerts.store import AlertStore
+from app.config.settings import settings
+from app.exchange.factory import ExchangeFactory
+from app.exchange.market_data import market_data, Ticker
+from app.models.trade import TradeSignal
+from app.utils.coordination import coordinator
+from app.utils.logger import logger
+from app.utils.shutdown import shutdown_coordinator
+from app.utils.triggers import TriggerIndex
+
+SignalSink = Callable[[list[TradeSignal]], Awaitable[dict]]
+
+
+class PriceAlert:
+    """
+    Уровень "SYMBOL Crossing Up/Down PRICE", ожидающий пересечения.
+
+    crossing — сторона пересечения (1 — Up, -1 — Down). Если при
+    постановке цена уже за уровнем, алерт сначала ждёт возврата цены
+    (direction = -crossing) и только потом — самого пересечения.
+    """
+
+    __slots__ = (
+        "alert_id", "signal", "exchange", "market_symbol",
+        "crossing", "direction", "trigger", "seq", "created_at",
+    )
+
+    def __init__(
+        self,
+        alert_id: str,
+        signal: TradeSignal,
+        exchange: str,
+        market_symbol: str,
+        seq: int,
+        created_at: Optional[float] = None,
+    ):
+        self.alert_id = alert_id
+        self.signal = signal
+        self.exchange = exchange
+        self.market_symbol = market_symbol
+        self.crossing = 1 if signal.direction == "LONG" else -1
+        self.direction = 0                  # 0 — ещё не взведён (нет цены)
+        self.trigger = signal.entry_price
+        self.seq = seq                      # номер в индексах этого процесса
+        self.created_at = created_at or time.time()
+
+    @property
+    def armed(self) -> bool:
+        return self.direction == self.crossing
+
+    def to_dict(self) -> dict:
+        return {
+            "alert_id": self.alert_id,
+            "symbol": self.signal.symbol,
+            "exchange": self.exchange,
+            "crossing": "Up" if self.crossing > 0 else "Down",
+            "price": self.trigger,
+            "size": self.signal.size,
+            "leverage": self.signal.leverage,
+            "armed": self.armed,
+            "created_at": self.created_at,
+        }
+
+
+class AlertEngine:
+    """
+    Локальные ценовые алерты вместо вебхуков TradingView.
+
+    Уровни хранятся по (биржа, символ, направление) в TriggerIndex;
+    тик из MarketDataCache проверяет только границу сработавших
+    уровней (bisect), без перебора алертов символа. Сработавшие
+    алерты одного тика уходят одной пачкой TradeSignal в тот же путь
+    исполнения, что и вебхук (дедупликация, дедлайн, риск).
+
+    Алерт одноразовый: после срабатывания он снимается.
+
+    Алерты хранятся в AlertStore (общая SQLite таблица): ставит и снимает
+    их любой воркер, а в индексах держит и исполняет только лидер. Он
+    перечитывает таблицу раз в alert_sync_interval и подхватывает алерты,
+    поставленные или снятые другими воркерами; после рестарта алерты
+    загружаются заново.
+    """
+
+    def __init__(self, store: AlertStore, sync_interval: float):
+        self.store = store
+        self.sync_interval = sync_interval
+        # алерты в индексах (только у лидера)
+        self._alerts: dict[str, PriceAlert] = {}
+        self._indexes: dict[tuple[str, str, int], TriggerIndex[PriceAlert]] = defaultdict(TriggerIndex)
+        # алерты символа, для которого ещё не было цены
+        self._unarmed: dict[tuple[str, str], list[PriceAlert]] = defaultdict(list)
+        self._sink: Optional[SignalSink] = None
+        self._tasks: set[asyncio.Task] = set()
+        self._sync_task: Optional[asyncio.Task] = None
+        self._seq = itertools.count(1)
+        self.fired_total = 0
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------
+
+    def start(self, sink: SignalSink) -> None:
+        """
+        sink(signals) исполняет сработавшие алерты (WebhookHandler.process_trade_signals).
+
+        Вызывается до coordinator.start(): алерты загружает воркер, ставший лидером.
+        """
+        if self._sink is None:
+            self.store.start()
+            market_data.subscribe(self.on_tick)
+            coordinator.on_leadership(self._lead)
+        self._sink = sink
+
+    async def stop(self) -> None:
+        if self._sync_task:
+            self._sync_task.cancel()
+            self._sync_task = None
+        for task in list(self._tasks):
+            task.cancel()
+        self._tasks.clear()
+        self.store.close()
+
+    async def _lead(self) -> None:
+        """Воркер стал лидером: алерты из таблицы — в индексы"""
+        self.sync()
+        if self._alerts:
+            logger.info(f"🔔 Загружено алертов: {len(self._alerts)}")
+        if self.sync_interval and self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def _sync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning(f"🔔 Синхронизация алертов не удалась: {e}")
+
+    def sync(self) -> None:
+        """Приводит индексы к таблице: новые алерты взводятся, снятые — убираются"""
+        rows = {row["alert_id"]: row for row in self.store.load()}
+        for alert_id in [alert_id for alert_id in self._alerts if alert_id not in rows]:
+            self._untrack(alert_id)
+        for alert_id, row in rows.items():
+            if alert_id not in self._alerts:
+                self._track(
+                    alert_id, TradeSignal.from_dict(row["signal"]), row["exchange"], row["created_at"]
+                )
+
+    # ------------------------------------------------------------------
+    # ALERTS
+    # ------------------------------------------------------------------
+
+    def add(self, signal: TradeSignal) -> PriceAlert:
+        # цену смотрим на бирже по умолчанию; биржа сигнала не подставляется —
+        # без неё сработавший алерт пройдёт маршрутизацию
+        exchange = signal.exchange or settings.exchange
+        alert_id = f"{exchange}-{signal.symbol}-{uuid.uuid4().hex[:8]}"
+        created_at = time.time()
+        self.store.save(alert_id, exchange, signal.to_dict(), created_at)
+
+        if coordinator.is_leader:
+            alert = self._track(alert_id, signal, exchange, created_at)
+        else:
+            # в индексы его возьмёт лидер при синхронизации
+            market_symbol = ExchangeFactory.get_symbol_format(exchange, signal.symbol, settings.contract_type)
+            alert = PriceAlert(alert_id, signal, exchange, market_symbol, 0, created_at)
+
+        logger.info(
+            f"🔔 Алерт {alert.alert_id}: {signal.symbol} Crossing "
+            f"{'Up' if alert.crossing > 0 else 'Down'} {signal.entry_price} ({exchange})"
+        )
+        return alert
+
+    def _track(self, alert_id: str, signal: TradeSignal, exchange: str, created_at: float) -> PriceAlert:
+        market_symbol = ExchangeFactory.get_symbol_format(exchange, signal.symbol, settings.contract_type)
+        alert = PriceAlert(alert_id, signal, exchange, market_symbol, next(self._seq), created_at)
+        self._alerts[alert_id] = alert
+
+        ticker = market_data.get(exchange, market_symbol)
+        if ticker is not None and ticker.last:
+            self._arm(alert, ticker.last)
+        else:
+            self._unarmed[(exchange, market_symbol)].append(alert)
+        market_data.watch(exchange, market_symbol)
+        return alert
+
+    def remove(self, alert_id: str) -> bool:
+        removed = self.store.delete(alert_id)
+        return self._untrack(alert_id) or removed
+
+    def _untrack(self, alert_id: str) -> bool:
+        alert = self._alerts.pop(alert_id, None)
+        if alert is None:
+            return False
+        if alert.direction:
+            self._indexes[(alert.exchange, alert.market_symbol, alert.direction)].remove(alert)
+        else:
+            unarmed = self._unarmed.get((alert.exchange, alert.market_symbol), [])
+            if alert in unarmed:
+                unarmed.remove(alert)
+        return True
+
+    def snapshot(self) -> list[dict]:
+        """Алерты всех воркеров из таблицы; armed известен только лидеру"""
+        alerts = []
+        for row in self.store.load():
+            alert = self._alerts.get(row["alert_id"])
+            if alert is None:
+                signal = TradeSignal.from_dict(row["signal"])
+                market_symbol = ExchangeFactory.get_symbol_format(
+                    row["exchange"], signal.symbol, settings.contract_type
+                )
+                alert = PriceAlert(row["alert_id"], signal, row["exchange"], market_symbol, 0, row["created_at"])
+            alerts.append(alert.to_dict())
+        return alerts
+
+    def _arm(self, alert: PriceAlert, price: float) -> None:
+        # цена уже за уровнем — сначала ждём её возврата
+        beyond = (price - alert.trigger) * alert.crossing >= 0
+        alert.direction = -alert.crossing if beyond else alert.crossing
+        self._indexes[(alert.exchange, alert.market_symbol, alert.direction)].add(alert)
+
+    # ------------------------------------------------------------------
+    # TICKS
+    # ------------------------------------------------------------------
+
+    def on_tick(self, exchange_name: str, symbol: str, ticker: Ticker) -> None:
+        """Новая цена символа (вызывается из MarketDataCache, без await)"""
+        price = ticker.last
+        if not price:
+            return
+
+        unarmed = self._unarmed.pop((exchange_name, symbol), None)
+        if unarmed:
+            for alert in unarmed:
+                self._arm(alert, price)
+
+        fired: list[PriceAlert] = []
+        for direction in (1, -1):
+            index = self._indexes.get((exchange_name, symbol, direction))
+            if not index:
+                continue
+            for alert in index.pop_triggered(direction * price):
+                if alert.armed:
+                    fired.append(alert)
+                else:
+                    # цена вернулась на свою сторону уровня — ждём пересечения
+                    alert.direction = alert.crossing
+                    self._indexes[(exchange_name, symbol, alert.direction)].add(alert)
+            # символ остаётся в опросе, пока по нему есть алерты
+            market_data.watch(exchange_name, symbol)
+
+        if fired:
+            self._fire(fired, price)
+
+    def _fire(self, alerts: list[PriceAlert], price: float) -> None:
+        fired_at = datetime.now(timezone.utc)
+        signals = []
+        for alert in alerts:
+            self._alerts.pop(alert.alert_id, None)
+            # одноразовый: снимается из таблицы до исполнения
+            try:
+                self.store.delete(alert.alert_id)
+            except Exception as e:
+                logger.error(f"🔔 Алерт {alert.alert_id} не снят из таблицы: {e}")
+            signals.append(alert.signal.with_changes(alert_time=fired_at))
+            logger.info("🔔 Алерт %s сработал: цена %s", alert.alert_id, price)
+        self.fired_total += len(signals)
+
+        if self._sink is None or shutdown_coordinator.draining:
+            logger.warning(f"🔔 {len(signals)} сработавших алертов не исполнены: сервис останавливается")
+            return
+        task = asyncio.create_task(self._emit(signals))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _emit(self, signals: list[TradeSignal]) -> None:
+        try:
+            await self._sink(signals)
+        except HTTPException as e:
+            logger.error(f"🔔 Сделка по алерту не выполнена: {e.detail}")
+        except Exception as e:
+            logger.error(f"🔔 Сделка по алерту не выполнена: {e}")
@@ -0,0 +1,64 @@
+import json
+import os
+import sqlite3
+from typing import Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    alert_id TEXT PRIMARY KEY,
+    exchange TEXT NOT NULL,
+    signal TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+class AlertStore:
+    """
+    Локальные алерты в SQLite (файл журнала сделок, таблица alerts).
+
+    Общие для всех воркеров и переживают рестарт: ставит и снимает
+    алерт любой воркер, исполняет — лидер. Запросы — единичные строки
+    маленькой таблицы в режиме WAL, поэтому выполняются без потока.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def start(self) -> None:
+        if self._connection is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, isolation_level=None, timeout=5.0)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(_SCHEMA)
+        self._connection = connection
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def save(self, alert_id: str, exchange: str, signal: dict, created_at: float) -> None:
+        self._connection.execute(
+            "INSERT INTO alerts (alert_id, exchange, signal, created_at) VALUES (?, ?, ?, ?)",
+            (alert_id, exchange, json.dumps(signal), created_at),
+        )
+
+    def delete(self, alert_id: str) -> bool:
+        cursor = self._connection.execute("DELETE FROM alerts WHERE alert_id = ?", (alert_id,))
+        return cursor.rowcount > 0
+
+    def load(self) -> list[dict]:
+        """Все ожидающие алерты: [{"alert_id", "exchange", "signal", "created_at"}]"""
+        rows = self._connection.execute(
+            "SELECT alert_id, exchange, signal, created_at FROM alerts ORDER BY created_at"
+        ).fetchall()
+        return [
+            {"alert_id": alert_id, "exchange": exchange, "signal": json.loads(signal), "created_at": created_at}
+            for alert_id, exchange, signal, created_at in rows
+        ]
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from app.alerts import alert_engine
+from app.models.webhook import TradingViewWebhook
+from app.parser.tradingview import TradingViewParser
+from app.webhook.decoder import decode_webhook_body
+from app.webhook.validator import validate_webhook_token
+from app.utils.logger import logger
+
+router = APIRouter()
+
+
+@router.post("/alerts")
+async def create_alerts(
+    request: Request,
+    token: str = Query(..., description="Секретный токен для вебхука"),
+):
+    """
+    Постановка локальных алертов.
+
+    Тело — в тех же форматах, что и вебхук TradingView: текст
+    "LTCUSDT Crossing Up 76.47 size=100 Bybit" (по алерту на строку),
+    {"message": "..."} или JSON алерты {"symbol", "direction", "price", ...}.
+    """
+    validate_webhook_token(token)
+
+    body = await request.body()
+    try:
+        payload = decode_webhook_body(body, request.headers.get("content-type"))
+        if isinstance(payload, TradingViewWebhook):
+            signals = TradingViewParser.parse_alerts(payload.get_message_text())
+        else:
+            signals = payload
+    except Exception as e:
+        logger.error(f"Ошибка при разборе алертов: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    alerts = [alert_engine.add(signal) for signal in signals]
+    return {"success": True, "alerts": [alert.to_dict() for alert in alerts]}
+
+
+@router.get("/alerts")
+async def list_alerts(token: str = Query(..., description="Секретный токен для доступа")):
+    """Ожидающие алерты (общие для всех воркеров)"""
+    validate_webhook_token(token)
+    return {"alerts": alert_engine.snapshot(), "fired_total": alert_engine.fired_total}
+
+
+@router.delete("/alerts/{alert_id}")
+async def delete_alert(alert_id: str, token: str = Query(..., description="Секретный токен для доступа")):
+    validate_webhook_token(token)
+    if not alert_engine.remove(alert_id):
+        raise HTTPException(status_code=404, detail=f"Алерт {alert_id} не найден")
+    return {"success": True, "alert_id": alert_id}
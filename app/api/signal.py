@@ -49,11 +49,16 @@
 #         logger.exception("Ошибка обработки торгового сигнала")
 #         raise HTTPException(status_code=400, detail=str(e))
 
+from datetime import datetime
 from fastapi import APIRouter, HTTPException, Request
 from app.utils.logger import logger
+from app.config.profiles import trading_profiles
 from app.config.settings import settings
 from app.models.order import OrderRequest
 from app.exchange.order_manager import OrderManager
+from app.exchange.router import venue_router
+from app.utils.coordination import coordinator, signal_key
+from app.utils.deadline import Deadline
 
 router = APIRouter()
 order_manager = OrderManager()
@@ -61,6 +66,57 @@ order_manager = OrderManager()
 TOKEN = settings.trade_signal_token
 
 
+def _start_deadline(data: dict) -> Deadline | None:
+    """Бюджет времени сигнала; alert_time (ISO 8601) — необязательное время алерта"""
+    alert_time = data.get("alert_time")
+    deadline = Deadline.for_signal(datetime.fromisoformat(alert_time) if alert_time else None)
+    if deadline is not None:
+        deadline.check("приём")
+    return deadline
+
+
+def _build_order_request(data: dict) -> OrderRequest:
+    symbol = data["symbol"]
+    if not isinstance(symbol, str) or not symbol:
+        raise ValueError("symbol must be a non-empty string")
+    direction = data["direction"].upper()
+
+    if direction == "LONG":
+        side = "buy"
+    elif direction == "SHORT":
+        side = "sell"
+    else:
+        raise ValueError("direction must be LONG or SHORT")
+
+    exchange = (data.get("exchange") or settings.exchange).lower()
+    strategy = data.get("strategy")
+    profile = trading_profiles.resolve(exchange, symbol, strategy)
+
+    # повтор сигнала (в этом или другом воркере) в пределах TTL не исполняем;
+    # alert_time отличает новый сигнал того же направления от повтора
+    alert_time = data.get("alert_time")
+    key = signal_key(
+        exchange, symbol, direction,
+        alert_time=datetime.fromisoformat(alert_time) if alert_time else None,
+    )
+    if not coordinator.claim_signal(key):
+        raise ValueError(f"duplicate signal {symbol} {direction}")
+
+    return OrderRequest(
+        exchange=exchange,                          # bybit
+        symbol=symbol,
+        contract_type=settings.contract_type,       # ✅ USDT-M из settings
+        side=side,
+        amount=profile.size_position,
+        leverage=profile.leverage,
+        strategy=strategy,
+
+        entry_price=None,                           # market — будет выяснено позже
+        stop_loss=0.0,                              # ⚠️ временно, пересчитается
+        take_profit=0.0,
+    )
+
+
 @router.post("/signal")
 async def receive_signal(request: Request, token: str):
     if token != TOKEN:
@@ -70,32 +126,74 @@ async def receive_signal(request: Request, token: str):
     logger.info(f"🔥 Получен торговый сигнал: {data}")
 
     try:
-        symbol = data["symbol"]
-        direction = data["direction"].upper()
-
-        if direction == "LONG":
-            side = "buy"
-        elif direction == "SHORT":
-            side = "sell"
-        else:
-            raise ValueError("direction must be LONG or SHORT")
-
-        order_request = OrderRequest(
-            exchange=settings.exchange,                 # bybit
-            symbol=symbol,
-            contract_type=settings.contract_type,       # ✅ USDT-M из settings
-            side=side,
-            amount=settings.size_position,
-            leverage=settings.default_leverage,
-
-            entry_price=None,                           # market — будет выяснено позже
-            stop_loss=0.0,                              # ⚠️ временно, пересчитается
-            take_profit=0.0,
-        )
+        deadline = _start_deadline(data)
+        order_request = _build_order_request(data)
+        if not data.get("exchange"):
+            order_request = await venue_router.route(order_request)
 
-        result = await order_manager.execute_trade(order_request)
-        return result.model_dump()
+        result = await order_manager.execute_trade(order_request, deadline=deadline)
+        return result.to_dict()
 
     except Exception as e:
         logger.error("Ошибка обработки торгового сигнала", exc_info=True)
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/signal/batch")
+async def receive_signal_batch(request: Request, token: str):
+    """
+    Пакет сигналов: [{"symbol": ..., "direction": ..., "exchange": ...}, ...]
+    или {"signals": [...]}.
+
+    Все сигналы исполняются параллельно (с группировкой по бирже),
+    результат возвращается по каждому сигналу в исходном порядке.
+    """
+    if token != TOKEN:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    data = await request.json()
+    signals = data.get("signals") if isinstance(data, dict) else data
+
+    if not isinstance(signals, list) or not signals:
+        raise HTTPException(status_code=400, detail="signals must be a non-empty list")
+    if len(signals) > settings.batch_max_signals:
+        raise HTTPException(
+            status_code=400,
+            detail=f"too many signals: {len(signals)} > {settings.batch_max_signals}",
+        )
+
+    logger.info(f"🔥 Получен пакет сигналов: {len(signals)}")
+
+    results: list[dict | None] = [None] * len(signals)
+    order_requests: list[OrderRequest] = []
+    deadlines: list[Deadline | None] = []
+    positions: list[int] = []
+
+    for index, item in enumerate(signals):
+        try:
+            deadline = _start_deadline(item)
+            order_requests.append(_build_order_request(item))
+            deadlines.append(deadline)
+            positions.append(index)
+        except Exception as e:
+            results[index] = {"success": False, "error": f"invalid signal: {e}"}
+
+    order_requests = await venue_router.route_many(
+        order_requests,
+        [not signals[index].get("exchange") for index in positions],
+    )
+
+    responses = await order_manager.execute_batch(order_requests, deadlines)
+
+    for index, order_request, response in zip(positions, order_requests, responses):
+        results[index] = {
+            "symbol": order_request.symbol,
+            "exchange": order_request.exchange,
+            **response.to_dict(),
+        }
+
+    return {
+        "success": all(result["success"] for result in results),
+        "count": len(results),
+        "results": results,
+    }
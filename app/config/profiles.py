@@ -0,0 +1,340 @@
+import asyncio
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Literal, NamedTuple, Optional
+
+import yaml
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from app.config.settings import settings
+from app.utils.logger import logger
+
+EXCHANGES = ("binance", "okx", "bybit", "bitget")
+
+
+class TradingProfile(NamedTuple):
+    """Параметры риска и исполнения одной сделки"""
+    name: str
+    risk_mode: str
+    size_position: float
+    leverage: int
+    order_type: str
+    execution_algo: str
+    atr_period: int
+    atr_timeframe: str
+    atr_multiplier: float
+    risk_per_trade: float
+    risk_reward_ratio: float
+    stop_loss_rate: float
+    take_profit_rate: float
+    equity_percent: float
+
+    @classmethod
+    def from_settings(cls) -> "TradingProfile":
+        return cls(
+            name="default",
+            risk_mode=settings.risk_mode,
+            size_position=settings.size_position,
+            leverage=settings.default_leverage,
+            order_type=settings.order_type,
+            execution_algo=settings.execution_algo,
+            atr_period=settings.atr_period,
+            atr_timeframe=settings.atr_timeframe,
+            atr_multiplier=settings.atr_multiplier,
+            risk_per_trade=settings.risk_per_trade,
+            risk_reward_ratio=settings.risk_reward_ratio,
+            stop_loss_rate=settings.stop_loss_rate,
+            take_profit_rate=settings.take_profit_rate,
+            equity_percent=settings.equity_percent,
+        )
+
+    def merge(self, name: str, overrides: dict) -> "TradingProfile":
+        return self._replace(name=name, **overrides)
+
+
+# ----------------------------------------------------------------------
+# FILE SCHEMA
+# ----------------------------------------------------------------------
+
+class ProfileOverrides(BaseModel):
+    """Поля профиля, заданные в файле; остальные наследуются"""
+    model_config = ConfigDict(extra="forbid")
+
+    risk_mode: Optional[Literal["fixed_size", "fixed_risk_atr", "percent_equity"]] = None
+    size_position: Optional[float] = Field(None, gt=0)
+    leverage: Optional[int] = Field(None, ge=1)
+    order_type: Optional[Literal["market", "limit"]] = None
+    execution_algo: Optional[Literal["none", "twap", "iceberg", "post_only"]] = None
+    atr_period: Optional[int] = Field(None, ge=1)
+    atr_timeframe: Optional[str] = None
+    atr_multiplier: Optional[float] = Field(None, gt=0)
+    risk_per_trade: Optional[float] = Field(None, gt=0)
+    risk_reward_ratio: Optional[float] = Field(None, gt=0)
+    stop_loss_rate: Optional[float] = Field(None, gt=0)
+    take_profit_rate: Optional[float] = Field(None, gt=0)
+    equity_percent: Optional[float] = Field(None, gt=0, le=100)
+
+
+class SymbolOverrides(ProfileOverrides):
+    strategy: Optional[str] = None        # профиль стратегии, от которого наследуется символ
+
+
+class ProfilesFile(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    defaults: ProfileOverrides = ProfileOverrides()
+    strategies: dict[str, ProfileOverrides] = {}
+    symbols: dict[str, SymbolOverrides] = {}
+
+
+def _symbol_key(key: str) -> tuple[Optional[str], str]:
+    """"BTCUSDT" -> (None, "BTCUSDT"), "bybit:BTCUSDT" -> ("bybit", "BTCUSDT")"""
+    exchange, _, symbol = key.rpartition(":")
+    exchange = exchange.strip().lower() or None
+    if exchange is not None and exchange not in EXCHANGES:
+        raise ValueError(f"symbols.{key}: неизвестная биржа {exchange}")
+    symbol = symbol.strip().replace(".P", "").replace(".p", "").upper()
+    if not symbol:
+        raise ValueError(f"symbols.{key}: пустой символ")
+    return exchange, symbol
+
+
+# ----------------------------------------------------------------------
+# COMPILED TABLE
+# ----------------------------------------------------------------------
+
+class ProfileTable(NamedTuple):
+    default: TradingProfile
+    strategies: dict[str, TradingProfile]
+    # (exchange | None, symbol, strategy | None) -> профиль
+    symbols: dict[tuple[Optional[str], str, Optional[str]], TradingProfile]
+
+
+def compile_profiles(document: ProfilesFile) -> ProfileTable:
+    """
+    Разворачивает наследование в готовую таблицу.
+
+    Порядок слоёв: Settings -> defaults -> стратегия -> символ ->
+    символ на бирже. Стратегия сигнала заменяет стратегию символа из
+    файла, поля символа применяются поверх неё. Все сочетания символа
+    со стратегиями считаются здесь — поиск сделки это один-два get.
+    """
+    default = TradingProfile.from_settings().merge(
+        "default", document.defaults.model_dump(exclude_none=True)
+    )
+    strategies = {
+        name: default.merge(name, overrides.model_dump(exclude_none=True))
+        for name, overrides in document.strategies.items()
+    }
+
+    entries: dict[tuple[Optional[str], str], dict] = {}
+    for key, overrides in document.symbols.items():
+        exchange, symbol = _symbol_key(key)
+        fields = overrides.model_dump(exclude_none=True)
+        strategy = fields.get("strategy")
+        if strategy is not None and strategy not in strategies:
+            raise ValueError(f"symbols.{key}: неизвестная стратегия {strategy}")
+        entries[(exchange, symbol)] = fields
+
+    # символ на бирже наследует общую запись символа
+    for (exchange, symbol), fields in entries.items():
+        if exchange is not None:
+            entries[(exchange, symbol)] = {**entries.get((None, symbol), {}), **fields}
+
+    symbols = {}
+    for (exchange, symbol), fields in entries.items():
+        fields = dict(fields)
+        own_strategy = fields.pop("strategy", None)
+        name = f"{exchange}:{symbol}" if exchange else symbol
+        base = strategies[own_strategy] if own_strategy else default
+        symbols[(exchange, symbol, None)] = base.merge(name, fields)
+        for strategy, profile in strategies.items():
+            symbols[(exchange, symbol, strategy)] = profile.merge(f"{strategy}/{name}", fields)
+
+    return ProfileTable(default, strategies, symbols)
+
+
+# ----------------------------------------------------------------------
+# STORE
+# ----------------------------------------------------------------------
+
+class TradingProfiles:
+    """
+    Профили риска и исполнения по символу и стратегии.
+
+    Файл YAML проверяется и компилируется целиком в ProfileTable; поиск
+    профиля сделки — словарь, O(1). При изменении файла новая таблица
+    собирается в фоне и подменяет прежнюю одним присваиванием: сделки
+    в полёте дорабатывают на уже выбранном профиле, новые сигналы
+    сразу видят новый. Ошибочный файл не применяется — остаётся
+    предыдущая таблица.
+    """
+
+    def __init__(self, path: str, reload_interval: float):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._table = compile_profiles(ProfilesFile())
+        self._stamp: Optional[tuple[int, int]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._unknown: set[str] = set()   # о неизвестной стратегии предупреждаем один раз
+        self.version = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def default(self) -> TradingProfile:
+        return self._table.default
+
+    # ------------------------------------------------------------------
+    # LOOKUP
+    # ------------------------------------------------------------------
+
+    def resolve(self, exchange: Optional[str], symbol: str, strategy: Optional[str] = None) -> TradingProfile:
+        """Профиль сделки: символ на бирже -> символ -> стратегия -> defaults"""
+        table = self._table
+        if strategy is not None and strategy not in table.strategies:
+            if strategy not in self._unknown:
+                self._unknown.add(strategy)
+                logger.warning("[PROFILES] неизвестная стратегия %s, профиль без неё", strategy)
+            strategy = None
+
+        symbol = symbol.upper()
+        profile = (
+            table.symbols.get((exchange, symbol, strategy))
+            or table.symbols.get((None, symbol, strategy))
+        )
+        if profile is not None:
+            return profile
+        return table.strategies[strategy] if strategy else table.default
+
+    def snapshot(self) -> dict:
+        table = self._table
+        return {
+            "path": self.path,
+            "version": self.version,
+            "last_error": self.last_error,
+            "default": table.default._asdict(),
+            "strategies": {name: profile._asdict() for name, profile in table.strategies.items()},
+            "symbols": sorted({
+                f"{exchange}:{symbol}" if exchange else symbol
+                for exchange, symbol, _ in table.symbols
+            }),
+        }
+
+    # ------------------------------------------------------------------
+    # LOADING
+    # ------------------------------------------------------------------
+
+    def _file_stamp(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self) -> ProfileTable:
+        with open(self.path, encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+        return compile_profiles(ProfilesFile.model_validate(data))
+
+    def load(self) -> None:
+        """
+        Первая загрузка при старте: ошибка в файле останавливает запуск,
+        как и ошибка в .env.
+        """
+        if not self.path:
+            return
+        self._stamp = self._file_stamp()
+        if self._stamp is None:
+            return
+        try:
+            self._table = self._read()
+        except (OSError, yaml.YAMLError, ValidationError, ValueError) as e:
+            raise ValueError(f"Профили {self.path}: {e}") from e
+        self.version += 1
+        logger.info(
+            f"📐 Профили {self.path}: стратегий {len(self._table.strategies)}, "
+            f"символов {len({key[:2] for key in self._table.symbols})}"
+        )
+
+    async def reload(self) -> bool:
+        """Перечитывает файл, если он изменился; True — таблица заменена"""
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+
+        if stamp is None:
+            table = compile_profiles(ProfilesFile())
+        else:
+            try:
+                table = await asyncio.to_thread(self._read)
+            except (OSError, yaml.YAMLError, ValidationError, ValueError) as e:
+                # файл могли сохранить не до конца — следующая запись перечитается
+                self.last_error = str(e)
+                logger.error(f"[PROFILES] {self.path} не применён, действуют прежние профили: {e}")
+                return False
+
+        self._table = table
+        self._unknown = set()
+        self.version += 1
+        self.last_error = None
+        logger.info(
+            f"📐 Профили перезагружены (v{self.version}): стратегий {len(table.strategies)}, "
+            f"символов {len({key[:2] for key in table.symbols})}"
+        )
+        return True
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self.path and self.reload_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._watch_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _watch_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error(f"[PROFILES] проверка {self.path} не удалась: {e}")
+
+
+# Профили процесса; каждый воркер следит за файлом сам
+trading_profiles = TradingProfiles(settings.profiles_path, settings.profiles_reload_interval)
+trading_profiles.load()
+
+
+# ----------------------------------------------------------------------
+# ACTIVE PROFILE
+# ----------------------------------------------------------------------
+
+_current: ContextVar[Optional[TradingProfile]] = ContextVar("trading_profile", default=None)
+
+
+@contextmanager
+def use_profile(profile: TradingProfile) -> Iterator[TradingProfile]:
+    """
+    Делает профиль активным для текущей сделки.
+
+    Фоновые задачи сделки (алгоритмы исполнения) наследуют контекст и
+    дорабатывают на том же профиле, даже если файл уже перезагружен.
+    """
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+
+def active_profile() -> TradingProfile:
+    """Профиль текущей сделки; вне сделки — профиль по умолчанию"""
+    profile = _current.get()
+    return profile if profile is not None else trading_profiles.default
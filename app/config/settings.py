@@ -142,7 +142,7 @@ class Settings(BaseSettings):
     # --------------------------------------------------
     # Risk mode (NEW)
     # --------------------------------------------------
-    risk_mode: Literal["fixed_size", "fixed_risk_atr"] = "fixed_risk_atr"
+    risk_mode: Literal["fixed_size", "fixed_risk_atr", "percent_equity"] = "fixed_risk_atr"
 
     # --------------------------------------------------
     # ATR settings
@@ -159,11 +159,155 @@ class Settings(BaseSettings):
     atr_multiplier: float = 1.0
     risk_reward_ratio: float = 3.0
 
+    # --- percent_equity mode ---
+    equity_percent: float = 5.0           # % свободной маржи на сделку (номинал)
+
+    # --------------------------------------------------
+    # Trading profiles (символ / стратегия, YAML)
+    # --------------------------------------------------
+    profiles_path: str = "config/profiles.yaml"   # нет файла — все сделки на параметрах выше
+    profiles_reload_interval: float = 2.0  # сек, проверка изменения файла; 0 — без перезагрузки
+
     # --------------------------------------------------
     # Safety limits (NEW)
     # --------------------------------------------------
     max_position_usdt: float = 300.0
     min_position_usdt: float = 30.0
+    max_slippage_bps: float = 0.0         # по стакану для market входа; 0 — без проверки
+    slippage_action: Literal["limit_ioc", "reject"] = "limit_ioc"
+
+    # --------------------------------------------------
+    # Portfolio exposure (0 — без ограничения)
+    # --------------------------------------------------
+    max_total_exposure_usdt: float = 0.0
+    max_exchange_exposure_usdt: float = 0.0
+    max_symbol_exposure_usdt: float = 0.0
+    exposure_reconcile_interval: float = 30.0   # сек, сверка с позициями биржи
+    position_reconcile_interval: float = 30.0   # сек, сверка SL / TP открытых позиций; 0 — выключить
+
+    # --------------------------------------------------
+    # Break-even / trailing stop (в R — расстояниях вход → исходный SL)
+    # --------------------------------------------------
+    breakeven_trigger_r: float = 0.0      # SL в безубыток при прибыли N R; 0 — выключить
+    breakeven_offset_bps: float = 0.0     # б.п. за входом в сторону прибыли (комиссии)
+    trailing_activation_r: float = 0.0    # трейлинг с прибыли N R; 0 — выключить
+    trailing_distance_r: float = 1.0      # SL на N R позади цены
+    trailing_step_r: float = 0.25         # подтягивать SL через каждые N R
+    stop_amend_interval: float = 0.5      # сек, накопление изменений SL в одну отправку
+
+    # --------------------------------------------------
+    # Balances / streams
+    # --------------------------------------------------
+    exchange_streams: bool = False        # ccxt.pro: websocket-обновления (баланс, стаканы)
+    balance_refresh_interval: float = 15.0   # сек, фоновое обновление балансов
+    balance_max_age: float = 60.0         # сек; старее — баланс для риска перезапрашивается
+
+    # --------------------------------------------------
+    # Execution algorithms (крупные market входы)
+    # --------------------------------------------------
+    execution_algo: Literal["none", "twap", "iceberg", "post_only"] = "none"
+    algo_min_notional: float = 0.0        # USDT; меньше — обычный market ордер
+    twap_slices: int = 5
+    twap_duration: float = 60.0           # сек на весь TWAP
+    iceberg_clip_usdt: float = 100.0      # видимый кусок айсберга
+    algo_child_timeout: float = 5.0       # сек ожидания limit-куска
+    algo_max_duration: float = 300.0      # сек, предел айсберга
+    post_only_max_chases: int = 10        # перестановок post-only до market
+
+    # --------------------------------------------------
+    # Market data / smart routing
+    # --------------------------------------------------
+    market_data_ttl: float = 2.0          # сек, тикер моложе считается актуальным
+    market_data_refresh_interval: float = 1.0   # сек, фоновое обновление тикеров
+    orderbook_depth: int = 50             # уровней в локальном стакане
+    orderbook_max_age: float = 1.0        # сек; старее — REST-снимок перед входом
+    smart_routing: bool = False           # выбирать биржу, если она не указана в сигнале
+    routing_exchanges: str = ""           # через запятую; пусто — все биржи с ключами
+
+    # --------------------------------------------------
+    # Signal freshness
+    # --------------------------------------------------
+    signal_max_age: float = 30.0          # сек от алерта / поступления до входа; 0 — без ограничения
+    max_price_drift_bps: float = 0.0      # б.п. от цены алерта до текущей; 0 — не проверять
+
+    # --------------------------------------------------
+    # Circuit breakers
+    # --------------------------------------------------
+    breaker_enabled: bool = True
+    breaker_failure_rate: float = 0.5     # доля отказов в окне для размыкания
+    breaker_min_calls: int = 5            # меньше вызовов в окне — не размыкать
+    breaker_window: float = 30.0          # сек, скользящее окно
+    breaker_slow_call: float = 5.0        # сек; медленнее — считается отказом
+    breaker_open_seconds: float = 15.0    # сек до пробного вызова
+    breaker_half_open_probes: int = 1     # успешных проб для замыкания
+    fallback_exchange: str = ""           # биржа для входа, если торговая цепь разомкнута
+
+    # --------------------------------------------------
+    # Retries (повторы вызовов бирж)
+    # --------------------------------------------------
+    retry_max_attempts: int = 3           # попыток на вызов, включая первую; 1 — без повторов
+    retry_base_delay: float = 0.2         # сек, пауза перед первым повтором (со случайным разбросом)
+    retry_max_delay: float = 2.0          # сек, предел паузы
+    retry_budget_ratio: float = 0.1       # повторов на один вызов биржи в среднем
+    retry_budget_burst: float = 10.0      # запас повторов биржи
+
+    # --------------------------------------------------
+    # Hedged reads
+    # --------------------------------------------------
+    hedged_reads: bool = False            # дубль медленного чтения рыночных данных
+    hedge_percentile: float = 0.9         # дубль, если ответа нет дольше этого перцентиля
+    hedge_window: int = 200               # замеров задержки на метод биржи
+    hedge_min_samples: int = 20           # до стольких замеров дублей нет
+    hedge_min_delay: float = 0.05         # нижняя граница порога, сек
+    hedge_max_ratio: float = 0.05         # доля дублей от числа чтений
+    hedge_burst: float = 5.0              # запас дублей биржи
+
+    # --------------------------------------------------
+    # Batch execution
+    # --------------------------------------------------
+    batch_max_signals: int = 100          # сигналов в одном запросе /signal/batch
+    batch_max_concurrency: int = 30       # одновременных сделок на одну биржу
+
+    # --------------------------------------------------
+    # Logging
+    # --------------------------------------------------
+    log_level: str = "INFO"
+    log_backup_count: int = 30            # сколько суточных файлов хранить
+
+    # --------------------------------------------------
+    # Trade journal
+    # --------------------------------------------------
+    journal_enabled: bool = True
+    journal_path: str = "data/trade_journal.db"
+    alert_sync_interval: float = 1.0      # сек, лидер перечитывает локальные алерты (таблица alerts)
+
+    # --------------------------------------------------
+    # Workers / coordination
+    # --------------------------------------------------
+    web_workers: int = 1                  # число uvicorn воркеров (WEB_WORKERS)
+    coordination_dir: str = "/tmp/trading-bot"
+    signal_dedupe_ttl: float = 0.0        # сек; 0 — без дедупликации
+    shutdown_drain_timeout: float = 30.0  # сек ожидания сделок в полёте при остановке
+    shutdown_drain_grace: float = 5.0     # сек после SIGTERM: 503 новым сигналам до закрытия порта
+
+    # --------------------------------------------------
+    # Paper trading (ордера исполняются в памяти по ценам биржи)
+    # --------------------------------------------------
+    paper_trading: bool = False
+    paper_balance: float = 10_000.0       # USDT стартового бумажного счёта
+    paper_fee_maker: float = 0.0002
+    paper_fee_taker: float = 0.00055
+    paper_slippage_bps: float = 0.0       # б.п. к цене market исполнения
+    paper_feed_interval: float = 1.0      # сек, опрос цен символов с ордерами / позициями
+    paper_price_file: str = ""            # JSON Lines с записанными тиками вместо живых цен
+    paper_replay_speed: float = 1.0       # ускорение записи; 0 — без пауз
+
+    # --------------------------------------------------
+    # Exchange cassette (запись / воспроизведение вызовов бирж)
+    # --------------------------------------------------
+    cassette_mode: Literal["off", "record", "replay"] = "off"
+    cassette_path: str = "data/exchange.cassette.jsonl.gz"
+    cassette_timing: Literal["original", "fast"] = "original"   # replay: с записанными задержками или без
 
     # --------------------------------------------------
     # Binance
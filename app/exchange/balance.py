@@ -0,0 +1,215 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+from app.config.settings import settings
+from app.exchange.factory import ExchangeFactory
+from app.exchange.pool import exchange_pool
+from app.utils.logger import logger
+
+
+# Валюта маржи USDT-M фьючерсов
+MARGIN_CURRENCY = "USDT"
+
+_SERVICE_KEYS = ("info", "free", "used", "total", "timestamp", "datetime", "debt")
+
+
+class BalanceSnapshot(NamedTuple):
+    """
+    Снимок баланса одной биржи.
+    """
+    exchange: str
+    balances: dict              # валюта -> {"free", "used", "total"}
+    free_margin: float          # свободно в MARGIN_CURRENCY
+    equity: float               # всего в MARGIN_CURRENCY
+    updated_at: float           # time.time() последнего успешного обновления
+    source: str                 # rest | stream
+    error: Optional[str] = None # ошибка последнего обновления (снимок остался прежним)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.updated_at
+
+
+def _extract_balances(balance: dict) -> dict:
+    """Ненулевые балансы по валютам из ответа ccxt fetch_balance"""
+    result = {}
+    for currency, info in balance.items():
+        if currency in _SERVICE_KEYS or not isinstance(info, dict):
+            continue
+        if currency == MARGIN_CURRENCY or (info.get("total") or 0) > 0 or (info.get("free") or 0) > 0:
+            result[currency] = {
+                "free": info.get("free") or 0,
+                "used": info.get("used") or 0,
+                "total": info.get("total") or 0,
+            }
+    return result
+
+
+class BalanceService:
+    """
+    Кэш балансов всех настроенных бирж.
+
+    Снимки обновляются в фоне: все биржи параллельно раз в
+    balance_refresh_interval, а при exchange_streams — ещё и по
+    websocket watch_balance. /balance и риск-стратегии читают кэш
+    без сетевых запросов; если снимок старше balance_max_age,
+    риск получает свежий баланс одним запросом.
+    """
+
+    def __init__(self, refresh_interval: float, max_age: float):
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self._snapshots: dict[str, BalanceSnapshot] = {}
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks.append(asyncio.create_task(self._refresh_loop()))
+        if settings.exchange_streams:
+            for exchange_name in ExchangeFactory.configured_exchanges():
+                self._tasks.append(asyncio.create_task(self._watch_loop(exchange_name)))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+
+    # ------------------------------------------------------------------
+    # READ
+    # ------------------------------------------------------------------
+
+    def get(self, exchange_name: str) -> Optional[BalanceSnapshot]:
+        """Кэшированный снимок (без сети)"""
+        return self._snapshots.get(exchange_name)
+
+    async def get_fresh(self, exchange_name: str, max_age: Optional[float] = None) -> BalanceSnapshot:
+        """Снимок не старше max_age; при необходимости обновляется"""
+        max_age = self.max_age if max_age is None else max_age
+        snapshot = self._snapshots.get(exchange_name)
+        if snapshot is None or snapshot.error or snapshot.age > max_age:
+            snapshot = await self.refresh(exchange_name)
+        if snapshot.error and snapshot.age > max_age:
+            raise ValueError(f"Баланс {exchange_name} недоступен: {snapshot.error}")
+        return snapshot
+
+    async def free_margin(self, exchange_name: str) -> float:
+        """Свободная маржа для расчёта размера позиции"""
+        return (await self.get_fresh(exchange_name)).free_margin
+
+    async def get_all(self) -> list[BalanceSnapshot]:
+        """
+        Снимки всех настроенных бирж; отсутствующие в кэше
+        запрашиваются параллельно.
+        """
+        exchanges = ExchangeFactory.configured_exchanges()
+        missing = [name for name in exchanges if name not in self._snapshots]
+        if missing:
+            await asyncio.gather(*(self.refresh(name) for name in missing))
+        return [self._snapshots[name] for name in exchanges if name in self._snapshots]
+
+    def describe(self, snapshot: BalanceSnapshot) -> dict:
+        """Снимок для ответа API: с временем обновления и признаком устаревания"""
+        return {
+            "exchange": snapshot.exchange,
+            "balance": snapshot.balances,
+            "free_margin": snapshot.free_margin,
+            "equity": snapshot.equity,
+            "updated_at": (
+                datetime.fromtimestamp(snapshot.updated_at, timezone.utc).isoformat()
+                if snapshot.updated_at else None
+            ),
+            "age_seconds": round(snapshot.age, 3) if snapshot.updated_at else None,
+            "stale": not snapshot.updated_at or snapshot.age > self.max_age,
+            "source": snapshot.source,
+            "error": snapshot.error,
+        }
+
+    # ------------------------------------------------------------------
+    # REFRESH
+    # ------------------------------------------------------------------
+
+    async def refresh(self, exchange_name: str) -> BalanceSnapshot:
+        """
+        Запрашивает баланс биржи.
+
+        Параллельные вызовы для одной биржи ждут один и тот же запрос.
+        """
+        task = self._refreshing.get(exchange_name)
+        if task is None:
+            task = asyncio.create_task(self._fetch(exchange_name))
+            self._refreshing[exchange_name] = task
+            task.add_done_callback(lambda _: self._refreshing.pop(exchange_name, None))
+        return await asyncio.shield(task)
+
+    async def refresh_all(self) -> None:
+        await asyncio.gather(
+            *(self.refresh(name) for name in ExchangeFactory.configured_exchanges())
+        )
+
+    async def _fetch(self, exchange_name: str) -> BalanceSnapshot:
+        try:
+            client = await exchange_pool.get(exchange_name)
+            balance = await client.get_balance()
+        except Exception as e:
+            previous = self._snapshots.get(exchange_name)
+            snapshot = (
+                previous._replace(error=str(e))
+                if previous
+                else BalanceSnapshot(exchange_name, {}, 0.0, 0.0, 0.0, "rest", str(e))
+            )
+            self._snapshots[exchange_name] = snapshot
+            return snapshot
+        return self._store(exchange_name, balance, "rest")
+
+    def _store(self, exchange_name: str, balance: dict, source: str) -> BalanceSnapshot:
+        margin = balance.get(MARGIN_CURRENCY) or {}
+        snapshot = BalanceSnapshot(
+            exchange=exchange_name,
+            balances=_extract_balances(balance),
+            free_margin=float(margin.get("free") or 0.0),
+            equity=float(margin.get("total") or 0.0),
+            updated_at=time.time(),
+            source=source,
+        )
+        self._snapshots[exchange_name] = snapshot
+        return snapshot
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh_all()
+            except Exception as e:
+                logger.warning(f"Балансы: фоновое обновление не удалось: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def _watch_loop(self, exchange_name: str) -> None:
+        """Обновления баланса из приватного websocket-потока (ccxt.pro)"""
+        delay = 1.0
+        while True:
+            try:
+                client = await exchange_pool.get(exchange_name)
+                if not client.client.has.get("watchBalance"):
+                    logger.info(f"Балансы: {exchange_name} без watch_balance, только опрос")
+                    return
+                while True:
+                    balance = await client.client.watch_balance()
+                    self._store(exchange_name, balance, "stream")
+                    delay = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Балансы: поток {exchange_name} прерван: {e}, повтор через {delay:.0f}с")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+
+
+# Общий сервис балансов процесса
+balance_service = BalanceService(settings.balance_refresh_interval, settings.balance_max_age)
@@ -0,0 +1,236 @@
+import asyncio
+import fcntl
+import gzip
+import json
+import os
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Optional
+
+from app.config.settings import settings
+from app.exchange.loader import import_ccxt
+from app.utils.logger import logger
+
+ccxt_errors = import_ccxt("ccxt.base.errors")
+
+# Запись сделки (вход OrderManager) среди вызовов бирж
+TRADE = "__trade__"
+
+# Вызов, которого нет в записи, берётся из ответа другого метода
+ALIASES = {
+    "fetch_ticker": ("fetch_tickers", lambda response, args: response[args[0]]),
+}
+
+
+class CassetteMiss(LookupError):
+    """В кассете нет ответа на вызов"""
+
+
+def _key(args: tuple, kwargs: dict) -> str:
+    return json.dumps([args, kwargs], sort_keys=True, default=str, separators=(",", ":"))
+
+
+def _method_name(method) -> str:
+    return getattr(method, "__name__", None) or repr(method)
+
+
+class Cassette:
+    """
+    Запись и воспроизведение обмена с биржами.
+
+    record: каждый вызов ccxt из ExchangeClient._call пишется строкой
+    JSON Lines (gzip) с короткими ключами:
+        t — сек от начала сессии, x — биржа, m — метод, a / k — аргументы,
+        d — длительность, r — ответ или e — [класс ошибки, сообщение].
+    Входы OrderManager пишутся как m = "__trade__". Воркеры пишут в
+    один файл: каждая пачка — отдельный gzip member под flock файла
+    <path>.lock, поэтому записи разных процессов не перемешиваются.
+
+    replay: сеть не используется, ответы берутся из записи по
+    (биржа, метод, аргументы) в порядке записи; если аргументы не
+    совпали — следующий ответ того же метода. timing = "original"
+    выдерживает записанную длительность вызова, "fast" — нет.
+    """
+
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self, mode: str, path: str, timing: str):
+        self.mode = mode
+        self.path = path
+        self.timing = timing
+
+        self._started = time.monotonic()
+        self._buffer: list[str] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+        self._exact: dict[tuple[str, str, str], deque] = defaultdict(deque)
+        self._by_method: dict[tuple[str, str], deque] = defaultdict(deque)
+        self._trades: list[dict] = []
+        self._loaded = False
+        self.misses = 0
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    # ------------------------------------------------------------------
+    # RECORD
+    # ------------------------------------------------------------------
+
+    async def record(self, exchange_name: str, method, args: tuple, kwargs: dict, call: Awaitable) -> Any:
+        """Ожидает вызов и записывает запрос, ответ и время"""
+        started = time.monotonic()
+        entry = {
+            "t": round(started - self._started, 6),
+            "x": exchange_name,
+            "m": _method_name(method),
+            "a": args,
+            "k": kwargs,
+        }
+        try:
+            result = await call
+        except asyncio.CancelledError:
+            # прерван дедлайном или остановкой — ответа биржи нет
+            raise
+        except Exception as e:
+            entry["d"] = round(time.monotonic() - started, 6)
+            entry["e"] = [type(e).__name__, str(e)]
+            self._append(entry)
+            raise
+        entry["d"] = round(time.monotonic() - started, 6)
+        entry["r"] = result
+        self._append(entry)
+        return result
+
+    def record_trade(self, order_request: dict, entry_price: Optional[float], atr: Optional[float]) -> None:
+        self._append({
+            "t": round(time.monotonic() - self._started, 6),
+            "m": TRADE,
+            "r": {"request": order_request, "entry_price": entry_price, "atr": atr},
+        })
+
+    def _append(self, entry: dict) -> None:
+        self._buffer.append(json.dumps(entry, default=str, separators=(",", ":")))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+            if self._buffer:
+                batch, self._buffer = self._buffer, []
+                try:
+                    await asyncio.to_thread(self._write, batch)
+                except Exception as e:
+                    logger.error(f"[CASSETTE] запись {self.path} не удалась: {e}")
+
+    def _write(self, lines: list[str]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        finally:
+            os.close(fd)
+
+    async def close(self) -> None:
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self._buffer:
+            batch, self._buffer = self._buffer, []
+            self._write(batch)
+            logger.info(f"[CASSETTE] записано в {self.path}")
+
+    # ------------------------------------------------------------------
+    # REPLAY
+    # ------------------------------------------------------------------
+
+    def load(self) -> None:
+        if self._loaded:
+            return
+        count = 0
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                count += 1
+                if entry["m"] == TRADE:
+                    self._trades.append(entry)
+                    continue
+                entry["a"] = tuple(entry.get("a") or ())
+                entry["used"] = False
+                self._exact[(entry["x"], entry["m"], _key(entry["a"], entry.get("k") or {}))].append(entry)
+                self._by_method[(entry["x"], entry["m"])].append(entry)
+        self._loaded = True
+        logger.info(f"[CASSETTE] {self.path}: {count} записей, сделок {len(self._trades)}")
+
+    def trades(self) -> list[tuple[float, dict]]:
+        """Входы записанной сессии: (сек от начала, {"request", "entry_price", "atr"})"""
+        self.load()
+        return [(entry["t"], entry["r"]) for entry in self._trades]
+
+    @staticmethod
+    def _take(queue: Optional[deque]) -> Optional[dict]:
+        while queue:
+            entry = queue.popleft()
+            if not entry["used"]:
+                entry["used"] = True
+                return entry
+        return None
+
+    def _find(self, exchange_name: str, name: str, args: tuple, kwargs: dict) -> Optional[dict]:
+        entry = self._take(self._exact.get((exchange_name, name, _key(args, kwargs))))
+        if entry is None:
+            entry = self._take(self._by_method.get((exchange_name, name)))
+        return entry
+
+    async def replay(self, exchange_name: str, method, args: tuple, kwargs: dict) -> Any:
+        """Ответ на вызов из записи (или записанная ошибка)"""
+        self.load()
+        name = _method_name(method)
+        entry = self._find(exchange_name, name, args, kwargs)
+        transform = None
+        if entry is None and name in ALIASES:
+            entry, transform = self._find_alias(exchange_name, name, args)
+        if entry is None:
+            self.misses += 1
+            raise CassetteMiss(f"[CASSETTE] нет ответа {exchange_name}.{name} {_key(args, kwargs)[:200]}")
+
+        if self.timing == "original" and entry.get("d"):
+            await asyncio.sleep(entry["d"])
+
+        if "e" in entry:
+            error_name, message = entry["e"]
+            error_class = getattr(ccxt_errors, error_name, None)
+            if not (isinstance(error_class, type) and issubclass(error_class, Exception)):
+                error_class = RuntimeError
+            raise error_class(message)
+
+        result = entry["r"]
+        if transform is not None:
+            result = transform(result, args)
+        return result
+
+    def _find_alias(self, exchange_name: str, name: str, args: tuple):
+        """
+        Ответ пакетного метода, содержащий нужный символ (не расходуется:
+        в записи его мог прочитать кэш, а в воспроизведении — сделка).
+        """
+        source, transform = ALIASES[name]
+        for entry in self._by_method.get((exchange_name, source), ()):
+            if not entry["used"] and isinstance(entry.get("r"), dict) and args and args[0] in entry["r"]:
+                return entry, transform
+        return None, None
+
+
+# Общая кассета процесса (CASSETTE_MODE=off — не используется)
+cassette = Cassette(settings.cassette_mode, settings.cassette_path, settings.cassette_timing)
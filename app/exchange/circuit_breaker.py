@@ -0,0 +1,278 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+from app.config.settings import settings
+from app.exchange.loader import import_ccxt
+from app.utils.logger import logger
+
+ccxt_errors = import_ccxt("ccxt.base.errors")
+
+T = TypeVar("T")
+
+# Классы эндпоинтов: деградация одного не блокирует остальные
+MARKET_DATA = "market_data"     # тикеры, свечи, стаканы
+TRADING = "trading"             # создание / отмена ордеров, SL/TP
+ACCOUNT = "account"             # баланс, позиции, плечо, статусы ордеров
+
+
+class CircuitOpenError(Exception):
+    """Вызов отклонён без обращения к бирже: цепь разомкнута"""
+
+    def __init__(self, name: str, retry_in: float):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"Цепь {name} разомкнута, повтор через {retry_in:.1f}с")
+
+
+class CircuitBreaker:
+    """
+    Размыкатель цепи для одной биржи и одного класса эндпоинтов.
+
+    CLOSED: вызовы идут, в скользящем окне считаются ошибки сети
+    и медленные ответы; при доле отказов >= failure_rate (и не меньше
+    min_calls вызовов в окне) цепь размыкается.
+    OPEN: вызовы отклоняются сразу (CircuitOpenError) open_seconds секунд.
+    HALF_OPEN: пропускается half_open_probes пробных вызовов; все успешны —
+    цепь замыкается, любой отказ — снова размыкается.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float,
+        min_calls: int,
+        window: float,
+        slow_call: float,
+        open_seconds: float,
+        half_open_probes: int,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.slow_call = slow_call
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(half_open_probes, 1)
+
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self._events: deque[tuple[float, bool, float]] = deque()  # (время, отказ, латентность)
+        self._failures_in_window = 0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+        # счётчики для метрик
+        self.calls_total = 0
+        self.failures_total = 0
+        self.rejected_total = 0
+        self.opened_total = 0
+
+    # ------------------------------------------------------------------
+    # STATE
+    # ------------------------------------------------------------------
+
+    @property
+    def is_open(self) -> bool:
+        """Разомкнута и ещё не пора пробовать (вызов будет отклонён)"""
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.open_seconds
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.opened_total += 1
+        self._probes_in_flight = 0
+        logger.warning(f"⚡ Цепь {self.name} разомкнута на {self.open_seconds:.0f}с")
+
+    def _close(self) -> None:
+        self.state = self.CLOSED
+        self._events.clear()
+        self._failures_in_window = 0
+        logger.info(f"⚡ Цепь {self.name} замкнута")
+
+    def _trim(self, now: float) -> None:
+        horizon = now - self.window
+        events = self._events
+        while events and events[0][0] < horizon:
+            if events.popleft()[1]:
+                self._failures_in_window -= 1
+
+    # ------------------------------------------------------------------
+    # CALL
+    # ------------------------------------------------------------------
+
+    def allow(self) -> bool:
+        """
+        Пропускает вызов или отклоняет его.
+
+        Returns:
+            True, если вызов пробный (HALF_OPEN)
+
+        Raises:
+            CircuitOpenError
+        """
+        if self.state == self.CLOSED:
+            return False
+
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            retry_in = self.open_seconds - (now - self.opened_at)
+            if retry_in > 0:
+                self.rejected_total += 1
+                raise CircuitOpenError(self.name, retry_in)
+            self.state = self.HALF_OPEN
+            self._probe_successes = 0
+            self._probes_in_flight = 0
+
+        if self._probes_in_flight >= self.half_open_probes:
+            self.rejected_total += 1
+            raise CircuitOpenError(self.name, 0.0)
+        self._probes_in_flight += 1
+        return True
+
+    def record(self, failed: bool, latency: float, probe: bool = False) -> None:
+        failed = failed or latency > self.slow_call
+        self.calls_total += 1
+        if failed:
+            self.failures_total += 1
+
+        if probe:
+            self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+            if self.state != self.HALF_OPEN:
+                return
+            if failed:
+                self._open()
+            else:
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._close()
+            return
+
+        if self.state != self.CLOSED:
+            return
+
+        now = time.monotonic()
+        self._events.append((now, failed, latency))
+        if failed:
+            self._failures_in_window += 1
+        self._trim(now)
+
+        calls = len(self._events)
+        if calls >= self.min_calls and self._failures_in_window / calls >= self.failure_rate:
+            self._open()
+
+    async def call(self, func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        probe = self.allow()
+        start = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            if probe:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+            raise
+        except Exception as e:
+            self.record(is_failure(e), time.perf_counter() - start, probe)
+            raise
+        self.record(False, time.perf_counter() - start, probe)
+        return result
+
+    def snapshot(self) -> dict:
+        self._trim(time.monotonic())
+        calls = len(self._events)
+        latencies = [latency for _, _, latency in self._events]
+        return {
+            "state": self.state,
+            "failure_rate": self._failures_in_window / calls if calls else 0.0,
+            "window_calls": calls,
+            "avg_latency": sum(latencies) / calls if calls else 0.0,
+            "calls_total": self.calls_total,
+            "failures_total": self.failures_total,
+            "rejected_total": self.rejected_total,
+            "opened_total": self.opened_total,
+        }
+
+
+def is_failure(error: Exception) -> bool:
+    """
+    Отказ биржи (сеть, таймаут, недоступность, перегрузка).
+
+    Ошибки запроса — нехватка средств, неверный ордер, неизвестный
+    символ — говорят о запросе, а не о бирже, и цепь не размыкают.
+    """
+    return isinstance(error, (ccxt_errors.NetworkError, asyncio.TimeoutError, TimeoutError))
+
+
+# ----------------------------------------------------------------------
+# REGISTRY
+# ----------------------------------------------------------------------
+
+_breakers: dict[tuple[str, str], CircuitBreaker] = {}
+
+
+def get_breaker(exchange_name: str, endpoint: str) -> CircuitBreaker:
+    """Размыкатель биржи и класса эндпоинтов (общий для всех клиентов процесса)"""
+    key = (exchange_name, endpoint)
+    breaker = _breakers.get(key)
+    if breaker is None:
+        breaker = _breakers[key] = CircuitBreaker(
+            name=f"{exchange_name}:{endpoint}",
+            failure_rate=settings.breaker_failure_rate,
+            min_calls=settings.breaker_min_calls,
+            window=settings.breaker_window,
+            slow_call=settings.breaker_slow_call,
+            open_seconds=settings.breaker_open_seconds,
+            half_open_probes=settings.breaker_half_open_probes,
+        )
+    return breaker
+
+
+def is_available(exchange_name: str, *endpoints: str) -> bool:
+    """Ни одна из цепей биржи не разомкнута"""
+    for endpoint in endpoints:
+        breaker = _breakers.get((exchange_name, endpoint))
+        if breaker is not None and breaker.is_open:
+            return False
+    return True
+
+
+def breaker_metrics() -> str:
+    """Состояние размыкателей в текстовом формате Prometheus"""
+    lines = [
+        "# HELP exchange_circuit_state 0 - closed, 1 - half_open, 2 - open",
+        "# TYPE exchange_circuit_state gauge",
+    ]
+    series: dict[str, list[str]] = {
+        "exchange_circuit_failure_rate": ["gauge"],
+        "exchange_circuit_avg_latency_seconds": ["gauge"],
+        "exchange_circuit_calls_total": ["counter"],
+        "exchange_circuit_failures_total": ["counter"],
+        "exchange_circuit_rejected_total": ["counter"],
+        "exchange_circuit_opened_total": ["counter"],
+    }
+    fields = {
+        "exchange_circuit_failure_rate": "failure_rate",
+        "exchange_circuit_avg_latency_seconds": "avg_latency",
+        "exchange_circuit_calls_total": "calls_total",
+        "exchange_circuit_failures_total": "failures_total",
+        "exchange_circuit_rejected_total": "rejected_total",
+        "exchange_circuit_opened_total": "opened_total",
+    }
+
+    for (exchange_name, endpoint), breaker in sorted(_breakers.items()):
+        labels = f'{{exchange="{exchange_name}",endpoint="{endpoint}"}}'
+        snapshot = breaker.snapshot()
+        lines.append(f"exchange_circuit_state{labels} {CircuitBreaker.STATE_CODES[snapshot['state']]}")
+        for metric, field in fields.items():
+            series[metric].append(f"{metric}{labels} {snapshot[field]}")
+
+    for metric, (metric_type, *values) in series.items():
+        lines.append(f"# TYPE {metric} {metric_type}")
+        lines.extend(values)
+    return "\n".join(lines) + "\n"
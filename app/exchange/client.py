@@ -1,19 +1,34 @@
-import ccxt.async_support as ccxt
+import asyncio
 from typing import Optional
 from app.config.settings import settings
+from app.exchange.loader import load_exchange_class
+from app.exchange.quantizer import MarketQuantizer
+from app.exchange.circuit_breaker import get_breaker, MARKET_DATA, TRADING, ACCOUNT
+from app.exchange.cassette import cassette
+from app.exchange.hedging import hedged_reads
+from app.exchange.retry import EXCEPTION_OVERRIDES, ccxt_errors, with_retry
+from app.utils.deadline import active_deadline
 from app.utils.logger import logger
 
+# Ордеров в одном пакетном изменении (edit_orders) по биржам
+EDIT_BATCH_LIMITS = {
+    "bybit": 10,
+    "binance": 5,
+}
+
 
 class ExchangeClient:
     """Обертка над CCXT клиентом для работы с биржами"""
     
     def __init__(self, exchange_name: str, api_key: str, api_secret: str, 
-                 passphrase: Optional[str] = None, sandbox: bool = False):
+                 passphrase: Optional[str] = None, sandbox: bool = False, pro: bool = False):
         self.exchange_name = exchange_name
         self.sandbox = sandbox
+        self.pro = pro
         
-        # Создаем клиент CCXT
-        exchange_class = getattr(ccxt, exchange_name)
+        # Создаем клиент CCXT (импортируется только модуль этой биржи);
+        # ccxt.pro-класс — наследник async, REST-методы те же плюс watch_*
+        exchange_class = load_exchange_class(exchange_name, pro=pro)
         
         # Проверка наличия ключей
         if not api_key or not api_secret:
@@ -23,6 +38,8 @@ class ExchangeClient:
             'apiKey': api_key,
             'secret': api_secret,
             'enableRateLimit': True,
+            # лимит запросов биржи общий на все воркеры — делим его между ними
+            'rateLimit': exchange_class.rateLimit * max(settings.web_workers, 1),
             'options': {
                 'defaultType': 'future',  # Фьючерсы
             }
@@ -37,17 +54,190 @@ class ExchangeClient:
             config['sandbox'] = True
         
         self.client = exchange_class(config)
-        logger.info(f"Инициализирован клиент {exchange_name} (sandbox={sandbox})")
+        # точные классы для кодов, которые ccxt относит к общему BadRequest
+        self.client.exceptions["exact"].update(EXCEPTION_OVERRIDES.get(exchange_name, {}))
+        self._quantizers: dict[str, MarketQuantizer] = {}
+        logger.info(f"Инициализирован клиент {exchange_name} (sandbox={sandbox}, pro={pro})")
     
     async def load_markets(self):
         """Загрузка рынков"""
-        await self.client.load_markets()
+        markets = await self._call(MARKET_DATA, self.client.load_markets)
+        if cassette.replaying:
+            # рынки из записи: индексы ccxt строятся как после сети
+            self.client.set_markets(markets)
+        # метаданные могли измениться — квантователи пересобираются лениво
+        self._quantizers.clear()
         logger.info(f"Рынки загружены для {self.exchange_name}")
+
+    def market(self, symbol: str) -> dict:
+        """Метаданные рынка из загруженных markets"""
+        return self.client.market(symbol)
+
+    def get_quantizer(self, symbol: str) -> MarketQuantizer:
+        """Квантователь для символа (собирается один раз на рынок)"""
+        quantizer = self._quantizers.get(symbol)
+        if quantizer is None:
+            quantizer = MarketQuantizer.from_market(
+                self.market(symbol), self.client.precisionMode
+            )
+            self._quantizers[symbol] = quantizer
+        return quantizer
     
+    async def _call(self, endpoint: str, method, *args, **kwargs):
+        """
+        Вызов метода ccxt через размыкатель цепи биржи и класса эндпоинтов.
+
+        При разомкнутой цепи сразу поднимается CircuitOpenError,
+        без ожидания таймаута ccxt. Если у сделки есть дедлайн, запрос
+        ждётся не дольше остатка бюджета; торговый запрос только
+        не отправляется после дедлайна — отправленный ордер не прерываем.
+
+        Кассета (CASSETTE_MODE) записывает вызов или отвечает из записи
+        без сети.
+
+        Сетевые ошибки, лимит запросов и nonce повторяются (retry.py):
+        чтения — по всем трём, создание ордера — только когда биржа
+        точно его отклонила.
+        """
+        name = method.__name__
+
+        async def attempt():
+            deadline = active_deadline()
+            if deadline is not None:
+                deadline.check(name)
+
+            if cassette.replaying:
+                call = cassette.replay(self.exchange_name, method, args, kwargs)
+            elif settings.breaker_enabled:
+                call = get_breaker(self.exchange_name, endpoint).call(method, *args, **kwargs)
+            else:
+                call = method(*args, **kwargs)
+            if cassette.recording:
+                call = cassette.record(self.exchange_name, method, args, kwargs, call)
+
+            if deadline is None or endpoint == TRADING:
+                return await call
+            return await deadline.wait_for(call, name)
+
+        return await with_retry(self.exchange_name, endpoint, name, attempt)
+
+    # ------------------------------------------------------------------
+    # MARKET DATA
+    # ------------------------------------------------------------------
+
+    async def _read(self, name: str, *args, **kwargs):
+        """
+        Чтение рыночных данных; при HEDGED_READS — с дублем по второму
+        соединению, если ответ дольше обычного (hedging.py).
+
+        Дедлайн сделки ограничивает чтение целиком: обе попытки идут в
+        отдельных задачах, где дедлайн не действует.
+        """
+        if not hedged_reads.enabled:
+            return await self._call(MARKET_DATA, getattr(self.client, name), *args, **kwargs)
+
+        deadline = active_deadline()
+        if deadline is not None:
+            deadline.check(name)
+        alternate = hedged_reads.alternate(self)
+        call = hedged_reads.call(
+            self.exchange_name,
+            name,
+            lambda: self._call(MARKET_DATA, getattr(self.client, name), *args, **kwargs),
+            lambda: self._call(MARKET_DATA, getattr(alternate, name), *args, **kwargs),
+        )
+        if deadline is None:
+            return await call
+        return await deadline.wait_for(call, name)
+
+    async def fetch_ticker(self, symbol: str) -> dict:
+        return await self._read("fetch_ticker", symbol)
+
+    async def fetch_tickers(self, symbols: list[str]) -> dict:
+        return await self._read("fetch_tickers", symbols)
+
+    async def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int) -> list:
+        return await self._read("fetch_ohlcv", symbol, timeframe=timeframe, limit=limit)
+
+    async def fetch_order_book(self, symbol: str, limit: int) -> dict:
+        return await self._read("fetch_order_book", symbol, limit)
+
+    # ------------------------------------------------------------------
+    # ORDERS / POSITIONS
+    # ------------------------------------------------------------------
+
+    async def fetch_order(self, order_id: str, symbol: str) -> dict:
+        return await self._call(ACCOUNT, self.client.fetch_order, order_id, symbol)
+
+    async def cancel_order(self, order_id: str, symbol: str, params: dict = None) -> dict:
+        return await self._call(TRADING, self.client.cancel_order, order_id, symbol, params or {})
+
+    async def fetch_positions(self, symbols: list[str] = None) -> list:
+        return await self._call(ACCOUNT, self.client.fetch_positions, symbols)
+
+    async def fetch_open_orders(self, symbol: str = None, params: dict = None) -> list:
+        """Открытые ордера; без symbol — по всему аккаунту одним запросом"""
+        if symbol is None:
+            # Binance по умолчанию отказывает в запросе без символа
+            self.client.options["warnOnFetchOpenOrdersWithoutSymbol"] = False
+        return await self._call(ACCOUNT, self.client.fetch_open_orders, symbol, None, None, params or {})
+
+    async def edit_stop_orders(self, orders: list[dict]) -> list:
+        """
+        Перенос триггер-цены стоп-ордеров.
+
+        orders: [{"id", "symbol", "side", "amount", "trigger_price"}].
+        Где биржа умеет пакетное изменение — пачками EDIT_BATCH_LIMITS,
+        иначе по одному ордеру параллельно.
+
+        Returns:
+            по элементу на ордер: ордер ccxt или исключение
+        """
+        requests = [
+            {
+                "id": order["id"],
+                "symbol": order["symbol"],
+                "type": "market",
+                "side": order["side"],
+                "amount": order["amount"],
+                "price": None,
+                "params": {"triggerPrice": order["trigger_price"]},
+            }
+            for order in orders
+        ]
+
+        chunk = EDIT_BATCH_LIMITS.get(self.exchange_name)
+        if not chunk or not self.client.has.get("editOrders"):
+            return await asyncio.gather(
+                *(
+                    self._call(
+                        TRADING, self.client.edit_order, request["id"], request["symbol"],
+                        request["type"], request["side"], request["amount"], None, request["params"],
+                    )
+                    for request in requests
+                ),
+                return_exceptions=True,
+            )
+
+        results = []
+        for start in range(0, len(requests), chunk):
+            part = requests[start:start + chunk]
+            try:
+                edited = await self._call(TRADING, self.client.edit_orders, part)
+            except Exception as e:
+                results.extend([e] * len(part))
+                continue
+            # пакет отвечает по каждому ордеру: отклонённые — как ошибки
+            for order in edited:
+                if order.get("status") == "rejected":
+                    order = ValueError(f"изменение отклонено: {order.get('info')}")
+                results.append(order)
+        return results
+
     async def get_balance(self):
         """Получение баланса"""
         try:
-            balance = await self.client.fetch_balance()
+            balance = await self._call(ACCOUNT, self.client.fetch_balance)
             return balance
         except Exception as e:
             logger.error(f"Ошибка при получении баланса: {e}")
@@ -60,24 +250,21 @@ class ExchangeClient:
             if self.exchange_name == "bybit":
                 # Bybit требует установку плеча через set_leverage
                 # Формат: set_leverage(leverage, symbol, params={'marginMode': 'isolated'})
-                await self.client.set_leverage(leverage, symbol, params={'marginMode': 'isolated'})
+                await self._call(ACCOUNT, self.client.set_leverage, leverage, symbol, params={'marginMode': 'isolated'})
             elif hasattr(self.client, 'set_leverage'):
-                await self.client.set_leverage(leverage, symbol)
+                await self._call(ACCOUNT, self.client.set_leverage, leverage, symbol)
             elif hasattr(self.client, 'set_margin_mode'):
                 # Некоторые биржи требуют установки режима маржи
-                await self.client.set_margin_mode('isolated', symbol)
+                await self._call(ACCOUNT, self.client.set_margin_mode, 'isolated', symbol)
             else:
                 logger.warning(f"Биржа {self.exchange_name} не поддерживает установку плеча через CCXT")
-            logger.info(f"Установлено плечо {leverage}x для {symbol}")
+            logger.info("Установлено плечо %sx для %s", leverage, symbol)
+        except ccxt_errors.NoChange as e:
+            # плечо уже установлено — не критично
+            logger.warning(f"Плечо не было изменено для {symbol} (возможно, уже установлено): {e}")
         except Exception as e:
-            error_str = str(e)
-            # Если плечо уже установлено или не может быть изменено, это не критично
-            if "not modified" in error_str.lower() or "110043" in error_str:
-                logger.warning(f"Плечо не было изменено для {symbol} (возможно, уже установлено): {error_str}")
-                # Не поднимаем исключение, продолжаем работу
-            else:
-                logger.error(f"Ошибка при установке плеча для {symbol}: {e}")
-                raise
+            logger.error(f"Ошибка при установке плеча для {symbol}: {e}")
+            raise
 
     async def create_market_order(self, symbol: str, side: str, amount: float, params: dict = None):
         """Создание market ордера"""
@@ -93,8 +280,8 @@ class ExchangeClient:
                 else:
                     params.setdefault("positionIdx", 2)
 
-            order = await self.client.create_market_order(symbol, side, amount, params=params)
-            logger.info(f"Создан market ордер: {order['id']} для {symbol}")
+            order = await self._call(TRADING, self.client.create_market_order, symbol, side, amount, params=params)
+            logger.info("Создан market ордер: %s для %s", order['id'], symbol)
             return order
 
         except Exception as e:
@@ -118,10 +305,10 @@ class ExchangeClient:
         """Создание limit ордера"""
         try:
             if params:
-                order = await self.client.create_limit_order(symbol, side, amount, price, params=params)
+                order = await self._call(TRADING, self.client.create_limit_order, symbol, side, amount, price, params=params)
             else:
-                order = await self.client.create_limit_order(symbol, side, amount, price)
-            logger.info(f"Создан limit ордер: {order['id']} для {symbol} по цене {price}")
+                order = await self._call(TRADING, self.client.create_limit_order, symbol, side, amount, price)
+            logger.info("Создан limit ордер: %s для %s по цене %s", order['id'], symbol, price)
             return order
         except Exception as e:
             logger.error(f"Ошибка при создании limit ордера: {e}")
@@ -141,7 +328,9 @@ class ExchangeClient:
                 trigger_direction = "descending" if side == "sell" else "ascending"
                 
                 # Для Bybit фьючерсов используется тип 'Stop' с параметрами
-                order = await self.client.create_order(
+                order = await self._call(
+                    TRADING,
+                    self.client.create_order,
                     symbol=symbol,
                     type='Stop',  # Для Bybit фьючерсов
                     side=side,
@@ -154,14 +343,16 @@ class ExchangeClient:
                 )
             else:
                 # Для других бирж
-                order = await self.client.create_order(
+                order = await self._call(
+                    TRADING,
+                    self.client.create_order,
                     symbol=symbol,
                     type='stop_market',
                     side=side,
                     amount=amount,
                     params={'stopPrice': price}
                 )
-            logger.info(f"Создан стоп-лосс ордер: {order['id']} для {symbol} по цене {price}")
+            logger.info("Создан стоп-лосс ордер: %s для %s по цене %s", order['id'], symbol, price)
             return order
         except Exception as e:
             logger.error(f"Ошибка при создании стоп-лосс ордера: {e}")
@@ -173,7 +364,9 @@ class ExchangeClient:
             # Для Bybit фьючерсов тейк-профит устанавливается как limit ордер
             if self.exchange_name == "bybit":
                 # Для Bybit используем limit ордер с reduceOnly
-                order = await self.client.create_limit_order(
+                order = await self._call(
+                    TRADING,
+                    self.client.create_limit_order,
                     symbol=symbol,
                     side=side,
                     amount=amount,
@@ -182,16 +375,31 @@ class ExchangeClient:
                 )
             else:
                 # Для других бирж
-                order = await self.client.create_limit_order(symbol, side, amount, price)
-            logger.info(f"Создан тейк-профит ордер: {order['id']} для {symbol} по цене {price}")
+                order = await self._call(TRADING, self.client.create_limit_order, symbol, side, amount, price)
+            logger.info("Создан тейк-профит ордер: %s для %s по цене %s", order['id'], symbol, price)
             return order
         except Exception as e:
             logger.error(f"Ошибка при создании тейк-профит ордера: {e}")
             raise
 
 
-    async def set_position_tp_sl(self, symbol: str, stop_loss: float = None, take_profit: float = None):
-        """Установка TP/SL на позицию (для Bybit)"""
+    async def set_position_tp_sl(
+        self,
+        symbol: str,
+        stop_loss: float = None,
+        take_profit: float = None,
+        position_idx: int = None,
+    ):
+        """
+        Установка TP/SL на позицию (для Bybit)
+
+        position_idx известен, если позиция уже получена (сверка) —
+        тогда позиция по символу не запрашивается.
+
+        Returns:
+            ответ биржи; None — биржа не поддерживает или позиции нет.
+            Ошибка биржи поднимается.
+        """
         try:
             if self.exchange_name != "bybit":
                 logger.warning(f"Установка TP/SL на позицию не поддерживается для {self.exchange_name}")
@@ -199,21 +407,22 @@ class ExchangeClient:
 
             symbol_clean = symbol.replace('/', '').replace(':USDT', '')
 
-            # ---- 🔍 Получаем открытую позицию чтобы понять positionIdx ----
-            positions = await self.client.private_get_v5_position_list({
-                "category": "linear",
-                "symbol": symbol_clean
-            })
+            if position_idx is None:
+                # ---- 🔍 Получаем открытую позицию чтобы понять positionIdx ----
+                positions = await self._call(ACCOUNT, self.client.private_get_v5_position_list, {
+                    "category": "linear",
+                    "symbol": symbol_clean
+                })
 
-            position = None
-            if positions and positions["result"]["list"]:
-                position = positions["result"]["list"][0]
+                position = None
+                if positions and positions["result"]["list"]:
+                    position = positions["result"]["list"][0]
 
-            if not position:
-                logger.warning(f"Нет открытой позиции для {symbol}, TP/SL не устанавливаем")
-                return None
+                if not position:
+                    logger.warning(f"Нет открытой позиции для {symbol}, TP/SL не устанавливаем")
+                    return None
 
-            position_idx = int(position["positionIdx"])
+                position_idx = int(position["positionIdx"])
 
             params = {
                 "category": "linear",
@@ -227,18 +436,18 @@ class ExchangeClient:
             if take_profit:
                 params["takeProfit"] = str(take_profit)
 
-            result = await self.client.private_post_v5_position_trading_stop(params)
+            result = await self._call(TRADING, self.client.private_post_v5_position_trading_stop, params)
 
             logger.info(
-                f"TP/SL установлены для {symbol} "
-                f"(idx={position_idx}): SL={stop_loss}, TP={take_profit}"
+                "TP/SL установлены для %s (idx=%s): SL=%s, TP=%s",
+                symbol, position_idx, stop_loss, take_profit,
             )
 
             return result
 
         except Exception as e:
             logger.error(f"Ошибка при установке TP/SL на позицию: {e}")
-            return None
+            raise
 
     # async def set_position_tp_sl(self, symbol: str, stop_loss: float = None, take_profit: float = None):
     #     """Установка TP/SL на позицию (для Bybit)"""
@@ -0,0 +1,453 @@
+import asyncio
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Optional
+
+from app.config.settings import settings
+from app.exchange.client import ExchangeClient
+from app.exchange.market_data import market_data
+from app.utils.logger import logger
+
+
+class ParentOrder:
+    """
+    Родительский ордер алгоритма исполнения и его прогресс.
+    """
+
+    RUNNING = "running"
+    DONE = "done"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+
+    def __init__(
+        self,
+        exchange: str,
+        symbol: str,
+        side: str,
+        amount: float,
+        algo: str,
+        params: Optional[dict] = None,
+    ):
+        self.parent_id = uuid.uuid4().hex[:16]
+        self.exchange = exchange
+        self.symbol = symbol
+        self.side = side
+        self.amount = amount
+        self.algo = algo
+        self.params = params or {}
+
+        self.status = self.RUNNING
+        self.filled = 0.0
+        self.notional = 0.0             # по кускам с известной ценой
+        self.priced = 0.0               # объём этих кусков
+        self.children: list[dict] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def remaining(self) -> float:
+        return max(self.amount - self.filled, 0.0)
+
+    @property
+    def average_price(self) -> Optional[float]:
+        return self.notional / self.priced if self.priced else None
+
+    def add_fill(self, order: dict, amount: float, price: Optional[float]) -> None:
+        self.children.append({
+            "id": order.get("id"),
+            "amount": amount,
+            "price": price,
+            "ts": time.time(),
+        })
+        # объём учитывается всегда, иначе остаток не уменьшится и алгоритм
+        # пошлёт больше родительского ордера; цена — только если известна
+        if amount:
+            self.filled += amount
+            if price:
+                self.priced += amount
+                self.notional += amount * price
+
+    def to_dict(self) -> dict:
+        return {
+            "parent_id": self.parent_id,
+            "exchange": self.exchange,
+            "symbol": self.symbol,
+            "side": self.side,
+            "algo": self.algo,
+            "status": self.status,
+            "amount": self.amount,
+            "filled": self.filled,
+            "progress": round(self.filled / self.amount, 4) if self.amount else 0.0,
+            "average_price": self.average_price,
+            "children": len(self.children),
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+# ----------------------------------------------------------------------
+# ALGORITHMS
+# ----------------------------------------------------------------------
+
+class ExecutionAlgo(ABC):
+    """
+    Базовый алгоритм: делит родительский ордер на дочерние.
+
+    Реализации решают, когда и каким куском идти (_market_child /
+    _limit_child), фиксация исполнения и уведомления — общие.
+    Остановка (stop) проверяется между кусками: исполненный кусок
+    всегда успевает получить SL / TP.
+    """
+
+    name = "base"
+
+    def __init__(self, client: ExchangeClient, parent: ParentOrder, on_fill):
+        self.client = client
+        self.parent = parent
+        self.on_fill = on_fill
+        self.quantizer = client.get_quantizer(parent.symbol)
+        self._stop = asyncio.Event()
+
+    @abstractmethod
+    async def run(self) -> None:
+        """Исполняет родительский ордер кусками до остатка 0 или остановки"""
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    def stop(self) -> None:
+        """Не начинать новых кусков"""
+        self._stop.set()
+
+    async def _pause(self, seconds: float) -> None:
+        """Пауза между кусками, прерываемая остановкой"""
+        try:
+            await asyncio.wait_for(self._stop.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    def _clip(self, amount: float) -> float:
+        """Кусок, не больше остатка, округлённый к шагу лота; 0 — меньше минимума"""
+        clip = self.quantizer.amount(min(amount, self.parent.remaining))
+        if self.quantizer.min_amount and clip < self.quantizer.min_amount:
+            return 0.0
+        return clip
+
+    async def _market_child(self, amount: float) -> None:
+        order = await self.client.create_market_order(
+            self.parent.symbol, self.parent.side, amount, params=dict(self.parent.params)
+        )
+        filled, price = await self._resolve_fill(order, amount)
+        await self._record(order, filled, price)
+
+    async def _limit_child(
+        self, amount: float, price: float, timeout: float, extra_params: Optional[dict] = None
+    ) -> float:
+        """Limit-кусок: ждёт исполнения до timeout, остаток отменяет. Возвращает исполненное"""
+        order = await self.client.create_limit_order(
+            self.parent.symbol,
+            self.parent.side,
+            amount,
+            price,
+            params={**self.parent.params, **(extra_params or {})},
+        )
+        order = await self._wait_order(order, timeout)
+        if order.get("status") == "open":
+            try:
+                await self.client.cancel_order(order["id"], self.parent.symbol)
+                order = await self.client.fetch_order(order["id"], self.parent.symbol)
+            except Exception as e:
+                logger.warning(f"[ALGO] {self.parent.parent_id}: отмена {order.get('id')} не удалась: {e}")
+
+        filled = self.quantizer.amount(order.get("filled") or 0.0)
+        await self._record(order, filled, order.get("average") or price)
+        return filled
+
+    async def _wait_order(self, order: dict, timeout: float) -> dict:
+        deadline = time.monotonic() + timeout
+        poll = min(max(timeout / 10, 0.2), 1.0)
+        while True:
+            try:
+                order = await self.client.fetch_order(order["id"], self.parent.symbol)
+            except Exception as e:
+                logger.warning(f"[ALGO] {self.parent.parent_id}: статус {order.get('id')} недоступен: {e}")
+            if order.get("status") in ("closed", "canceled", "rejected", "expired"):
+                return order
+            if time.monotonic() >= deadline:
+                return order
+            await asyncio.sleep(poll)
+
+    async def _resolve_fill(self, order: dict, amount: float) -> tuple[float, Optional[float]]:
+        filled = order.get("filled")
+        price = order.get("average") or order.get("price")
+        if filled is None or not price:
+            try:
+                status = await self.client.fetch_order(order["id"], self.parent.symbol)
+                filled = status.get("filled", filled)
+                price = status.get("average") or price
+            except Exception as e:
+                logger.warning(f"[ALGO] {self.parent.parent_id}: исполнение {order.get('id')} неизвестно: {e}")
+        if filled is None:
+            filled = amount
+        if not price:
+            ticker = market_data.get(self.parent.exchange, self.parent.symbol)
+            price = ticker.last if ticker else None
+        return filled, price
+
+    async def _record(self, order: dict, filled: float, price: Optional[float]) -> None:
+        self.parent.add_fill(order, filled, price)
+        # сумма float-кусков копит ошибку представления — держим объём на шаге лота
+        self.parent.filled = self.quantizer.amount(self.parent.filled)
+        logger.info(
+            "[ALGO] %s %s %s | child %s | filled=%s @ %s | %s/%s",
+            self.parent.parent_id, self.name, self.parent.symbol, order.get("id"),
+            filled, price, self.parent.filled, self.parent.amount,
+        )
+        if filled and self.on_fill:
+            await self.on_fill(self.parent)
+
+    async def _touch_price(self, passive: bool) -> float:
+        """
+        Лучшая цена: passive — своя сторона (bid для покупки),
+        иначе — противоположная (ask для покупки).
+        """
+        ticker = await market_data.ticker(self.parent.exchange, self.parent.symbol, max_age=0.5)
+        buy = self.parent.side == "buy"
+        price = (ticker.bid if buy else ticker.ask) if passive else (ticker.ask if buy else ticker.bid)
+        price = price or ticker.last
+        if not price:
+            raise ValueError(f"Нет цены {self.parent.symbol} для дочернего ордера")
+        return self.quantizer.price(price)
+
+
+class TwapAlgo(ExecutionAlgo):
+    """
+    TWAP: равные market-куски через равные интервалы.
+    """
+
+    name = "twap"
+
+    def __init__(self, client, parent, on_fill, slices: int, duration: float):
+        super().__init__(client, parent, on_fill)
+        self.slices = max(slices, 1)
+        self.duration = duration
+
+    async def run(self) -> None:
+        slices = self.slices
+        if self.quantizer.min_amount:
+            # кусок не может быть меньше минимального лота
+            slices = max(1, min(slices, int(self.parent.amount / self.quantizer.min_amount)))
+        interval = self.duration / slices if slices > 1 else 0.0
+
+        for index in range(slices):
+            if self.stopping:
+                break
+            left = slices - index
+            clip = self._clip(self.parent.remaining / left if left > 1 else self.parent.remaining)
+            if not clip:
+                break
+            await self._market_child(clip)
+            if left > 1:
+                await self._pause(interval)
+
+
+class IcebergAlgo(ExecutionAlgo):
+    """
+    Айсберг: видимый кусок limit по лучшей встречной цене; следующий
+    кусок — сразу после исполнения предыдущего (по ликвидности).
+    Кусок, не исполненный за timeout, снимается и перевыставляется.
+    """
+
+    name = "iceberg"
+
+    def __init__(self, client, parent, on_fill, clip_notional: float, timeout: float, max_duration: float):
+        super().__init__(client, parent, on_fill)
+        self.clip_notional = clip_notional
+        self.timeout = timeout
+        self.max_duration = max_duration
+
+    async def run(self) -> None:
+        deadline = time.monotonic() + self.max_duration
+        while self.parent.remaining and time.monotonic() < deadline and not self.stopping:
+            price = await self._touch_price(passive=False)
+            clip = self._clip(self.clip_notional / price)
+            if not clip:
+                break
+            await self._limit_child(clip, price, self.timeout)
+
+
+class PostOnlyChaseAlgo(ExecutionAlgo):
+    """
+    Post-only с погоней: limit maker на лучшей своей цене; если цена
+    ушла, ордер снимается и переставляется. После max_chases остаток
+    добирается market-ордером.
+    """
+
+    name = "post_only"
+
+    def __init__(self, client, parent, on_fill, chase_interval: float, max_chases: int):
+        super().__init__(client, parent, on_fill)
+        self.chase_interval = chase_interval
+        self.max_chases = max_chases
+
+    async def run(self) -> None:
+        for _ in range(self.max_chases):
+            if self.stopping:
+                return
+            clip = self._clip(self.parent.remaining)
+            if not clip:
+                return
+            price = await self._touch_price(passive=True)
+            try:
+                await self._limit_child(clip, price, self.chase_interval, {"postOnly": True})
+            except Exception as e:
+                # post-only отклоняется, если цена успела стать встречной
+                logger.info(f"[ALGO] {self.parent.parent_id}: post-only отклонён ({e}), переставляем")
+
+        clip = self._clip(self.parent.remaining)
+        if clip and not self.stopping:
+            await self._market_child(clip)
+
+
+ALGORITHMS = ("twap", "iceberg", "post_only")
+
+
+def build_algo(name: str, client: ExchangeClient, parent: ParentOrder, on_fill) -> ExecutionAlgo:
+    """Алгоритм по имени с параметрами из настроек"""
+    if name == "twap":
+        return TwapAlgo(
+            client, parent, on_fill,
+            slices=settings.twap_slices,
+            duration=settings.twap_duration,
+        )
+    if name == "iceberg":
+        return IcebergAlgo(
+            client, parent, on_fill,
+            clip_notional=settings.iceberg_clip_usdt,
+            timeout=settings.algo_child_timeout,
+            max_duration=settings.algo_max_duration,
+        )
+    if name == "post_only":
+        return PostOnlyChaseAlgo(
+            client, parent, on_fill,
+            chase_interval=settings.algo_child_timeout,
+            max_chases=settings.post_only_max_chases,
+        )
+    raise ValueError(f"Неизвестный алгоритм исполнения: {name}")
+
+
+# ----------------------------------------------------------------------
+# SCHEDULER
+# ----------------------------------------------------------------------
+
+class ExecutionScheduler:
+    """
+    Параллельное исполнение родительских ордеров.
+
+    Каждый родитель — отдельная задача; дочерние ордера всех родителей
+    идут через общий клиент биржи и его лимитер запросов. Завершённые
+    родители хранятся KEEP_FINISHED секунд для API прогресса.
+    """
+
+    KEEP_FINISHED = 3600.0
+
+    def __init__(self):
+        self._parents: dict[str, ParentOrder] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._algos: dict[str, ExecutionAlgo] = {}
+
+    def submit(
+        self,
+        client: ExchangeClient,
+        parent: ParentOrder,
+        on_fill: Optional[Callable[[ParentOrder], Awaitable[None]]] = None,
+        on_done: Optional[Callable[[ParentOrder], Awaitable[None]]] = None,
+    ) -> ParentOrder:
+        """Запускает алгоритм в фоне и сразу возвращает родителя"""
+        self._forget_finished()
+        algo = build_algo(parent.algo, client, parent, on_fill)
+        self._parents[parent.parent_id] = parent
+        self._algos[parent.parent_id] = algo
+        self._tasks[parent.parent_id] = asyncio.create_task(self._run(algo, on_done))
+        logger.info(
+            "[ALGO] %s %s %s %s amount=%s",
+            parent.parent_id, parent.algo, parent.symbol, parent.side, parent.amount,
+        )
+        return parent
+
+    async def _run(self, algo: ExecutionAlgo, on_done) -> None:
+        parent = algo.parent
+        try:
+            await algo.run()
+            parent.status = ParentOrder.CANCELLED if algo.stopping else ParentOrder.DONE
+        except asyncio.CancelledError:
+            parent.status = ParentOrder.CANCELLED
+        except Exception as e:
+            parent.status = ParentOrder.FAILED
+            parent.error = str(e)
+            logger.error(f"[ALGO] {parent.parent_id}: ошибка исполнения: {e}")
+        finally:
+            parent.finished_at = time.time()
+            self._tasks.pop(parent.parent_id, None)
+            self._algos.pop(parent.parent_id, None)
+            logger.info(
+                "[ALGO] %s %s: %s/%s avg=%s",
+                parent.parent_id, parent.status, parent.filled, parent.amount, parent.average_price,
+            )
+            if on_done:
+                try:
+                    await on_done(parent)
+                except Exception as e:
+                    logger.error(f"[ALGO] {parent.parent_id}: ошибка завершения: {e}")
+
+    def get(self, parent_id: str) -> Optional[ParentOrder]:
+        return self._parents.get(parent_id)
+
+    def list(self) -> list[ParentOrder]:
+        return list(self._parents.values())
+
+    def cancel(self, parent_id: str) -> bool:
+        """Остановка после текущего куска (он успевает получить SL / TP)"""
+        algo = self._algos.get(parent_id)
+        if algo is None:
+            return False
+        algo.stop()
+        return True
+
+    async def drain(self, timeout: float) -> None:
+        """
+        Останавливает все алгоритмы между кусками и ждёт их не дольше
+        timeout; не успевшие — прерываются.
+        """
+        tasks = list(self._tasks.values())
+        if not tasks:
+            return
+        for algo in self._algos.values():
+            algo.stop()
+        logger.info(f"[ALGO] остановка {len(tasks)} исполнений")
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        if pending:
+            logger.error(f"[ALGO] {len(pending)} исполнений прерваны по таймауту остановки")
+        await self.stop()
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _forget_finished(self) -> None:
+        horizon = time.time() - self.KEEP_FINISHED
+        for parent_id in [
+            parent_id for parent_id, parent in self._parents.items()
+            if parent.finished_at and parent.finished_at < horizon
+        ]:
+            del self._parents[parent_id]
+
+
+# Общий планировщик процесса
+execution_scheduler = ExecutionScheduler()
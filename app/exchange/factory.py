@@ -1,9 +1,14 @@
 from typing import Optional
 from app.exchange.client import ExchangeClient
+from app.exchange.paper import PaperExchangeClient
+from app.exchange.cassette import cassette
 from app.config.settings import settings
 from app.utils.logger import logger
 
 
+SUPPORTED_EXCHANGES = ("binance", "okx", "bybit", "bitget")
+
+
 class ExchangeFactory:
     """Фабрика для создания клиентов бирж"""
     
@@ -19,13 +24,24 @@ class ExchangeFactory:
             ExchangeClient
         """
         exchange_name = exchange_name.lower()
+
+        # Воспроизведение кассеты: ответы из записи, ключи не используются
+        if cassette.replaying:
+            return ExchangeClient(exchange_name, "replay", "replay", passphrase="replay")
+
+        # Бумажная торговля: публичные данные биржи, ордера в памяти
+        if settings.paper_trading:
+            if exchange_name not in SUPPORTED_EXCHANGES:
+                raise ValueError(f"Неподдерживаемая биржа: {exchange_name}")
+            return PaperExchangeClient(exchange_name, pro=settings.exchange_streams)
         
         if exchange_name == "binance":
             return ExchangeClient(
                 exchange_name="binance",
                 api_key=settings.binance_api_key,
                 api_secret=settings.binance_api_secret,
-                sandbox=settings.binance_sandbox
+                sandbox=settings.binance_sandbox,
+                pro=settings.exchange_streams,
             )
         elif exchange_name == "okx":
             return ExchangeClient(
@@ -33,7 +49,8 @@ class ExchangeFactory:
                 api_key=settings.okx_api_key,
                 api_secret=settings.okx_api_secret,
                 passphrase=settings.okx_passphrase,
-                sandbox=settings.okx_sandbox
+                sandbox=settings.okx_sandbox,
+                pro=settings.exchange_streams,
             )
         elif exchange_name == "bybit":
             if not settings.bybit_api_key or not settings.bybit_api_secret:
@@ -44,7 +61,8 @@ class ExchangeFactory:
                 exchange_name="bybit",
                 api_key=settings.bybit_api_key,
                 api_secret=settings.bybit_api_secret,
-                sandbox=settings.bybit_sandbox
+                sandbox=settings.bybit_sandbox,
+                pro=settings.exchange_streams,
             )
         elif exchange_name == "bitget":
             return ExchangeClient(
@@ -52,11 +70,23 @@ class ExchangeFactory:
                 api_key=settings.bitget_api_key,
                 api_secret=settings.bitget_api_secret,
                 passphrase=settings.bitget_passphrase,
-                sandbox=settings.bitget_sandbox
+                sandbox=settings.bitget_sandbox,
+                pro=settings.exchange_streams,
             )
         else:
             raise ValueError(f"Неподдерживаемая биржа: {exchange_name}")
     
+    @staticmethod
+    def configured_exchanges() -> list[str]:
+        """Биржи, для которых в .env указаны API ключи (в paper режиме ещё и EXCHANGE)"""
+        return [
+            exchange_name
+            for exchange_name in SUPPORTED_EXCHANGES
+            if getattr(settings, f"{exchange_name}_api_key")
+            and getattr(settings, f"{exchange_name}_api_secret")
+            or (settings.paper_trading and exchange_name == settings.exchange)
+        ]
+
     @staticmethod
     def get_symbol_format(exchange_name: str, symbol: str, contract_type: str) -> str:
         """
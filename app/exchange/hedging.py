@@ -0,0 +1,259 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+from app.config.settings import settings
+from app.exchange.cassette import cassette
+from app.exchange.loader import load_exchange_class
+from app.utils.logger import logger
+
+# Запасные адреса API; у остальных бирж дубль идёт по второму соединению
+ALTERNATE_HOSTS = {
+    "bybit": "bytick.com",
+    "okx": "aws.okx.com",
+}
+
+
+class LatencyTracker:
+    """
+    Задержки ответов одного метода одной биржи в скользящем окне.
+
+    Порог хеджирования (перцентиль окна) пересчитывается не на каждый
+    вызов, а раз в RECOMPUTE_EVERY новых замеров.
+    """
+
+    RECOMPUTE_EVERY = 16
+
+    __slots__ = ("samples", "percentile", "_threshold", "_since")
+
+    def __init__(self, window: int, percentile: float):
+        self.samples: deque[float] = deque(maxlen=window)
+        self.percentile = percentile
+        self._threshold: Optional[float] = None
+        self._since = 0
+
+    def add(self, latency: float) -> None:
+        self.samples.append(latency)
+        self._since += 1
+
+    def threshold(self) -> Optional[float]:
+        """Через сколько секунд отправлять дубль; None — замеров ещё мало"""
+        if len(self.samples) < settings.hedge_min_samples:
+            return None
+        if self._threshold is None or self._since >= self.RECOMPUTE_EVERY:
+            ordered = sorted(self.samples)
+            index = min(int(len(ordered) * self.percentile), len(ordered) - 1)
+            self._threshold = max(ordered[index], settings.hedge_min_delay)
+            self._since = 0
+        return self._threshold
+
+
+class HedgeStats:
+    """Счётчики и бюджет дублей одной биржи"""
+
+    __slots__ = ("tokens", "calls", "hedged", "hedge_wins", "primary_wins", "budget_skipped")
+
+    def __init__(self):
+        self.tokens = settings.hedge_burst
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+        self.budget_skipped = 0
+
+    def deposit(self) -> None:
+        self.calls += 1
+        self.tokens = min(settings.hedge_burst, self.tokens + settings.hedge_max_ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1.0:
+            self.budget_skipped += 1
+            return False
+        self.tokens -= 1.0
+        self.hedged += 1
+        return True
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": self.hedged / self.calls if self.calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "primary_wins": self.primary_wins,
+            "budget_skipped": self.budget_skipped,
+        }
+
+
+class HedgedReads:
+    """
+    Хеджирование чтений рыночных данных.
+
+    Если основной запрос не ответил за перцентиль hedge_percentile
+    своих недавних задержек, тот же запрос уходит по второму
+    соединению (запасной адрес API, где он есть) и берётся первый
+    ответ; проигравший отменяется. Дубли ограничены бюджетом биржи:
+    не больше hedge_max_ratio от числа чтений (запас hedge_burst),
+    поэтому нагрузка остаётся в лимитах запросов.
+
+    Только чтения: повтор чтения не меняет состояние аккаунта.
+    """
+
+    def __init__(self):
+        self._trackers: dict[tuple[str, str], LatencyTracker] = {}
+        self._stats: dict[str, HedgeStats] = {}
+        # биржа -> (публичный ccxt клиент, markets основного клиента при синхронизации)
+        self._alternates: dict[str, tuple[Any, Any]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        # в воспроизведении кассеты дубль израсходовал бы чужую запись
+        return settings.hedged_reads and not cassette.replaying
+
+    def _tracker(self, exchange_name: str, name: str) -> LatencyTracker:
+        key = (exchange_name, name)
+        tracker = self._trackers.get(key)
+        if tracker is None:
+            tracker = LatencyTracker(settings.hedge_window, settings.hedge_percentile)
+            self._trackers[key] = tracker
+        return tracker
+
+    def stats(self, exchange_name: str) -> HedgeStats:
+        stats = self._stats.get(exchange_name)
+        if stats is None:
+            stats = HedgeStats()
+            self._stats[exchange_name] = stats
+        return stats
+
+    # ------------------------------------------------------------------
+    # ALTERNATE CONNECTION
+    # ------------------------------------------------------------------
+
+    def alternate(self, client) -> Any:
+        """
+        Публичный ccxt клиент биржи для дублей (свой пул соединений).
+
+        Рынки берутся у основного клиента без запроса к бирже.
+        """
+        exchange_name = client.exchange_name
+        entry = self._alternates.get(exchange_name)
+        if entry is None:
+            exchange_class = load_exchange_class(exchange_name)
+            config = {
+                'enableRateLimit': True,
+                'rateLimit': exchange_class.rateLimit * max(settings.web_workers, 1),
+                'options': {
+                    'defaultType': 'future',
+                },
+            }
+            if exchange_name in ALTERNATE_HOSTS and not client.sandbox:
+                config['hostname'] = ALTERNATE_HOSTS[exchange_name]
+            alternate = exchange_class(config)
+            if client.sandbox:
+                alternate.set_sandbox_mode(True)
+            entry = (alternate, None)
+            logger.info(f"[HEDGE] второе соединение {exchange_name} ({config.get('hostname', 'основной адрес')})")
+
+        alternate, synced = entry
+        markets = client.client.markets
+        if markets and markets is not synced:
+            alternate.set_markets(markets, client.client.currencies)
+            synced = markets
+        self._alternates[exchange_name] = (alternate, synced)
+        return alternate
+
+    async def close(self) -> None:
+        for alternate, _ in self._alternates.values():
+            try:
+                await alternate.close()
+            except Exception as e:
+                logger.warning(f"[HEDGE] закрытие соединения: {e}")
+        self._alternates.clear()
+
+    # ------------------------------------------------------------------
+    # CALL
+    # ------------------------------------------------------------------
+
+    async def call(
+        self,
+        exchange_name: str,
+        name: str,
+        primary: Callable[[], Awaitable[Any]],
+        alternate: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Основной запрос; дубль — если он дольше порога и бюджет позволяет"""
+        stats = self.stats(exchange_name)
+        tracker = self._tracker(exchange_name, name)
+        stats.deposit()
+
+        started = time.perf_counter()
+        primary_task = asyncio.ensure_future(primary())
+        tasks = [primary_task]
+        try:
+            delay = tracker.threshold()
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and stats.withdraw():
+                    tasks.append(asyncio.ensure_future(alternate()))
+                    result = await self._first_success(tasks, stats)
+                    # при победе дубля это нижняя оценка задержки основного запроса
+                    tracker.add(time.perf_counter() - started)
+                    return result
+
+            result = await primary_task
+            tracker.add(time.perf_counter() - started)
+            return result
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    async def _first_success(tasks: list[asyncio.Future], stats: HedgeStats) -> Any:
+        """Первый успешный ответ; ошибка — только если не ответил ни один"""
+        primary_task, hedge_task = tasks
+        pending = set(tasks)
+        while pending:
+            _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # одновременный ответ засчитывается основному запросу
+            for task in tasks:
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    if task is hedge_task:
+                        stats.hedge_wins += 1
+                    else:
+                        stats.primary_wins += 1
+                    return task.result()
+        # обе попытки с ошибкой — причина основного запроса
+        return primary_task.result()
+
+    # ------------------------------------------------------------------
+    # METRICS
+    # ------------------------------------------------------------------
+
+    def metrics(self) -> str:
+        """Дубли и победы по биржам в текстовом формате Prometheus"""
+        series = {
+            "exchange_hedge_reads_total": "calls",
+            "exchange_hedges_total": "hedged",
+            "exchange_hedge_wins_total": "hedge_wins",
+            "exchange_hedge_primary_wins_total": "primary_wins",
+            "exchange_hedge_budget_skipped_total": "budget_skipped",
+        }
+        lines = []
+        for metric, field in series.items():
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(
+                f'{metric}{{exchange="{exchange_name}"}} {getattr(stats, field)}'
+                for exchange_name, stats in sorted(self._stats.items())
+            )
+        lines.append("# TYPE exchange_hedge_threshold_seconds gauge")
+        lines.extend(
+            f'exchange_hedge_threshold_seconds{{exchange="{exchange_name}",method="{name}"}} {threshold:.4f}'
+            for (exchange_name, name), tracker in sorted(self._trackers.items())
+            if (threshold := tracker.threshold()) is not None
+        )
+        return "\n".join(lines) + "\n"
+
+
+# Общий хеджер процесса (HEDGED_READS=false — чтения идут без дублей)
+hedged_reads = HedgedReads()
@@ -0,0 +1,128 @@
+import importlib
+import importlib.metadata
+import importlib.util
+import os
+import sys
+import types
+
+
+# Пакеты ccxt, чьи __init__ импортируют все 100+ бирж разом
+_PACKAGES = ("ccxt", "ccxt.async_support", "ccxt.pro")
+
+_classes: dict[tuple[str, bool], type] = {}
+_mode: str | None = None  # "lazy" | "full"
+
+
+def _install_light_packages() -> None:
+    """
+    Регистрирует пакеты ccxt в sys.modules без выполнения их __init__.
+
+    Подмодули (base, async_support.bybit, ...) импортируются обычным
+    механизмом по __path__, а пакетам достаточно тех атрибутов, которые
+    берёт из них сам ccxt: исключения, константы точности, __version__.
+    """
+    spec = importlib.util.find_spec("ccxt")
+    root = spec.submodule_search_locations[0]
+
+    for name in _PACKAGES:
+        package = types.ModuleType(name)
+        package.__path__ = [os.path.join(root, *name.split(".")[1:])]
+        package.__package__ = name
+        package.__version__ = importlib.metadata.version("ccxt")
+        sys.modules[name] = package
+        if "." in name:
+            parent, child = name.rsplit(".", 1)
+            setattr(sys.modules[parent], child, package)
+
+    errors = importlib.import_module("ccxt.base.errors")
+    precision = importlib.import_module("ccxt.base.decimal_to_precision")
+    exported = {
+        name: value
+        for module in (errors, precision)
+        for name, value in vars(module).items()
+        if not name.startswith("_")
+    }
+    for name in _PACKAGES:
+        vars(sys.modules[name]).update(exported)
+        # ccxt.base.errors доступен как ccxt.errors, как в полном пакете
+        sys.modules[name].errors = errors
+
+    # базовые классы: синхронный в ccxt, асинхронный в async_support и pro
+    sys.modules["ccxt"].Exchange = importlib.import_module("ccxt.base.exchange").Exchange
+    async_exchange = importlib.import_module("ccxt.async_support.base.exchange").Exchange
+    sys.modules["ccxt.async_support"].Exchange = async_exchange
+    sys.modules["ccxt.pro"].Exchange = async_exchange
+
+
+def _select_mode() -> str:
+    global _mode
+    if _mode is not None:
+        return _mode
+
+    if "ccxt" in sys.modules:
+        # ccxt уже импортирован целиком кем-то ещё — просто пользуемся им
+        _mode = "full"
+        return _mode
+
+    try:
+        _install_light_packages()
+        _mode = "lazy"
+    except Exception:
+        # неизвестная раскладка пакета — откатываемся к полному импорту
+        for name in list(sys.modules):
+            if name == "ccxt" or name.startswith("ccxt."):
+                del sys.modules[name]
+        importlib.import_module("ccxt.async_support")
+        _mode = "full"
+    return _mode
+
+
+def import_ccxt(module_name: str) -> types.ModuleType:
+    """
+    Импорт служебного модуля ccxt (base.errors, base.decimal_to_precision, ...)
+
+    Все импорты ccxt в приложении идут через загрузчик: прямой
+    `import ccxt` до него выполнил бы полный __init__ со всеми биржами.
+    """
+    _select_mode()
+    return importlib.import_module(module_name)
+
+
+def load_exchange_class(exchange_name: str, pro: bool = False) -> type:
+    """
+    Класс биржи ccxt с импортом только её модуля
+
+    Args:
+        exchange_name: id биржи в ccxt (binance, okx, bybit, bitget)
+        pro: websocket-версия из ccxt.pro (наследуется от async_support)
+
+    Returns:
+        класс биржи (ccxt.async_support.<name> или ccxt.pro.<name>)
+    """
+    key = (exchange_name, pro)
+    exchange_class = _classes.get(key)
+    if exchange_class is not None:
+        return exchange_class
+
+    if _select_mode() == "full":
+        package = importlib.import_module("ccxt.pro" if pro else "ccxt.async_support")
+        exchange_class = getattr(package, exchange_name)
+    else:
+        # ccxt.pro.<name> наследуется от атрибута ccxt.async_support.<name>,
+        # поэтому async-класс всегда загружается первым
+        async_package = sys.modules["ccxt.async_support"]
+        async_class = getattr(
+            importlib.import_module(f"ccxt.async_support.{exchange_name}"), exchange_name
+        )
+        # импорт подмодуля привязал к пакету модуль — как в полном ccxt, нужен класс
+        setattr(async_package, exchange_name, async_class)
+        exchange_class = async_class
+
+        if pro:
+            exchange_class = getattr(
+                importlib.import_module(f"ccxt.pro.{exchange_name}"), exchange_name
+            )
+            setattr(sys.modules["ccxt.pro"], exchange_name, exchange_class)
+
+    _classes[key] = exchange_class
+    return exchange_class
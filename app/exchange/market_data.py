@@ -0,0 +1,207 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Callable, NamedTuple, Optional
+
+from app.config.settings import settings
+from app.exchange.pool import exchange_pool
+from app.utils.deadline import active_deadline
+from app.utils.logger import logger
+
+
+class Ticker(NamedTuple):
+    """
+    Вершина стакана и последняя цена символа.
+    """
+    bid: Optional[float]
+    ask: Optional[float]
+    last: Optional[float]
+    updated_at: float           # time.monotonic() получения
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.updated_at
+
+
+TickListener = Callable[[str, str, Ticker], None]
+
+
+class MarketDataCache:
+    """
+    Кэш тикеров по биржам.
+
+    Символы, к которым обращались за последние WATCH_SECONDS, обновляются
+    в фоне одним fetch_tickers на биржу; чтение из кэша не делает сетевых запросов.
+    Промах или устаревший тикер запрашивается сразу, параллельные
+    промахи одной биржи объединяются в один запрос.
+
+    При exchange_streams отслеживаемые символы биржи получают тикеры
+    из потока ccxt.pro watch_tickers, и опрос эту биржу пропускает.
+    Подписчики (subscribe) получают каждый новый тикер синхронно.
+    """
+
+    WATCH_SECONDS = 600.0
+
+    def __init__(self, ttl: float, refresh_interval: float):
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self._tickers: dict[tuple[str, str], Ticker] = {}
+        # exchange -> symbol -> время последнего чтения
+        self._watched: dict[str, dict[str, float]] = defaultdict(dict)
+        self._inflight: dict[tuple[str, str], asyncio.Task] = {}
+        self._streams: dict[str, asyncio.Task] = {}
+        self._listeners: list[TickListener] = []
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for task in self._streams.values():
+            task.cancel()
+        self._streams.clear()
+
+    def subscribe(self, listener: TickListener) -> None:
+        """listener(exchange, symbol, ticker) на каждый новый тикер (без await)"""
+        self._listeners.append(listener)
+
+    def watch(self, exchange_name: str, symbol: str) -> None:
+        """Держит символ в фоновом обновлении без чтения тикера"""
+        self._watched[exchange_name][symbol] = time.monotonic()
+        if settings.exchange_streams and exchange_name not in self._streams:
+            self._streams[exchange_name] = asyncio.create_task(self._stream(exchange_name))
+
+    # ------------------------------------------------------------------
+    # READ
+    # ------------------------------------------------------------------
+
+    def get(self, exchange_name: str, symbol: str) -> Optional[Ticker]:
+        """Тикер из кэша (без сети), даже устаревший"""
+        return self._tickers.get((exchange_name, symbol))
+
+    async def ticker(
+        self, exchange_name: str, symbol: str, max_age: Optional[float] = None
+    ) -> Ticker:
+        """Тикер не старше max_age (по умолчанию ttl)"""
+        max_age = self.ttl if max_age is None else max_age
+        self.watch(exchange_name, symbol)
+
+        cached = self._tickers.get((exchange_name, symbol))
+        if cached is not None and cached.age <= max_age:
+            return cached
+
+        key = (exchange_name, symbol)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_ticker(exchange_name, symbol))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # общий запрос не прерываем: его ждут и другие сделки
+        deadline = active_deadline()
+        if deadline is not None:
+            return await deadline.wait_for(asyncio.shield(task), "ticker")
+        return await asyncio.shield(task)
+
+    async def last_price(self, exchange_name: str, symbol: str) -> Optional[float]:
+        return (await self.ticker(exchange_name, symbol)).last
+
+    # ------------------------------------------------------------------
+    # REFRESH
+    # ------------------------------------------------------------------
+
+    def _store(self, exchange_name: str, symbol: str, raw: dict) -> Ticker:
+        ticker = Ticker(
+            bid=raw.get("bid"),
+            ask=raw.get("ask"),
+            last=raw.get("last") or raw.get("close"),
+            updated_at=time.monotonic(),
+        )
+        self._tickers[(exchange_name, symbol)] = ticker
+        for listener in self._listeners:
+            try:
+                listener(exchange_name, symbol, ticker)
+            except Exception as e:
+                logger.error(f"Рыночные данные: подписчик {exchange_name} {symbol} упал: {e}")
+        return ticker
+
+    async def _fetch_ticker(self, exchange_name: str, symbol: str) -> Ticker:
+        client = await exchange_pool.get(exchange_name)
+        raw = await client.fetch_ticker(symbol)
+        return self._store(exchange_name, symbol, raw)
+
+    def update(self, exchange_name: str, tickers: dict) -> None:
+        """Тикеры, уже полученные fetch_tickers вне кэша (пакетный режим)"""
+        for symbol, raw in tickers.items():
+            self._store(exchange_name, symbol, raw)
+
+    def _watched_symbols(self, exchange_name: str) -> list[str]:
+        """Отслеживаемые символы биржи (давно не читавшиеся снимаются)"""
+        watched = self._watched.get(exchange_name, {})
+        horizon = time.monotonic() - self.WATCH_SECONDS
+        for symbol in [symbol for symbol, read_at in watched.items() if read_at < horizon]:
+            del watched[symbol]
+        return sorted(watched)
+
+    async def refresh(self, exchange_name: str) -> None:
+        """Один fetch_tickers по всем отслеживаемым символам биржи"""
+        symbols = self._watched_symbols(exchange_name)
+        if not symbols:
+            return
+        client = await exchange_pool.get(exchange_name)
+        self.update(exchange_name, await client.fetch_tickers(symbols))
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            exchanges = [
+                name for name, symbols in self._watched.items()
+                if symbols and name not in self._streams
+            ]
+            results = await asyncio.gather(
+                *(self.refresh(name) for name in exchanges), return_exceptions=True
+            )
+            for exchange_name, result in zip(exchanges, results):
+                if isinstance(result, Exception):
+                    logger.warning(f"Рыночные данные: обновление {exchange_name} не удалось: {result}")
+
+    async def _stream(self, exchange_name: str) -> None:
+        """Поток тикеров биржи; при ошибке — повтор, без потока — опрос"""
+        delay = 1.0
+        try:
+            client = await exchange_pool.get(exchange_name)
+            if not client.client.has.get("watchTickers"):
+                return
+            while True:
+                symbols = self._watched_symbols(exchange_name)
+                if not symbols:
+                    return
+                try:
+                    self.update(exchange_name, await client.client.watch_tickers(symbols))
+                    delay = 1.0
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(
+                        f"Рыночные данные: поток {exchange_name} прерван: {e}, повтор через {delay:.0f}с"
+                    )
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 60.0)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Рыночные данные: поток {exchange_name} не запущен: {e}")
+        finally:
+            self._streams.pop(exchange_name, None)
+
+
+# Общий кэш рыночных данных процесса
+market_data = MarketDataCache(settings.market_data_ttl, settings.market_data_refresh_interval)
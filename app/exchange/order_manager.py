@@ -1,9 +1,30 @@
+import asyncio
+from collections import defaultdict
+
 from app.exchange.client import ExchangeClient
 from app.exchange.factory import ExchangeFactory
+from app.exchange.pool import exchange_pool
+from app.exchange.market_data import market_data
+from app.exchange.orderbook import order_books
+from app.exchange.execution_algos import ParentOrder, execution_scheduler
+from app.exchange.reconciler import position_reconciler
+from app.exchange.position_manager import position_manager
+from app.exchange.cassette import cassette
+from app.exchange.retry import classify
+from app.exchange.circuit_breaker import get_breaker, is_available, MARKET_DATA, TRADING
 from app.models.order import OrderRequest, OrderResponse
+from app.config.profiles import TradingProfile, active_profile, trading_profiles, use_profile
 from app.config.settings import settings
 from app.utils.logger import logger
 from app.risk.manager import RiskManager
+from app.risk.models import RiskResult
+from app.risk.exposure import exposure_ledger, Reservation
+from app.exchange.quantizer import QuantizedOrder
+from app.utils.indicators import get_atr_for_symbol
+from app.journal import trade_journal, TradeState
+from app.utils.coordination import coordinator
+from app.utils.deadline import Deadline, DeadlineExceeded, use_deadline
+from app.utils.shutdown import shutdown_coordinator
 
 
 class OrderManager:
@@ -19,41 +40,128 @@ class OrderManager:
     """
 
     def __init__(self):
-        self.clients: dict[str, ExchangeClient] = {}
+        self._exchange_slots: dict[str, asyncio.Semaphore] = {}
 
     # ------------------------------------------------------------------
     # CLIENT
     # ------------------------------------------------------------------
 
     async def _get_client(self, exchange_name: str) -> ExchangeClient:
-        if exchange_name not in self.clients:
-            client = ExchangeFactory.create_client(exchange_name)
-            await client.load_markets()
-            self.clients[exchange_name] = client
-        return self.clients[exchange_name]
+        return await exchange_pool.get(exchange_name)
+
+    def _apply_fallback(self, order_request: OrderRequest) -> OrderRequest:
+        """
+        Переводит вход на FALLBACK_EXCHANGE, если торговая цепь биржи
+        сигнала разомкнута, а резервная биржа доступна.
+        """
+        fallback = settings.fallback_exchange.strip().lower()
+        exchange_name = order_request.exchange
+        if not settings.breaker_enabled or not fallback or fallback == exchange_name:
+            return order_request
+        if not get_breaker(exchange_name, TRADING).is_open:
+            return order_request
+        if not is_available(fallback, MARKET_DATA, TRADING):
+            return order_request
+
+        logger.warning(f"⚡ {exchange_name}: цепь разомкнута, вход перенаправлен на {fallback}")
+        return order_request.with_changes(
+            exchange=fallback,
+            routing={
+                **(order_request.routing or {}),
+                "fallback_from": exchange_name,
+                "reason": "circuit open",
+            },
+        )
+
+    def _get_exchange_slots(self, exchange_name: str) -> asyncio.Semaphore:
+        """Ограничение числа одновременных сделок на одну биржу"""
+        if exchange_name not in self._exchange_slots:
+            self._exchange_slots[exchange_name] = asyncio.Semaphore(
+                settings.batch_max_concurrency
+            )
+        return self._exchange_slots[exchange_name]
 
     # ------------------------------------------------------------------
     # ORCHESTRATOR
     # ------------------------------------------------------------------
 
-    async def execute_trade(self, order_request: OrderRequest) -> OrderResponse:
+    async def execute_trade(
+        self,
+        order_request: OrderRequest,
+        entry_price: float | None = None,
+        atr: float | None = None,
+        deadline: Deadline | None = None,
+    ) -> OrderResponse:
+        """
+        Исполнение одной сделки.
+
+        Args:
+            order_request: запрос на сделку
+            entry_price: цена для расчёта риска, если уже известна (пакетный режим)
+            atr: ATR символа, если уже известен (пакетный режим)
+            deadline: бюджет времени сигнала; запросы к бирже до входа
+                ограничены его остатком, после него вход не отправляется
+        """
+        if cassette.recording:
+            cassette.record_trade(order_request.to_dict(), entry_price, atr)
+        order_request = self._apply_fallback(order_request)
+
+        # профиль выбирается один раз: перезагрузка файла не меняет сделку в полёте
+        profile = trading_profiles.resolve(
+            order_request.exchange, order_request.symbol, order_request.strategy
+        )
+
+        # остановка процесса дождётся, пока сделка дойдёт до SL / TP
+        with shutdown_coordinator.track(), use_deadline(deadline), use_profile(profile):
+            # одна сделка по символу одновременно — во всех воркерах
+            async with coordinator.symbol_lock(order_request.exchange, order_request.symbol):
+                return await self._execute_trade(order_request, entry_price, atr, deadline)
+
+    async def _execute_trade(
+        self,
+        order_request: OrderRequest,
+        entry_price: float | None,
+        atr: float | None,
+        deadline: Deadline | None,
+    ) -> OrderResponse:
         import time
         start_time = time.time()
 
+        trade_id = trade_journal.new_trade_id()
+        trade_journal.record(
+            trade_id,
+            TradeState.RECEIVED,
+            exchange=order_request.exchange,
+            request=order_request.to_dict(),
+            order_type=active_profile().order_type,
+            profile=active_profile().name,
+            owner=coordinator.worker_id,
+        )
+        entry_acked = False
+        reservation: Reservation | None = None
+
         try:
             client = await self._get_client(order_request.exchange)
             symbol = self._format_symbol(order_request)
 
             self._log_trade_start(symbol, order_request)
 
+            # --------------------------------------------------
+            # Сигнал ещё актуален (время и цена)
+            # --------------------------------------------------
+            if deadline is not None:
+                deadline.check("очередь")
+            await self._check_drift(client, symbol, order_request)
+
             await self._setup_leverage(client, symbol, order_request)
 
             # --------------------------------------------------
             # Получаем цену для расчёта риска
             # --------------------------------------------------
-            entry_price = await self._get_entry_price_for_calc(
-                client, symbol, order_request
-            )
+            if entry_price is None:
+                entry_price = await self._get_entry_price_for_calc(
+                    client, symbol, order_request
+                )
 
             if not entry_price:
                 raise ValueError("Не удалось получить цену для расчёта риска")
@@ -68,11 +176,60 @@ class OrderManager:
                 symbol=symbol,
                 entry_price=entry_price,
                 side=order_request.side,
+                atr=atr,
             )
 
-            order_amount = risk.amount
-            order_request.stop_loss = risk.stop_loss
-            order_request.take_profit = risk.take_profit
+            # --------------------------------------------------
+            # Лимиты экспозиции (в памяти, без запросов к бирже)
+            # --------------------------------------------------
+            reservation, risk = self._reserve_exposure(
+                client, order_request.exchange, symbol, risk, entry_price
+            )
+
+            # --------------------------------------------------
+            # Квантование под правила рынка (лот, тик, номинал)
+            # --------------------------------------------------
+            quantized = self._quantize(client, symbol, order_request, risk, entry_price)
+            exposure_ledger.resize(reservation, quantized.notional)
+
+            order_amount = quantized.amount
+            order_request = order_request.with_changes(
+                stop_loss=quantized.stop_loss,
+                take_profit=quantized.take_profit,
+                entry_price=(
+                    quantized.entry_price if quantized.entry_price is not None
+                    else order_request.entry_price
+                ),
+            )
+
+            # до отправки входа состояние должно быть на диске:
+            # после падения сделка найдётся при восстановлении
+            await trade_journal.commit(
+                trade_id,
+                TradeState.SIZED,
+                symbol=symbol,
+                amount=order_amount,
+                request=order_request.to_dict(),
+            )
+
+            # последняя проверка бюджета: дальше вход уходит на биржу,
+            # а защита SL / TP ставится без ограничения по времени
+            if deadline is not None:
+                deadline.check("вход")
+                deadline.disarm()
+
+            # --------------------------------------------------
+            # Крупный вход — дочерними ордерами в фоне
+            # --------------------------------------------------
+            if self._use_algo(quantized):
+                return self._start_algo(
+                    trade_id, client, symbol, order_request, order_amount, entry_price, reservation
+                )
+
+            # --------------------------------------------------
+            # Проскальзывание по локальному стакану (market вход)
+            # --------------------------------------------------
+            ioc_price = await self._check_slippage(client, symbol, order_request, order_amount)
 
             # --------------------------------------------------
             # Открытие позиции
@@ -85,6 +242,23 @@ class OrderManager:
                 order_request=order_request,
                 amount=order_amount,
                 params=order_params,
+                ioc_price=ioc_price,
+            )
+            if ioc_price is not None:
+                # IOC мог исполниться частично — защищаем и учитываем исполненное
+                order_amount = await self._filled_amount(client, symbol, entry_order, order_amount)
+                exposure_ledger.resize(
+                    reservation,
+                    client.get_quantizer(symbol).notional(order_amount, actual_entry_price or entry_price),
+                    enforce=False,
+                )
+            entry_acked = True
+            exposure_ledger.confirm(reservation)
+            trade_journal.record(
+                trade_id,
+                TradeState.ENTRY_ACKED,
+                entry_order_id=entry_order.get("id"),
+                entry_price=actual_entry_price,
             )
 
             # --------------------------------------------------
@@ -97,22 +271,413 @@ class OrderManager:
                 amount=order_amount,
                 entry_order=entry_order,
             )
+            self._record_protection(
+                trade_id, order_request, symbol, stop_loss_order, take_profit_order,
+                entry_price=actual_entry_price or entry_price, amount=order_amount,
+                entry_order_id=entry_order.get("id"),
+            )
 
             execution_time = time.time() - start_time
-            logger.info(f"⏱️ Сделка выполнена за {execution_time:.2f} сек")
+            logger.info("⏱️ Сделка выполнена за %.2f сек", execution_time)
 
             return OrderResponse(
                 success=True,
                 order_id=entry_order.get("id"),
                 stop_loss_order_id=stop_loss_order.get("id") if stop_loss_order else None,
                 take_profit_order_id=take_profit_order.get("id") if take_profit_order else None,
+                stop_loss=order_request.stop_loss,
+                take_profit=order_request.take_profit,
                 message=f"Позиция открыта (время: {execution_time:.2f}с)",
             )
 
         except Exception as e:
             execution_time = time.time() - start_time
             logger.error(f"Ошибка при выполнении сделки: {e} ({execution_time:.2f}с)")
-            return OrderResponse(success=False, error=str(e))
+            if not entry_acked:
+                trade_journal.record(trade_id, TradeState.FAILED, error=str(e))
+                if reservation:
+                    exposure_ledger.release(reservation)
+            return OrderResponse(success=False, error=str(e), error_kind=classify(e))
+
+    # ------------------------------------------------------------------
+    # RECOVERY
+    # ------------------------------------------------------------------
+
+    def _record_protection(
+        self,
+        trade_id: str,
+        order_request: OrderRequest,
+        symbol: str,
+        stop_loss_order: dict | None,
+        take_profit_order: dict | None,
+        entry_price: float | None,
+        amount: float,
+        entry_order_id: str | None = None,
+    ) -> None:
+        # недостающую защиту выставит периодическая сверка позиций
+        position_reconciler.expect(
+            order_request.exchange,
+            symbol,
+            order_request.side,
+            order_request.stop_loss,
+            order_request.take_profit,
+            stop_loss_order,
+            take_profit_order,
+            entry_order_id=entry_order_id,
+        )
+        # безубыток / трейлинг ведут SL от фактического входа
+        position_manager.track(
+            order_request.exchange,
+            symbol,
+            order_request.side,
+            entry_price,
+            amount,
+            order_request.stop_loss,
+            stop_loss_order,
+            position_idx=self._prepare_order_params(order_request).get("positionIdx"),
+        )
+        # пока оба защитных ордера не подтверждены, сделка остаётся ENTRY_ACKED
+        # и будет дозащищена при следующем старте
+        if stop_loss_order and take_profit_order:
+            trade_journal.record(
+                trade_id,
+                TradeState.PROTECTED,
+                stop_loss_order_id=stop_loss_order.get("id"),
+                take_profit_order_id=take_profit_order.get("id"),
+            )
+
+    async def resume_unfinished(self) -> int:
+        """
+        Доводит до конца сделки, прерванные рестартом.
+
+        - ENTRY_ACKED: вход исполнен, SL/TP не подтверждены → выставляем защиту
+        - RECEIVED / SIZED: подтверждения входа нет → помечаем ABANDONED
+          (ордер мог уйти на биржу — позицию проверяет сверка / оператор)
+
+        Журнал общий для воркеров: сделки живых воркеров (owner) ещё
+        в работе и не трогаются.
+
+        Returns:
+            количество сделок, для которых повторно выставлена защита
+        """
+        with shutdown_coordinator.track():
+            return await self._resume_unfinished()
+
+    async def _resume_unfinished(self) -> int:
+        trades = await asyncio.to_thread(trade_journal.load_unfinished)
+        resumed = 0
+
+        trades = [trade for trade in trades if not coordinator.is_alive(trade.get("owner"))]
+
+        for trade in trades:
+            trade_id = trade["trade_id"]
+
+            if trade["state"] != TradeState.ENTRY_ACKED:
+                # SIZED пишется до отправки входа: ордер мог уйти на биржу
+                logger.warning(
+                    f"♻️ Сделка {trade_id} прервана до подтверждения входа "
+                    f"({trade['state']}): {trade.get('request')}"
+                    + (" — проверьте позицию на бирже" if trade["state"] == TradeState.SIZED else "")
+                )
+                trade_journal.record(trade_id, TradeState.ABANDONED)
+                continue
+
+            try:
+                order_request = OrderRequest.from_dict(trade["request"])
+                client = await self._get_client(order_request.exchange)
+                symbol = trade["symbol"]
+
+                # защита ставится под тип входа, с которым сделка была отправлена
+                profile = trading_profiles.resolve(
+                    order_request.exchange, order_request.symbol, order_request.strategy
+                )
+                if trade.get("order_type"):
+                    profile = profile._replace(order_type=trade["order_type"])
+
+                logger.warning(
+                    f"♻️ Восстановление защиты {symbol} | {order_request.side} | "
+                    f"amount={trade['amount']} | SL={order_request.stop_loss} | "
+                    f"TP={order_request.take_profit}"
+                )
+
+                with use_profile(profile):
+                    stop_loss_order, take_profit_order = await self._setup_tp_sl(
+                        client=client,
+                        symbol=symbol,
+                        order_request=order_request,
+                        amount=trade["amount"],
+                        entry_order={"id": trade.get("entry_order_id")},
+                    )
+                self._record_protection(
+                    trade_id, order_request, symbol, stop_loss_order, take_profit_order,
+                    entry_price=trade.get("entry_price") or order_request.entry_price,
+                    amount=trade["amount"],
+                    entry_order_id=trade.get("entry_order_id"),
+                )
+                if stop_loss_order and take_profit_order:
+                    resumed += 1
+
+            except Exception as e:
+                logger.error(f"♻️ Не удалось восстановить защиту сделки {trade_id}: {e}")
+
+        if trades:
+            logger.info(f"♻️ Восстановление: {resumed}/{len(trades)} сделок защищены")
+        return resumed
+
+    # ------------------------------------------------------------------
+    # EXECUTION ALGOS
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _use_algo(quantized: QuantizedOrder) -> bool:
+        profile = active_profile()
+        return (
+            profile.execution_algo != "none"
+            and profile.order_type == "market"
+            and quantized.notional >= settings.algo_min_notional
+        )
+
+    def _start_algo(
+        self,
+        trade_id: str,
+        client: ExchangeClient,
+        symbol: str,
+        order_request: OrderRequest,
+        amount: float,
+        entry_price: float,
+        reservation: Reservation,
+    ) -> OrderResponse:
+        """
+        Запускает алгоритм исполнения и сразу отвечает на сигнал.
+
+        После каждого исполненного куска SL / TP пересоздаются на
+        накопленный объём, а журнал получает текущий amount — при
+        рестарте дозащищается уже исполненная часть.
+        """
+        parent = ParentOrder(
+            exchange=order_request.exchange,
+            symbol=symbol,
+            side=order_request.side,
+            amount=amount,
+            algo=active_profile().execution_algo,
+            params=self._prepare_order_params(order_request),
+        )
+        protection: dict = {"stop_loss": None, "take_profit": None}
+        protect_lock = asyncio.Lock()
+
+        async def on_fill(parent: ParentOrder) -> None:
+            async with protect_lock:
+                trade_journal.record(
+                    trade_id,
+                    TradeState.ENTRY_ACKED,
+                    entry_order_id=parent.parent_id,
+                    entry_price=parent.average_price,
+                    amount=parent.filled,
+                )
+                await self._protect_filled(client, symbol, order_request, parent, protection)
+                self._record_protection(
+                    trade_id, order_request, symbol, protection["stop_loss"], protection["take_profit"],
+                    entry_price=parent.average_price, amount=parent.filled,
+                )
+
+        async def on_done(parent: ParentOrder) -> None:
+            if parent.filled:
+                # куски без цены учитываются по цене сигнала
+                notional = client.get_quantizer(symbol).notional(
+                    parent.filled, parent.average_price or entry_price
+                )
+                exposure_ledger.resize(reservation, notional, enforce=False)
+                exposure_ledger.confirm(reservation)
+            else:
+                exposure_ledger.release(reservation)
+                trade_journal.record(
+                    trade_id, TradeState.FAILED, error=parent.error or f"{parent.algo}: ничего не исполнено"
+                )
+
+        execution_scheduler.submit(client, parent, on_fill=on_fill, on_done=on_done)
+
+        return OrderResponse(
+            success=True,
+            order_id=parent.parent_id,
+            stop_loss=order_request.stop_loss,
+            take_profit=order_request.take_profit,
+            message=f"Запущено исполнение {parent.algo}: {amount} {symbol}",
+        )
+
+    async def _protect_filled(
+        self,
+        client: ExchangeClient,
+        symbol: str,
+        order_request: OrderRequest,
+        parent: ParentOrder,
+        protection: dict,
+    ) -> None:
+        """
+        SL / TP на накопленный исполненный объём родительского ордера.
+
+        Сначала выставляется новая защита, затем снимается прежняя — позиция
+        не остаётся без SL / TP между ними. Если новый ордер не создался,
+        прежний остаётся на месте.
+        """
+        previous = [order for order in protection.values() if order]
+
+        # позиционные SL / TP Bybit уже покрывают любой объём позиции
+        if any(str(order.get("id")).startswith("position_") for order in previous):
+            return
+
+        stop_loss_order, take_profit_order = await self._setup_tp_sl(
+            client=client,
+            symbol=symbol,
+            order_request=order_request,
+            amount=parent.filled,
+            entry_order={"id": parent.parent_id},
+        )
+
+        replaced = (
+            ("stop_loss", stop_loss_order, {"trigger": True}),
+            ("take_profit", take_profit_order, {}),
+        )
+        for key, order, params in replaced:
+            if order is None:
+                continue
+            old = protection[key]
+            protection[key] = order
+            if old is None:
+                continue
+            try:
+                await client.cancel_order(old["id"], symbol, params)
+            except Exception as e:
+                logger.warning(f"[ALGO] не удалось снять защитный ордер {old.get('id')}: {e}")
+
+    # ------------------------------------------------------------------
+    # BATCH
+    # ------------------------------------------------------------------
+
+    async def execute_batch(
+        self,
+        order_requests: list[OrderRequest],
+        deadlines: list[Deadline | None] | None = None,
+    ) -> list[OrderResponse]:
+        """
+        Пакетное исполнение сделок.
+
+        Сигналы группируются по бирже, рыночные данные (тикеры, ATR)
+        запрашиваются один раз на группу, сделки исполняются параллельно
+        в пределах batch_max_concurrency на биржу.
+
+        Args:
+            order_requests: запросы на сделки
+            deadlines: бюджет времени каждого сигнала (в порядке order_requests)
+
+        Returns:
+            список OrderResponse в порядке order_requests
+        """
+        import time
+        start_time = time.time()
+
+        responses: list[OrderResponse | None] = [None] * len(order_requests)
+        if deadlines is None:
+            deadlines = [None] * len(order_requests)
+        groups: dict[str, list[int]] = defaultdict(list)
+        for index, order_request in enumerate(order_requests):
+            groups[order_request.exchange].append(index)
+
+        await asyncio.gather(*(
+            self._execute_exchange_batch(exchange_name, indexes, order_requests, deadlines, responses)
+            for exchange_name, indexes in groups.items()
+        ))
+
+        execution_time = time.time() - start_time
+        succeeded = sum(1 for response in responses if response.success)
+        logger.info(
+            f"📦 Пакет исполнен: {succeeded}/{len(order_requests)} успешно "
+            f"за {execution_time:.2f} сек ({len(groups)} бирж)"
+        )
+        return responses
+
+    async def _execute_exchange_batch(
+        self,
+        exchange_name: str,
+        indexes: list[int],
+        order_requests: list[OrderRequest],
+        deadlines: list[Deadline | None],
+        responses: list[OrderResponse | None],
+    ) -> None:
+        try:
+            client = await self._get_client(exchange_name)
+        except Exception as e:
+            logger.error(f"Пакет: не удалось подключиться к {exchange_name}: {e}")
+            for index in indexes:
+                responses[index] = OrderResponse(success=False, error=str(e), error_kind=classify(e))
+            return
+
+        symbols = {index: self._format_symbol(order_requests[index]) for index in indexes}
+        unique_symbols = sorted(set(symbols.values()))
+
+        # ATR зависит от периода и таймфрейма профиля сигнала
+        atr_profiles = {}
+        atr_keys = {}
+        for index in indexes:
+            order_request = order_requests[index]
+            profile = trading_profiles.resolve(
+                exchange_name, order_request.symbol, order_request.strategy
+            )
+            atr_keys[index] = (symbols[index], profile.atr_period, profile.atr_timeframe)
+            atr_profiles.setdefault(atr_keys[index], profile)
+
+        # --------------------------------------------------
+        # Общие рыночные данные: один fetch_tickers и один ATR на символ
+        # --------------------------------------------------
+        prices, atrs = await asyncio.gather(
+            self._fetch_batch_prices(client, unique_symbols),
+            self._fetch_batch_atrs(client, atr_profiles),
+        )
+
+        slots = self._get_exchange_slots(exchange_name)
+
+        async def run(index: int) -> None:
+            order_request = order_requests[index]
+            symbol = symbols[index]
+
+            atr = atrs.get(atr_keys[index])
+            if isinstance(atr, Exception):
+                responses[index] = OrderResponse(success=False, error=f"ATR: {atr}", error_kind=classify(atr))
+                return
+
+            entry_price = order_request.entry_price or prices.get(symbol)
+            async with slots:
+                responses[index] = await self.execute_trade(
+                    order_request, entry_price=entry_price, atr=atr, deadline=deadlines[index]
+                )
+
+        await asyncio.gather(*(run(index) for index in indexes))
+
+    async def _fetch_batch_prices(
+        self, client: ExchangeClient, symbols: list[str]
+    ) -> dict[str, float]:
+        try:
+            tickers = await client.fetch_tickers(symbols)
+        except Exception as e:
+            # без общих тикеров каждая сделка запросит цену сама
+            logger.warning(f"Пакет: не удалось получить тикеры {client.exchange_name}: {e}")
+            return {}
+        # свежие тикеры пакета нужны и проверке дрейфа цены
+        market_data.update(client.exchange_name, tickers)
+        return {
+            symbol: ticker.get("last")
+            for symbol, ticker in tickers.items()
+            if ticker.get("last")
+        }
+
+    async def _fetch_batch_atrs(
+        self, client: ExchangeClient, profiles: dict[tuple[str, int, str], TradingProfile]
+    ) -> dict[tuple[str, int, str], float | Exception]:
+        """ATR по (символ, период, таймфрейм)"""
+        results = await asyncio.gather(
+            *(get_atr_for_symbol(client, key[0], profile) for key, profile in profiles.items()),
+            return_exceptions=True,
+        )
+        return dict(zip(profiles, results))
 
     # ------------------------------------------------------------------
     # HELPERS
@@ -127,15 +692,16 @@ class OrderManager:
 
     def _log_trade_start(self, symbol: str, order_request: OrderRequest) -> None:
         logger.info(
-            f"Сделка: {symbol} | {order_request.side} | "
-            f"mode={settings.risk_mode} | leverage={order_request.leverage}"
+            "Сделка: %s | %s | profile=%s | mode=%s | leverage=%s",
+            symbol, order_request.side, active_profile().name, active_profile().risk_mode,
+            order_request.leverage,
         )
 
     async def _setup_leverage(
         self, client: ExchangeClient, symbol: str, order_request: OrderRequest
     ) -> None:
         try:
-            market = client.client.market(symbol)
+            market = client.market(symbol)
             leverage = order_request.leverage
             max_leverage = market.get("limits", {}).get("leverage", {}).get("max")
 
@@ -150,6 +716,157 @@ class OrderManager:
         except Exception as e:
             logger.error(f"Ошибка установки плеча для {symbol}: {e}")
 
+    @staticmethod
+    def _reserve_exposure(
+        client: ExchangeClient, exchange_name: str, symbol: str, risk: RiskResult, entry_price: float
+    ) -> tuple[Reservation, RiskResult]:
+        """
+        Резервирует номинал сделки; при нехватке лимита объём урезается
+        пропорционально (SL / TP не меняются).
+        """
+        notional = client.get_quantizer(symbol).notional(risk.amount, entry_price)
+        reservation = exposure_ledger.reserve(exchange_name, symbol, notional)
+        if reservation.scale < 1.0:
+            risk = risk._replace(amount=risk.amount * reservation.scale)
+        return reservation, risk
+
+    def _quantize(
+        self,
+        client: ExchangeClient,
+        symbol: str,
+        order_request: OrderRequest,
+        risk: RiskResult,
+        entry_price: float,
+    ) -> QuantizedOrder:
+        """
+        Приводит объём и цены к шагам рынка и проверяет лимиты локально,
+        чтобы не тратить запрос на заведомо отклонённый ордер.
+        """
+        order_type = active_profile().order_type
+        is_limit = order_type == "limit"
+        quantized = client.get_quantizer(symbol).quantize(
+            amount=risk.amount,
+            price=entry_price,
+            stop_loss=risk.stop_loss,
+            take_profit=risk.take_profit,
+            side=order_request.side,
+            order_type=order_type,
+            entry_price=order_request.entry_price if is_limit else None,
+        )
+
+        logger.info(
+            "[QUANT] %s | amount=%.8f->%s | SL=%.8f->%s | TP=%.8f->%s | "
+            "entry=%s->%s | notional=%.4f",
+            symbol,
+            risk.amount, quantized.amount,
+            risk.stop_loss, quantized.stop_loss,
+            risk.take_profit, quantized.take_profit,
+            order_request.entry_price, quantized.entry_price,
+            quantized.notional,
+        )
+        return quantized
+
+    async def _check_slippage(
+        self,
+        client: ExchangeClient,
+        symbol: str,
+        order_request: OrderRequest,
+        amount: float,
+    ) -> float | None:
+        """
+        Оценивает проход market-ордера по стакану.
+
+        Returns:
+            None — можно входить по рынку,
+            цена — входить limit IOC не хуже этой цены (slippage_action=limit_ioc)
+
+        Raises:
+            ValueError если проскальзывание выше max_slippage_bps и slippage_action=reject
+        """
+        if not settings.max_slippage_bps or active_profile().order_type != "market":
+            return None
+
+        try:
+            estimate = await order_books.estimate_fill(
+                client.exchange_name, symbol, order_request.side, amount
+            )
+        except Exception as e:
+            logger.warning(f"Стакан {symbol} недоступен, вход без проверки проскальзывания: {e}")
+            return None
+
+        logger.info(
+            "[SLIPPAGE] %s | %s | amount=%s | avg=%s | worst=%s | best=%s | %.1f bps | depth=%s",
+            symbol, order_request.side, amount, estimate.average_price,
+            estimate.worst_price, estimate.best_price, estimate.slippage_bps,
+            "ok" if estimate.complete else f"{estimate.filled}",
+        )
+
+        if estimate.best_price is None:
+            raise ValueError(f"Пустой стакан {symbol}")
+
+        if estimate.complete and estimate.slippage_bps <= settings.max_slippage_bps:
+            return None
+
+        if settings.slippage_action == "reject":
+            raise ValueError(
+                f"Проскальзывание {symbol} {estimate.slippage_bps:.1f} б.п. "
+                f"больше {settings.max_slippage_bps} б.п."
+                + ("" if estimate.complete else " (глубины стакана не хватает)")
+            )
+
+        offset = settings.max_slippage_bps / 10_000
+        if order_request.side == "buy":
+            limit_price = estimate.best_price * (1 + offset)
+        else:
+            limit_price = estimate.best_price * (1 - offset)
+        return client.get_quantizer(symbol).price(limit_price)
+
+    async def _check_drift(
+        self, client: ExchangeClient, symbol: str, order_request: OrderRequest
+    ) -> None:
+        """
+        Сравнивает цену сигнала с кэшированным тикером.
+
+        Raises:
+            ValueError если цена ушла дальше max_price_drift_bps
+        """
+        if not settings.max_price_drift_bps or not order_request.entry_price:
+            return
+
+        try:
+            price = await market_data.last_price(client.exchange_name, symbol)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.warning(f"Цена {symbol} недоступна, вход без проверки дрейфа: {e}")
+            return
+        if not price:
+            return
+
+        signal_price = order_request.entry_price
+        drift_bps = abs(price - signal_price) / signal_price * 10_000
+        if drift_bps > settings.max_price_drift_bps:
+            raise ValueError(
+                f"Цена {symbol} ушла от сигнала: {signal_price} -> {price} "
+                f"({drift_bps:.1f} б.п. > {settings.max_price_drift_bps} б.п.)"
+            )
+
+    async def _filled_amount(
+        self, client: ExchangeClient, symbol: str, order: dict, amount: float
+    ) -> float:
+        """Исполненный объём IOC-ордера"""
+        filled = order.get("filled")
+        if filled is None:
+            try:
+                filled = (await client.fetch_order(order["id"], symbol)).get("filled")
+            except Exception as e:
+                logger.warning(f"Не удалось получить исполнение IOC {order.get('id')}: {e}")
+        if filled is None:
+            return amount
+        if not filled:
+            raise ValueError(f"IOC ордер {symbol} не исполнен: стакан ушёл за лимит проскальзывания")
+        return client.get_quantizer(symbol).amount(filled)
+
     def _prepare_order_params(self, order_request: OrderRequest) -> dict:
         params = {}
 
@@ -168,8 +885,8 @@ class OrderManager:
             return order_request.entry_price
 
         try:
-            ticker = await client.client.fetch_ticker(symbol)
-            return ticker.get("last")
+            # тикер моложе market_data_ttl берётся из кэша без запроса
+            return await market_data.last_price(client.exchange_name, symbol)
         except Exception as e:
             logger.warning(f"Не удалось получить цену {symbol}: {e}")
             return None
@@ -182,9 +899,10 @@ class OrderManager:
         order_request: OrderRequest,
         amount: float,
         params: dict,
+        ioc_price: float | None = None,
     ) -> tuple[dict, float | None]:
         """
-        Открывает позицию (market или limit).
+        Открывает позицию (market, limit или limit IOC вместо market).
 
         Args:
             client (ExchangeClient): Клиент биржи.
@@ -192,6 +910,7 @@ class OrderManager:
             order_request (OrderRequest): Запрос на сделку.
             amount (float): Количество контрактов / монет.
             params (dict): Дополнительные параметры ордера.
+            ioc_price (float | None): Предельная цена, если market заменён на limit IOC.
 
         Returns:
             tuple:
@@ -201,15 +920,13 @@ class OrderManager:
         # -------------------------
         # LIMIT ORDER
         # -------------------------
-        if settings.order_type == "limit":
+        if active_profile().order_type == "limit":
             if not order_request.entry_price:
                 raise ValueError("Для limit-ордера требуется entry_price")
 
             logger.info(
-                f"Создаём LIMIT ордер: {symbol} | "
-                f"{order_request.side} | "
-                f"amount={amount:.6f} | "
-                f"price={order_request.entry_price}"
+                "Создаём LIMIT ордер: %s | %s | amount=%.6f | price=%s",
+                symbol, order_request.side, amount, order_request.entry_price,
             )
 
             order = await client.create_limit_order(
@@ -222,13 +939,31 @@ class OrderManager:
 
             return order, order_request.entry_price
 
+        # -------------------------
+        # LIMIT IOC (защита от проскальзывания)
+        # -------------------------
+        if ioc_price is not None:
+            logger.info(
+                "Создаём LIMIT IOC ордер: %s | %s | amount=%.6f | price=%s",
+                symbol, order_request.side, amount, ioc_price,
+            )
+
+            order = await client.create_limit_order(
+                symbol=symbol,
+                side=order_request.side,
+                amount=amount,
+                price=ioc_price,
+                params={**params, "timeInForce": "IOC"},
+            )
+
+            return order, order.get("average") or ioc_price
+
         # -------------------------
         # MARKET ORDER
         # -------------------------
         logger.info(
-            f"Создаём MARKET ордер: {symbol} | "
-            f"{order_request.side} | "
-            f"amount={amount:.6f}"
+            "Создаём MARKET ордер: %s | %s | amount=%.6f",
+            symbol, order_request.side, amount,
         )
 
         order = await client.create_market_order(
@@ -243,7 +978,7 @@ class OrderManager:
 
         if not actual_price:
             try:
-                ticker = await client.client.fetch_ticker(symbol)
+                ticker = await client.fetch_ticker(symbol)
                 actual_price = ticker.get("last")
             except Exception as e:
                 logger.warning(
@@ -251,10 +986,7 @@ class OrderManager:
                 )
                 actual_price = None
 
-        logger.info(
-            f"Позиция открыта: {symbol} | "
-            f"price={actual_price}"
-        )
+        logger.info("Позиция открыта: %s | price=%s", symbol, actual_price)
 
         return order, actual_price
 
@@ -277,34 +1009,40 @@ class OrderManager:
 
         stop_side = "sell" if order_request.side == "buy" else "buy"
 
-        is_market = settings.order_type == "market"
-        is_limit = settings.order_type == "limit"
+        order_type = active_profile().order_type
+        is_market = order_type == "market"
+        is_limit = order_type == "limit"
         is_bybit = order_request.exchange == "bybit"
 
         if is_market and is_bybit:
             try:
-                await client.set_position_tp_sl(
+                result = await client.set_position_tp_sl(
                     symbol=symbol,
                     stop_loss=order_request.stop_loss,
                     take_profit=order_request.take_profit,
                 )
-                return {"id": "position_sl"}, {"id": "position_tp"}
-            except Exception:
-                pass
+                # None — позиция ещё не видна, ставим ордерами
+                if result is not None:
+                    return {"id": "position_sl"}, {"id": "position_tp"}
+            except Exception as e:
+                # повторяемые ошибки уже повторены в клиенте
+                logger.warning(f"TP/SL на позицию {symbol} не установлены ({classify(e)}), ставим ордерами: {e}")
 
         if is_limit and is_bybit:
             try:
-                status = await client.client.fetch_order(entry_order["id"], symbol)
+                status = await client.fetch_order(entry_order["id"], symbol)
                 if status.get("filled", 0) > 0:
-                    await client.set_position_tp_sl(
+                    result = await client.set_position_tp_sl(
                         symbol=symbol,
                         stop_loss=order_request.stop_loss,
                         take_profit=order_request.take_profit,
                     )
-                    return {"id": "position_sl"}, {"id": "position_tp"}
-                return None, None
-            except Exception:
-                pass
+                    if result is not None:
+                        return {"id": "position_sl"}, {"id": "position_tp"}
+                else:
+                    return None, None
+            except Exception as e:
+                logger.warning(f"TP/SL на позицию {symbol} не установлены ({classify(e)}), ставим ордерами: {e}")
 
         try:
             stop_loss_order = await client.create_stop_loss_order(
@@ -314,7 +1052,7 @@ class OrderManager:
                 price=order_request.stop_loss,
             )
         except Exception as e:
-            logger.error(f"SL error: {e}")
+            logger.error(f"SL error ({classify(e)}): {e}")
 
         try:
             take_profit_order = await client.create_take_profit_order(
@@ -324,7 +1062,7 @@ class OrderManager:
                 price=order_request.take_profit,
             )
         except Exception as e:
-            logger.error(f"TP error: {e}")
+            logger.error(f"TP error ({classify(e)}): {e}")
 
         return stop_loss_order, take_profit_order
 
@@ -333,6 +1071,4 @@ class OrderManager:
     # ------------------------------------------------------------------
 
     async def close_all_connections(self) -> None:
-        for client in self.clients.values():
-            await client.close()
-        self.clients.clear()
+        await exchange_pool.close_all()
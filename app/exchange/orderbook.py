@@ -0,0 +1,224 @@
+import asyncio
+import time
+from bisect import bisect_left
+from itertools import accumulate
+from typing import NamedTuple, Optional
+
+from app.config.settings import settings
+from app.exchange.pool import exchange_pool
+from app.utils.logger import logger
+
+
+class FillEstimate(NamedTuple):
+    """
+    Оценка исполнения объёма по стакану.
+    """
+    amount: float               # запрошенный объём
+    filled: float               # сколько есть в стакане (может быть < amount)
+    average_price: Optional[float]
+    worst_price: Optional[float]  # цена последнего задетого уровня
+    best_price: Optional[float]
+    slippage_bps: float         # средняя цена против лучшей, б.п.
+
+    @property
+    def complete(self) -> bool:
+        return self.filled >= self.amount
+
+
+class BookSide:
+    """
+    Одна сторона стакана на двух параллельных отсортированных массивах.
+
+    Ключи хранятся по возрастанию: для asks это цена, для bids — цена
+    со знаком минус, поэтому лучший уровень всегда keys[0].
+    """
+
+    __slots__ = ("is_bid", "keys", "sizes")
+
+    def __init__(self, is_bid: bool):
+        self.is_bid = is_bid
+        self.keys: list[float] = []
+        self.sizes: list[float] = []
+
+    def price_at(self, index: int) -> float:
+        key = self.keys[index]
+        return -key if self.is_bid else key
+
+    @property
+    def prices(self) -> list[float]:
+        return [-key for key in self.keys] if self.is_bid else list(self.keys)
+
+    def replace(self, levels: list) -> None:
+        """
+        Полный снимок стороны: [[price, size], ...] от лучшего уровня.
+
+        В таком порядке стакан отдаёт ccxt (и REST, и watch_order_book),
+        поэтому сортировки нет — только копия верхних уровней.
+        """
+        live = [level for level in levels if level[1]]
+        keys = [float(level[0]) for level in live]
+        self.keys = [-key for key in keys] if self.is_bid else keys
+        self.sizes = [float(level[1]) for level in live]
+
+    def truncate(self, depth: int) -> None:
+        if len(self.keys) > depth:
+            del self.keys[depth:]
+            del self.sizes[depth:]
+
+
+class L2OrderBook:
+    """
+    Локальная реплика L2 стакана одного символа.
+    """
+
+    __slots__ = ("symbol", "bids", "asks", "nonce", "updated_at")
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids = BookSide(is_bid=True)
+        self.asks = BookSide(is_bid=False)
+        self.nonce: Optional[int] = None
+        self.updated_at = 0.0           # time.monotonic() последнего обновления
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.updated_at
+
+    def apply_snapshot(self, bids: list, asks: list, nonce: Optional[int] = None) -> None:
+        self.bids.replace(bids)
+        self.asks.replace(asks)
+        self.nonce = nonce
+        self.updated_at = time.monotonic()
+
+    def truncate(self, depth: int) -> None:
+        self.bids.truncate(depth)
+        self.asks.truncate(depth)
+
+    def estimate_fill(self, side: str, amount: float) -> FillEstimate:
+        """
+        Средняя цена исполнения объёма amount рыночным ордером.
+
+        Покупка идёт по asks, продажа — по bids. Кумулятивные объёмы и
+        номиналы считаются accumulate по всем уровням разом, уровень,
+        на котором набирается объём, находится bisect'ом.
+        """
+        book_side = self.asks if side == "buy" else self.bids
+        if not book_side.keys or amount <= 0:
+            return FillEstimate(amount, 0.0, None, None, None, 0.0)
+
+        prices = book_side.prices
+        sizes = book_side.sizes
+        cumulative_sizes = list(accumulate(sizes))
+        last = bisect_left(cumulative_sizes, amount)
+
+        best_price = prices[0]
+        if last >= len(prices):
+            # стакана не хватает — оцениваем всё, что есть
+            filled = cumulative_sizes[-1]
+            notional = sum(map(float.__mul__, prices, sizes))
+            worst_price = prices[-1]
+        else:
+            filled = amount
+            consumed_before = cumulative_sizes[last - 1] if last else 0.0
+            notional = sum(map(float.__mul__, prices[:last], sizes[:last]))
+            notional += (amount - consumed_before) * prices[last]
+            worst_price = prices[last]
+
+        average_price = notional / filled
+        slippage_bps = abs(average_price - best_price) / best_price * 10_000
+        return FillEstimate(amount, filled, average_price, worst_price, best_price, slippage_bps)
+
+
+class OrderBookService:
+    """
+    Стаканы отслеживаемых символов.
+
+    При exchange_streams стакан поддерживается websocket-потоком
+    ccxt.pro watch_order_book (ccxt сам склеивает снимок и диффы по
+    sequence и держит стороны отсортированными; реплика копирует
+    верхние depth уровней без пересортировки), иначе — запрашивается
+    fetch_order_book, если реплика старше orderbook_max_age. Поток символа останавливается, если
+    к стакану не обращались WATCH_SECONDS.
+    """
+
+    WATCH_SECONDS = 600.0
+
+    def __init__(self, depth: int, max_age: float):
+        self.depth = depth
+        self.max_age = max_age
+        self._books: dict[tuple[str, str], L2OrderBook] = {}
+        self._read_at: dict[tuple[str, str], float] = {}
+        self._feeds: dict[tuple[str, str], asyncio.Task] = {}
+
+    async def stop(self) -> None:
+        for task in self._feeds.values():
+            task.cancel()
+        self._feeds.clear()
+
+    def get(self, exchange_name: str, symbol: str) -> Optional[L2OrderBook]:
+        return self._books.get((exchange_name, symbol))
+
+    async def book(self, exchange_name: str, symbol: str) -> L2OrderBook:
+        """Актуальная реплика стакана (поток или REST-снимок)"""
+        key = (exchange_name, symbol)
+        self._read_at[key] = time.monotonic()
+
+        if settings.exchange_streams and key not in self._feeds:
+            self._feeds[key] = asyncio.create_task(self._feed(exchange_name, symbol))
+
+        book = self._books.get(key)
+        if book is None or book.age > self.max_age:
+            book = await self._fetch(exchange_name, symbol)
+        return book
+
+    async def estimate_fill(
+        self, exchange_name: str, symbol: str, side: str, amount: float
+    ) -> FillEstimate:
+        book = await self.book(exchange_name, symbol)
+        return book.estimate_fill(side, amount)
+
+    async def _fetch(self, exchange_name: str, symbol: str) -> L2OrderBook:
+        client = await exchange_pool.get(exchange_name)
+        raw = await client.fetch_order_book(symbol, self.depth)
+        return self._store(exchange_name, symbol, raw)
+
+    def _store(self, exchange_name: str, symbol: str, raw: dict) -> L2OrderBook:
+        key = (exchange_name, symbol)
+        book = self._books.get(key)
+        if book is None:
+            book = self._books[key] = L2OrderBook(symbol)
+        book.apply_snapshot(
+            raw["bids"][: self.depth], raw["asks"][: self.depth], raw.get("nonce")
+        )
+        return book
+
+    async def _feed(self, exchange_name: str, symbol: str) -> None:
+        key = (exchange_name, symbol)
+        delay = 1.0
+        try:
+            client = await exchange_pool.get(exchange_name)
+            if not client.client.has.get("watchOrderBook"):
+                return
+            while time.monotonic() - self._read_at.get(key, 0.0) < self.WATCH_SECONDS:
+                try:
+                    raw = await client.client.watch_order_book(symbol, self.depth)
+                    self._store(exchange_name, symbol, raw)
+                    delay = 1.0
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(
+                        f"Стакан {exchange_name} {symbol}: поток прерван: {e}, повтор через {delay:.0f}с"
+                    )
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 60.0)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Стакан {exchange_name} {symbol}: поток не запущен: {e}")
+        finally:
+            self._feeds.pop(key, None)
+
+
+# Общие стаканы процесса
+order_books = OrderBookService(settings.orderbook_depth, settings.orderbook_max_age)
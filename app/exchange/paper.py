@@ -0,0 +1,571 @@
+import asyncio
+import itertools
+import json
+import time
+from collections import OrderedDict, defaultdict
+from typing import Optional
+
+from app.config.settings import settings
+from app.exchange.client import ExchangeClient
+from app.exchange.loader import import_ccxt, load_exchange_class
+from app.utils.logger import logger
+from app.utils.triggers import TriggerIndex
+
+ccxt_errors = import_ccxt("ccxt.base.errors")
+
+# Биржи, где условные ордера отдаются отдельным запросом ({"trigger": True})
+SEPARATE_CONDITIONAL = ("okx", "bitget")
+
+# Сколько завершённых ордеров хранить для fetch_order
+CLOSED_ORDERS_KEPT = 10_000
+
+LIMIT = "limit"
+STOP = "stop"
+
+
+class PaperOrder:
+    """
+    Ордер симулятора.
+
+    Лимитные ордера исполняются по своей цене, когда противоположная
+    сторона книги до неё дошла (buy — ask <= price, sell — bid >= price).
+    Стопы срабатывают по last и исполняются по рынку.
+    """
+
+    __slots__ = (
+        "id", "symbol", "type", "side", "amount", "price", "reduce_only",
+        "status", "filled", "average", "fee", "timestamp",
+        "kind", "direction", "trigger", "seq", "position_level",
+    )
+
+    def __init__(
+        self,
+        order_id: str,
+        symbol: str,
+        order_type: str,
+        side: str,
+        amount: float,
+        price: Optional[float] = None,
+        trigger_price: Optional[float] = None,
+        reduce_only: bool = False,
+        position_level: bool = False,
+        seq: int = 0,
+    ):
+        self.id = order_id
+        self.symbol = symbol
+        self.type = order_type
+        self.side = side
+        self.amount = amount
+        self.price = price
+        self.reduce_only = reduce_only
+        self.status = "open"
+        self.filled = 0.0
+        self.average: Optional[float] = None
+        self.fee = 0.0
+        self.timestamp = int(time.time() * 1000)
+        self.position_level = position_level    # TP / SL на позиции (Bybit trading-stop)
+        self.seq = seq
+
+        if trigger_price is not None:
+            # sell-стоп срабатывает при падении цены, buy-стоп — при росте
+            self.kind = STOP
+            self.trigger = trigger_price
+            self.direction = -1 if side == "sell" else 1
+        else:
+            # buy-лимит исполняется при падении ask, sell-лимит — при росте bid
+            self.kind = LIMIT
+            self.trigger = price
+            self.direction = -1 if side == "buy" else 1
+
+    @property
+    def remaining(self) -> float:
+        return self.amount - self.filled
+
+    def to_ccxt(self) -> dict:
+        trigger_price = self.trigger if self.kind == STOP else None
+        return {
+            "id": self.id,
+            "symbol": self.symbol,
+            "type": self.type,
+            "side": self.side,
+            "amount": self.amount,
+            "price": self.price,
+            "average": self.average,
+            "filled": self.filled,
+            "remaining": self.remaining,
+            "status": self.status,
+            "triggerPrice": trigger_price,
+            "stopPrice": trigger_price,
+            "reduceOnly": self.reduce_only,
+            "timestamp": self.timestamp,
+            "fee": {"currency": "USDT", "cost": self.fee},
+            "info": {"paper": True},
+        }
+
+
+class PaperPosition:
+    """Нетто-позиция символа (one-way): contracts > 0 — long, < 0 — short"""
+
+    __slots__ = ("symbol", "contracts", "entry_price", "leverage", "realized_pnl")
+
+    def __init__(self, symbol: str, leverage: int):
+        self.symbol = symbol
+        self.contracts = 0.0
+        self.entry_price = 0.0
+        self.leverage = leverage
+        self.realized_pnl = 0.0
+
+    @property
+    def side(self) -> str:
+        return "long" if self.contracts > 0 else "short"
+
+    def unrealized_pnl(self, price: Optional[float]) -> float:
+        if not price:
+            return 0.0
+        return (price - self.entry_price) * self.contracts
+
+    def apply(self, signed_amount: float, price: float) -> float:
+        """Исполнение в позицию; возвращает реализованный PnL"""
+        realized = 0.0
+        if self.contracts and (self.contracts > 0) != (signed_amount > 0):
+            closed = min(abs(signed_amount), abs(self.contracts))
+            direction = 1 if self.contracts > 0 else -1
+            realized = (price - self.entry_price) * closed * direction
+            self.contracts += closed * -direction
+            signed_amount += closed * direction
+            if abs(self.contracts) < 1e-12:
+                self.contracts = 0.0
+        if signed_amount:
+            # добор или разворот: средняя цена входа
+            total = self.contracts + signed_amount
+            self.entry_price = (
+                self.entry_price * self.contracts + price * signed_amount
+            ) / total
+            self.contracts = total
+        self.realized_pnl += realized
+        return realized
+
+
+class PaperExchangeClient(ExchangeClient):
+    """
+    Бумажная биржа с тем же интерфейсом, что ExchangeClient.
+
+    Рынки, свечи и тикеры берутся с публичных эндпоинтов настоящей
+    биржи (ключи не нужны), ордера и позиции живут в памяти. Цены
+    поступают из фонового опроса (или websocket при exchange_streams)
+    по символам с ордерами и позициями, либо из записанного файла
+    (paper_price_file, JSON Lines {"ts", "symbol", "bid", "ask", "last"}).
+
+    Ожидающие ордера лежат в TriggerIndex по (символ, тип, направление):
+    тик проверяет только границу сработавших уровней.
+    """
+
+    def __init__(self, exchange_name: str, pro: bool = False):
+        self.exchange_name = exchange_name
+        self.sandbox = False
+        self.pro = pro and not settings.paper_price_file
+
+        exchange_class = load_exchange_class(exchange_name, pro=self.pro)
+        self.client = exchange_class({
+            'enableRateLimit': True,
+            'options': {
+                'defaultType': 'future',
+            }
+        })
+        # приватных потоков у бумажного счёта нет
+        self.client.has = {**self.client.has, "watchBalance": False}
+        if settings.paper_price_file:
+            self.client.has["watchTickers"] = False
+            self.client.has["watchOrderBook"] = False
+        self._quantizers = {}
+
+        self.wallet = settings.paper_balance
+        self._prices: dict[str, tuple[float, float, float]] = {}   # symbol -> (bid, ask, last)
+        self._orders: dict[str, PaperOrder] = {}                   # открытые
+        self._closed: OrderedDict[str, PaperOrder] = OrderedDict()
+        self._indexes: dict[tuple[str, str, int], TriggerIndex[PaperOrder]] = defaultdict(TriggerIndex)
+        self._positions: dict[str, PaperPosition] = {}
+        self._position_orders: dict[str, dict[str, PaperOrder]] = defaultdict(dict)
+        self._leverage: dict[str, int] = {}
+        self._ids = itertools.count(1)
+        self._feed_task: Optional[asyncio.Task] = None
+        logger.info(f"Инициализирован бумажный клиент {exchange_name} (баланс {self.wallet} USDT)")
+
+    async def load_markets(self):
+        await super().load_markets()
+        if self._feed_task is None:
+            self._feed_task = asyncio.create_task(self._feed_loop())
+
+    async def close(self):
+        if self._feed_task:
+            self._feed_task.cancel()
+            self._feed_task = None
+        await self.client.close()
+
+    # ------------------------------------------------------------------
+    # PRICE FEED
+    # ------------------------------------------------------------------
+
+    def on_price(self, symbol: str, bid: Optional[float], ask: Optional[float], last: Optional[float]) -> None:
+        """Новая цена символа: исполнение сработавших ордеров"""
+        last = last or bid or ask
+        if not last:
+            return
+        bid, ask = bid or last, ask or last
+        self._prices[symbol] = (bid, ask, last)
+
+        for kind, direction, price in (
+            (LIMIT, -1, ask), (LIMIT, 1, bid), (STOP, -1, last), (STOP, 1, last),
+        ):
+            index = self._indexes.get((symbol, kind, direction))
+            if not index:
+                continue
+            for order in index.pop_triggered(direction * price):
+                if kind == LIMIT:
+                    self._fill(order, order.price, maker=True)
+                else:
+                    self._fill(order, self._market_price(symbol, order.side), maker=False)
+
+    def _on_tickers(self, tickers: dict) -> None:
+        for symbol, raw in tickers.items():
+            self.on_price(symbol, raw.get("bid"), raw.get("ask"), raw.get("last") or raw.get("close"))
+
+    def _active_symbols(self) -> list[str]:
+        symbols = {order.symbol for order in self._orders.values()}
+        symbols.update(symbol for symbol, position in self._positions.items() if position.contracts)
+        return sorted(symbols)
+
+    async def _feed_loop(self) -> None:
+        try:
+            if settings.paper_price_file:
+                await self._replay(settings.paper_price_file, settings.paper_replay_speed)
+                return
+            while True:
+                await asyncio.sleep(settings.paper_feed_interval)
+                symbols = self._active_symbols()
+                if not symbols:
+                    continue
+                try:
+                    if self.pro and self.client.has.get("watchTickers"):
+                        self._on_tickers(await self.client.watch_tickers(symbols))
+                    else:
+                        self._on_tickers(await super().fetch_tickers(symbols))
+                except Exception as e:
+                    logger.warning(f"[PAPER] {self.exchange_name}: цены не получены: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[PAPER] {self.exchange_name}: поток цен остановлен: {e}")
+
+    async def _replay(self, path: str, speed: float) -> None:
+        """Записанные тики; speed — ускорение времени, 0 — без пауз"""
+        previous_ts = None
+        count = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                tick = json.loads(line)
+                ts = tick.get("ts")
+                if speed and previous_ts is not None and ts is not None and ts > previous_ts:
+                    await asyncio.sleep((ts - previous_ts) / speed)
+                elif count % 1000 == 0:
+                    await asyncio.sleep(0)
+                previous_ts = ts
+                self.on_price(tick["symbol"], tick.get("bid"), tick.get("ask"), tick.get("last"))
+                count += 1
+        logger.info(f"[PAPER] {self.exchange_name}: запись {path} проиграна ({count} тиков)")
+
+    # ------------------------------------------------------------------
+    # MARKET DATA
+    # ------------------------------------------------------------------
+
+    def _ticker(self, symbol: str) -> dict:
+        if symbol not in self._prices:
+            raise ccxt_errors.BadSymbol(f"[PAPER] нет цены {symbol} в записи")
+        bid, ask, last = self._prices[symbol]
+        return {"symbol": symbol, "bid": bid, "ask": ask, "last": last, "close": last}
+
+    async def fetch_ticker(self, symbol: str) -> dict:
+        if settings.paper_price_file:
+            return self._ticker(symbol)
+        raw = await super().fetch_ticker(symbol)
+        self._on_tickers({symbol: raw})
+        return raw
+
+    async def fetch_tickers(self, symbols: list[str]) -> dict:
+        if settings.paper_price_file:
+            return {symbol: self._ticker(symbol) for symbol in symbols if symbol in self._prices}
+        raw = await super().fetch_tickers(symbols)
+        self._on_tickers(raw)
+        return raw
+
+    async def fetch_order_book(self, symbol: str, limit: int) -> dict:
+        if not settings.paper_price_file:
+            return await super().fetch_order_book(symbol, limit)
+        # в записи только вершина книги
+        bid, ask, _ = self._prices[symbol]
+        return {"bids": [[bid, float("inf")]], "asks": [[ask, float("inf")]], "nonce": None}
+
+    async def _price(self, symbol: str) -> tuple[float, float, float]:
+        if symbol not in self._prices:
+            await self.fetch_ticker(symbol)
+        return self._prices[symbol]
+
+    def _market_price(self, symbol: str, side: str) -> float:
+        bid, ask, _ = self._prices[symbol]
+        slippage = settings.paper_slippage_bps / 10_000
+        return ask * (1 + slippage) if side == "buy" else bid * (1 - slippage)
+
+    # ------------------------------------------------------------------
+    # ACCOUNT
+    # ------------------------------------------------------------------
+
+    def _equity(self) -> tuple[float, float]:
+        used = 0.0
+        unrealized = 0.0
+        for symbol, position in self._positions.items():
+            if not position.contracts:
+                continue
+            used += abs(position.contracts) * position.entry_price / position.leverage
+            unrealized += position.unrealized_pnl(self._prices.get(symbol, (0, 0, 0))[2])
+        return self.wallet + unrealized, used
+
+    async def get_balance(self):
+        total, used = self._equity()
+        free = max(total - used, 0.0)
+        usdt = {"free": free, "used": used, "total": total}
+        return {
+            "USDT": usdt,
+            "free": {"USDT": free},
+            "used": {"USDT": used},
+            "total": {"USDT": total},
+            "info": {"paper": True},
+        }
+
+    async def set_leverage(self, symbol: str, leverage: int):
+        self._leverage[symbol] = leverage
+        position = self._positions.get(symbol)
+        if position is not None and not position.contracts:
+            position.leverage = leverage
+        logger.info("[PAPER] Установлено плечо %sx для %s", leverage, symbol)
+
+    async def fetch_positions(self, symbols: list[str] = None) -> list:
+        result = []
+        for symbol, position in self._positions.items():
+            if not position.contracts or (symbols and symbol not in symbols):
+                continue
+            last = self._prices.get(symbol, (0, 0, position.entry_price))[2]
+            protection = self._position_orders.get(symbol, {})
+            stop_loss = protection.get("sl")
+            take_profit = protection.get("tp")
+            result.append({
+                "symbol": symbol,
+                "side": position.side,
+                "contracts": abs(position.contracts),
+                "contractSize": 1.0,
+                "entryPrice": position.entry_price,
+                "markPrice": last,
+                "notional": abs(position.contracts) * last,
+                "leverage": position.leverage,
+                "unrealizedPnl": position.unrealized_pnl(last),
+                "stopLossPrice": stop_loss.trigger if stop_loss else None,
+                "takeProfitPrice": take_profit.trigger if take_profit else None,
+                "info": {"positionIdx": 0, "paper": True},
+            })
+        return result
+
+    # ------------------------------------------------------------------
+    # ORDERS
+    # ------------------------------------------------------------------
+
+    def _new_order(self, symbol: str, order_type: str, side: str, amount: float, **kwargs) -> PaperOrder:
+        seq = next(self._ids)
+        return PaperOrder(f"paper-{seq}", symbol, order_type, side, amount, seq=seq, **kwargs)
+
+    def _rest(self, order: PaperOrder) -> dict:
+        self._orders[order.id] = order
+        self._indexes[(order.symbol, order.kind, order.direction)].add(order)
+        return order.to_ccxt()
+
+    def _close_order(self, order: PaperOrder, status: str) -> None:
+        order.status = status
+        self._orders.pop(order.id, None)
+        self._closed[order.id] = order
+        while len(self._closed) > CLOSED_ORDERS_KEPT:
+            self._closed.popitem(last=False)
+
+    def _check_margin(self, symbol: str, side: str, amount: float, price: float) -> None:
+        position = self._positions.get(symbol)
+        if position is not None and position.contracts and (position.contracts > 0) != (side == "buy"):
+            return  # сокращение позиции маржу не требует
+        total, used = self._equity()
+        required = amount * price / self._leverage.get(symbol, settings.default_leverage)
+        if required > total - used:
+            raise ccxt_errors.InsufficientFunds(
+                f"[PAPER] недостаточно маржи: нужно {required:.2f}, свободно {total - used:.2f} USDT"
+            )
+
+    def _fill(self, order: PaperOrder, price: float, maker: bool) -> None:
+        """Исполнение ордера целиком (reduce-only — не больше позиции)"""
+        symbol = order.symbol
+        position = self._positions.get(symbol)
+        if order.position_level and position is not None:
+            # позиционный TP / SL закрывает позицию целиком, каким бы ни был её объём
+            order.amount = order.filled + abs(position.contracts)
+        amount = order.remaining
+
+        if order.reduce_only:
+            reducible = 0.0
+            if position is not None and position.contracts and (position.contracts > 0) != (order.side == "buy"):
+                reducible = abs(position.contracts)
+            amount = min(amount, reducible)
+            if not amount:
+                self._close_order(order, "canceled")
+                return
+
+        if position is None:
+            position = self._positions[symbol] = PaperPosition(
+                symbol, self._leverage.get(symbol, settings.default_leverage)
+            )
+        elif not position.contracts:
+            position.leverage = self._leverage.get(symbol, position.leverage)
+
+        fee = amount * price * (settings.paper_fee_maker if maker else settings.paper_fee_taker)
+        realized = position.apply(amount if order.side == "buy" else -amount, price)
+        self.wallet += realized - fee
+
+        order.filled += amount
+        order.average = price
+        order.fee += fee
+        self._close_order(order, "closed")
+
+        logger.info(
+            "[PAPER] %s %s %s %s @ %s | позиция=%s | pnl=%.4f fee=%.4f",
+            self.exchange_name, symbol, order.side, amount, price, position.contracts, realized, fee,
+        )
+        if not position.contracts:
+            # позиционные TP / SL живут, пока жива позиция
+            for protection in self._position_orders.pop(symbol, {}).values():
+                # исполнившийся TP / SL уже закрыт — отменяется только второй
+                if protection.status == "open":
+                    self._cancel(protection)
+
+    def _cancel(self, order: PaperOrder) -> None:
+        self._indexes[(order.symbol, order.kind, order.direction)].remove(order)
+        self._close_order(order, "canceled")
+
+    async def create_market_order(self, symbol: str, side: str, amount: float, params: dict = None):
+        params = params or {}
+        await self._price(symbol)
+        price = self._market_price(symbol, side)
+        order = self._new_order(symbol, "market", side, amount, reduce_only=bool(params.get("reduceOnly")))
+        if not order.reduce_only:
+            self._check_margin(symbol, side, amount, price)
+        self._fill(order, price, maker=False)
+        logger.info("[PAPER] Создан market ордер: %s для %s", order.id, symbol)
+        return order.to_ccxt()
+
+    async def create_limit_order(self, symbol: str, side: str, amount: float, price: float, params: dict = None):
+        params = params or {}
+        bid, ask, _ = await self._price(symbol)
+        order = self._new_order(
+            symbol, "limit", side, amount, price=price, reduce_only=bool(params.get("reduceOnly"))
+        )
+        marketable = ask <= price if side == "buy" else bid >= price
+        if not order.reduce_only:
+            self._check_margin(symbol, side, amount, price)
+
+        if marketable and params.get("postOnly"):
+            raise ccxt_errors.OrderImmediatelyFillable(f"[PAPER] post-only {symbol} @ {price} пересекает книгу")
+        if marketable:
+            self._fill(order, ask if side == "buy" else bid, maker=False)
+        elif params.get("timeInForce") in ("IOC", "FOK"):
+            self._close_order(order, "canceled")
+        else:
+            self._rest(order)
+        logger.info("[PAPER] Создан limit ордер: %s для %s по цене %s", order.id, symbol, price)
+        return order.to_ccxt()
+
+    async def create_stop_loss_order(self, symbol: str, side: str, amount: float, price: float):
+        order = self._new_order(symbol, "stop_market", side, amount, trigger_price=price, reduce_only=True)
+        logger.info("[PAPER] Создан стоп-лосс ордер: %s для %s по цене %s", order.id, symbol, price)
+        return self._rest(order)
+
+    async def create_take_profit_order(self, symbol: str, side: str, amount: float, price: float):
+        order = self._new_order(symbol, "limit", side, amount, price=price, reduce_only=True)
+        logger.info("[PAPER] Создан тейк-профит ордер: %s для %s по цене %s", order.id, symbol, price)
+        return self._rest(order)
+
+    async def set_position_tp_sl(
+        self,
+        symbol: str,
+        stop_loss: float = None,
+        take_profit: float = None,
+        position_idx: int = None,
+    ):
+        if self.exchange_name != "bybit":
+            logger.warning(f"Установка TP/SL на позицию не поддерживается для {self.exchange_name}")
+            return None
+        position = self._positions.get(symbol)
+        if position is None or not position.contracts:
+            logger.warning(f"Нет открытой позиции для {symbol}, TP/SL не устанавливаем")
+            return None
+
+        exit_side = "sell" if position.contracts > 0 else "buy"
+        protection = self._position_orders[symbol]
+        for key, trigger in (("sl", stop_loss), ("tp", take_profit)):
+            if not trigger:
+                continue
+            if key in protection:
+                self._cancel(protection.pop(key))
+            order = self._new_order(
+                symbol, "market", exit_side, abs(position.contracts),
+                trigger_price=trigger, reduce_only=True, position_level=True,
+            )
+            if key == "tp":
+                # TP позиции срабатывает при движении цены в сторону прибыли
+                order.direction = -order.direction
+            protection[key] = order
+            self._indexes[(symbol, STOP, order.direction)].add(order)
+        logger.info("[PAPER] TP/SL установлены для %s: SL=%s, TP=%s", symbol, stop_loss, take_profit)
+        return {"retCode": 0, "retMsg": "OK", "paper": True}
+
+    async def fetch_order(self, order_id: str, symbol: str) -> dict:
+        order = self._orders.get(order_id) or self._closed.get(order_id)
+        if order is None:
+            raise ccxt_errors.OrderNotFound(f"[PAPER] ордер {order_id} не найден")
+        return order.to_ccxt()
+
+    async def cancel_order(self, order_id: str, symbol: str, params: dict = None) -> dict:
+        order = self._orders.get(order_id)
+        if order is None:
+            raise ccxt_errors.OrderNotFound(f"[PAPER] ордер {order_id} не найден или уже закрыт")
+        self._cancel(order)
+        return order.to_ccxt()
+
+    async def fetch_open_orders(self, symbol: str = None, params: dict = None) -> list:
+        """Как у бирж: на OKX / Bitget условные ордера — только по {"trigger": True}"""
+        trigger = bool((params or {}).get("trigger"))
+        separate = self.exchange_name in SEPARATE_CONDITIONAL
+        return [
+            order.to_ccxt()
+            for order in self._orders.values()
+            if (symbol is None or order.symbol == symbol)
+            and (not separate or (order.kind == STOP) == trigger)
+            and (separate or not trigger or order.kind == STOP)
+        ]
+
+    async def edit_stop_orders(self, orders: list[dict]) -> list:
+        results = []
+        for request in orders:
+            order = self._orders.get(request["id"])
+            if order is None or order.kind != STOP:
+                results.append(ccxt_errors.OrderNotFound(f"[PAPER] стоп {request['id']} не найден"))
+                continue
+            index = self._indexes[(order.symbol, STOP, order.direction)]
+            index.remove(order)
+            order.trigger = request["trigger_price"]
+            index.add(order)
+            results.append(order.to_ccxt())
+        return results
@@ -0,0 +1,56 @@
+import asyncio
+from collections import defaultdict
+
+from app.exchange.client import ExchangeClient
+from app.exchange.factory import ExchangeFactory
+from app.risk.exposure import exposure_ledger
+from app.utils.logger import logger
+
+
+class ExchangePool:
+    """
+    Общие клиенты бирж процесса.
+
+    Один клиент (одни markets, одно соединение, один лимитер запросов)
+    на биржу для всех потребителей: OrderManager, баланс, маршрутизация.
+    """
+
+    def __init__(self):
+        self.clients: dict[str, ExchangeClient] = {}
+        self._locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def get(self, exchange_name: str) -> ExchangeClient:
+        """Клиент биржи с загруженными рынками (создаётся при первом обращении)"""
+        client = self.clients.get(exchange_name)
+        if client is not None:
+            return client
+
+        # лок не даёт параллельным запросам создать несколько клиентов одной биржи
+        async with self._locks[exchange_name]:
+            if exchange_name not in self.clients:
+                client = ExchangeFactory.create_client(exchange_name)
+                try:
+                    await client.load_markets()
+                except BaseException:
+                    # иначе каждая повторная попытка оставляла бы открытую aiohttp сессию
+                    try:
+                        await client.close()
+                    except Exception as e:
+                        logger.warning(f"Ошибка закрытия клиента {exchange_name}: {e}")
+                    raise
+                self.clients[exchange_name] = client
+                await exposure_ledger.attach(exchange_name, client)
+        return self.clients[exchange_name]
+
+    async def close_all(self) -> None:
+        for exchange_name, client in list(self.clients.items()):
+            exposure_ledger.detach(exchange_name)
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning(f"Ошибка закрытия клиента {exchange_name}: {e}")
+        self.clients.clear()
+
+
+# Общий пул клиентов процесса
+exchange_pool = ExchangePool()
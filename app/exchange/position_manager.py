@@ -0,0 +1,350 @@
+import asyncio
+from collections import defaultdict
+from typing import Optional
+
+from app.config.settings import settings
+from app.exchange.market_data import market_data, Ticker
+from app.exchange.pool import exchange_pool
+from app.exchange.reconciler import position_reconciler
+from app.utils.logger import logger
+from app.utils.triggers import TriggerIndex
+
+
+class ManagedPosition:
+    """
+    Открытая позиция под управлением безубытка и трейлинга.
+
+    Все уровни считаются в R — расстоянии от входа до исходного SL.
+    """
+
+    __slots__ = (
+        "exchange", "symbol", "side", "entry_price", "amount", "stop_loss",
+        "stop_loss_order_id", "position_idx", "risk", "breakeven_done",
+        "trailing_active", "trail_anchor", "trigger", "seq",
+    )
+
+    def __init__(
+        self,
+        exchange: str,
+        symbol: str,
+        side: str,
+        entry_price: float,
+        amount: float,
+        stop_loss: float,
+        stop_loss_order_id: Optional[str],
+        position_idx: Optional[int],
+        seq: int,
+    ):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.side = side                    # сторона входа: buy / sell
+        self.entry_price = entry_price
+        self.amount = amount
+        self.stop_loss = stop_loss
+        self.stop_loss_order_id = stop_loss_order_id
+        self.position_idx = position_idx
+        self.risk = abs(entry_price - stop_loss)
+        self.breakeven_done = False
+        self.trailing_active = False
+        self.trail_anchor = entry_price     # цена последнего подтягивания стопа
+        self.trigger: Optional[float] = None
+        self.seq = seq                      # порядок при равных уровнях
+
+    @property
+    def direction(self) -> int:
+        return 1 if self.side == "buy" else -1
+
+    @property
+    def position_level(self) -> bool:
+        """SL задан на саму позицию (Bybit trading-stop), а не ордером"""
+        return str(self.stop_loss_order_id).startswith("position_")
+
+    def level(self, r_multiple: float) -> float:
+        """Цена на r_multiple R в сторону прибыли от входа"""
+        return self.entry_price + self.direction * r_multiple * self.risk
+
+    def improves(self, stop_loss: float) -> bool:
+        """Новый стоп ближе к цене, чем текущий (стоп только подтягивается)"""
+        return (stop_loss - self.stop_loss) * self.direction > 0
+
+    def to_dict(self) -> dict:
+        return {
+            "exchange": self.exchange,
+            "symbol": self.symbol,
+            "side": self.side,
+            "entry_price": self.entry_price,
+            "amount": self.amount,
+            "stop_loss": self.stop_loss,
+            "breakeven": self.breakeven_done,
+            "trailing": self.trailing_active,
+            "next_trigger": self.trigger,
+        }
+
+
+class PositionManager:
+    """
+    Безубыток и трейлинг-стоп открытых позиций по потоку цен.
+
+    Цены приходят из MarketDataCache (websocket при exchange_streams,
+    иначе фоновый опрос). На тик проверяется только граница сработавших
+    уровней в TriggerIndex символа; у позиции в индексе всегда один
+    ближайший уровень (безубыток, активация трейлинга или следующий
+    шаг трейлинга).
+
+    Новые стопы не отправляются на каждый тик: они копятся и раз в
+    stop_amend_interval уходят на биржу пачкой (edit_orders, где
+    биржа умеет пакетное изменение).
+    """
+
+    def __init__(self):
+        self._positions: dict[tuple[str, str, str], ManagedPosition] = {}
+        # (exchange, symbol, direction) -> индекс уровней
+        self._indexes: dict[tuple[str, str, int], TriggerIndex[ManagedPosition]] = defaultdict(TriggerIndex)
+        self._pending: dict[tuple[str, str, str], ManagedPosition] = {}
+        self._flush_event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._seq = 0
+        self.amendments_total = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.breakeven_trigger_r or settings.trailing_activation_r)
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            market_data.subscribe(self.on_tick)
+            position_reconciler.on_position_closed(self.forget)
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    # ------------------------------------------------------------------
+    # POSITIONS
+    # ------------------------------------------------------------------
+
+    def track(
+        self,
+        exchange: str,
+        symbol: str,
+        side: str,
+        entry_price: Optional[float],
+        amount: float,
+        stop_loss: float,
+        stop_loss_order: Optional[dict],
+        position_idx: Optional[int] = None,
+    ) -> None:
+        """Берёт позицию под управление (повторный вход по символу заменяет прежний)"""
+        if not self.enabled or not entry_price or not stop_loss or not stop_loss_order:
+            return
+
+        key = (exchange, symbol, side)
+        self._remove(key)
+        self._seq += 1
+        position = ManagedPosition(
+            exchange, symbol, side, entry_price, amount, stop_loss,
+            stop_loss_order.get("id"), position_idx, self._seq,
+        )
+        if not position.risk:
+            return
+        self._positions[key] = position
+        self._arm(position)
+        market_data.watch(exchange, symbol)
+
+    def forget(self, exchange: str, symbol: str, side: str) -> None:
+        """Позиция закрыта"""
+        self._remove((exchange, symbol, side))
+
+    def snapshot(self) -> list[dict]:
+        return [position.to_dict() for position in self._positions.values()]
+
+    def _remove(self, key: tuple[str, str, str]) -> None:
+        position = self._positions.pop(key, None)
+        self._pending.pop(key, None)
+        if position is not None and position.trigger is not None:
+            self._indexes[(position.exchange, position.symbol, position.direction)].remove(position)
+
+    # ------------------------------------------------------------------
+    # TICKS
+    # ------------------------------------------------------------------
+
+    def on_tick(self, exchange_name: str, symbol: str, ticker: Ticker) -> None:
+        """Новая цена символа (вызывается из MarketDataCache, без await)"""
+        price = ticker.last
+        if not price:
+            return
+        for direction in (1, -1):
+            index = self._indexes.get((exchange_name, symbol, direction))
+            if not index:
+                continue
+            for position in index.pop_triggered(direction * price):
+                self._advance(position, price)
+                self._arm(position)
+            # символ остаётся в опросе, пока по нему есть правила
+            market_data.watch(exchange_name, symbol)
+
+    def _advance(self, position: ManagedPosition, price: float) -> None:
+        """Цена дошла до уровня позиции — считаем новый стоп"""
+        direction = position.direction
+        candidates = []
+
+        if (
+            settings.breakeven_trigger_r
+            and not position.breakeven_done
+            and (price - position.level(settings.breakeven_trigger_r)) * direction >= 0
+        ):
+            position.breakeven_done = True
+            offset = position.entry_price * settings.breakeven_offset_bps / 10_000
+            candidates.append(position.entry_price + direction * offset)
+
+        if (
+            settings.trailing_activation_r
+            and (price - position.level(settings.trailing_activation_r)) * direction >= 0
+        ):
+            position.trailing_active = True
+            position.trail_anchor = price
+            candidates.append(price - direction * settings.trailing_distance_r * position.risk)
+
+        # стоп подтягивается только в сторону прибыли и остаётся по ту сторону цены
+        candidates = [
+            stop_loss for stop_loss in candidates
+            if position.improves(stop_loss) and (price - stop_loss) * direction > 0
+        ]
+        if not candidates:
+            return
+        position.stop_loss = max(candidates) if direction > 0 else min(candidates)
+        self._pending[(position.exchange, position.symbol, position.side)] = position
+        self._flush_event.set()
+
+    def _arm(self, position: ManagedPosition) -> None:
+        """Ставит ближайший будущий уровень позиции в индекс"""
+        levels = []
+        if settings.breakeven_trigger_r and not position.breakeven_done:
+            levels.append(position.level(settings.breakeven_trigger_r))
+        if settings.trailing_activation_r:
+            if position.trailing_active:
+                levels.append(
+                    position.trail_anchor
+                    + position.direction * settings.trailing_step_r * position.risk
+                )
+            else:
+                levels.append(position.level(settings.trailing_activation_r))
+
+        if not levels:
+            position.trigger = None
+            return
+        position.trigger = min(levels) if position.direction > 0 else max(levels)
+        self._indexes[(position.exchange, position.symbol, position.direction)].add(position)
+
+    # ------------------------------------------------------------------
+    # AMENDMENTS
+    # ------------------------------------------------------------------
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._flush_event.wait()
+            # тики за интервал сливаются в одно изменение на позицию
+            await asyncio.sleep(settings.stop_amend_interval)
+            self._flush_event.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"[TRAIL] отправка стопов не удалась: {e}")
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        groups: dict[str, list[ManagedPosition]] = defaultdict(list)
+        for position in pending.values():
+            groups[position.exchange].append(position)
+        await asyncio.gather(*(
+            self._amend_exchange(exchange_name, positions)
+            for exchange_name, positions in groups.items()
+        ))
+
+    async def _amend_exchange(self, exchange_name: str, positions: list[ManagedPosition]) -> None:
+        client = await exchange_pool.get(exchange_name)
+        for position in positions:
+            position.stop_loss = client.get_quantizer(position.symbol).price(position.stop_loss)
+
+        position_level = [position for position in positions if position.position_level]
+        order_level = [position for position in positions if not position.position_level]
+
+        # позиционный стоп Bybit меняется только по одному символу
+        results = await asyncio.gather(
+            *(
+                client.set_position_tp_sl(
+                    symbol=position.symbol,
+                    stop_loss=position.stop_loss,
+                    position_idx=position.position_idx,
+                )
+                for position in position_level
+            ),
+            return_exceptions=True,
+        )
+        for position, result in zip(position_level, results):
+            if result is None or isinstance(result, Exception):
+                logger.error(f"[TRAIL] {exchange_name} {position.symbol}: стоп не изменён: {result}")
+            else:
+                self._amended(position)
+
+        if not order_level:
+            return
+
+        results = await client.edit_stop_orders([
+            {
+                "id": position.stop_loss_order_id,
+                "symbol": position.symbol,
+                "side": "sell" if position.side == "buy" else "buy",
+                "amount": position.amount,
+                "trigger_price": position.stop_loss,
+            }
+            for position in order_level
+        ])
+        for position, result in zip(order_level, results):
+            if isinstance(result, Exception):
+                await self._replace_stop(client, position, result)
+            else:
+                self._amended(position)
+
+    async def _replace_stop(self, client, position: ManagedPosition, error: Exception) -> None:
+        """Биржа не изменила стоп — переставляем его (новый, затем снятие старого)"""
+        logger.info(f"[TRAIL] {position.exchange} {position.symbol}: изменение не прошло ({error}), переставляем")
+        try:
+            order = await client.create_stop_loss_order(
+                symbol=position.symbol,
+                side="sell" if position.side == "buy" else "buy",
+                amount=position.amount,
+                price=position.stop_loss,
+            )
+        except Exception as e:
+            logger.error(f"[TRAIL] {position.exchange} {position.symbol}: новый стоп не выставлен: {e}")
+            return
+
+        previous_id, position.stop_loss_order_id = position.stop_loss_order_id, order.get("id")
+        try:
+            await client.cancel_order(previous_id, position.symbol, {"trigger": True})
+        except Exception as e:
+            logger.warning(f"[TRAIL] не удалось снять прежний стоп {previous_id}: {e}")
+        self._amended(position)
+
+    def _amended(self, position: ManagedPosition) -> None:
+        self.amendments_total += 1
+        position_reconciler.update_stop_loss(
+            position.exchange, position.symbol, position.side,
+            position.stop_loss, position.stop_loss_order_id,
+        )
+        logger.info(
+            "[TRAIL] %s %s %s | SL -> %s | breakeven=%s trailing=%s",
+            position.exchange, position.symbol, position.side, position.stop_loss,
+            position.breakeven_done, position.trailing_active,
+        )
+
+
+# Общий менеджер позиций процесса
+position_manager = PositionManager()
@@ -0,0 +1,209 @@
+import math
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from app.exchange.loader import import_ccxt
+
+DECIMAL_PLACES = import_ccxt("ccxt.base.decimal_to_precision").DECIMAL_PLACES
+
+
+class QuantizedOrder(NamedTuple):
+    """
+    Результат квантования ордера под правила рынка.
+    """
+    amount: float
+    entry_price: Optional[float]
+    stop_loss: float
+    take_profit: float
+    notional: float
+
+
+def _step_decimals(step: float) -> int:
+    """Количество знаков после запятой у шага (0.001 -> 3, 5 -> 0)"""
+    exponent = Decimal(str(step)).normalize().as_tuple().exponent
+    return max(0, -exponent)
+
+
+class MarketQuantizer:
+    """
+    Предкомпилированный квантователь для одного рынка.
+
+    Все шаги и лимиты извлекаются из метаданных ccxt один раз,
+    дальше округление и проверки — чистая арифметика над float,
+    без обращения к бирже.
+    """
+
+    __slots__ = (
+        "symbol",
+        "amount_step",
+        "amount_decimals",
+        "price_step",
+        "price_decimals",
+        "min_amount",
+        "max_amount",
+        "max_market_amount",
+        "min_cost",
+        "contract_size",
+    )
+
+    # защита от ошибок представления float (0.3 / 0.1 = 2.9999999999999996)
+    _EPS = 1e-9
+
+    def __init__(
+        self,
+        symbol: str,
+        amount_step: float,
+        price_step: float,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        max_market_amount: Optional[float] = None,
+        min_cost: Optional[float] = None,
+        contract_size: float = 1.0,
+    ):
+        self.symbol = symbol
+        self.amount_step = amount_step
+        self.amount_decimals = _step_decimals(amount_step)
+        self.price_step = price_step
+        self.price_decimals = _step_decimals(price_step)
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.max_market_amount = max_market_amount or max_amount
+        self.min_cost = min_cost
+        self.contract_size = contract_size or 1.0
+
+    @classmethod
+    def from_market(cls, market: dict, precision_mode: int) -> "MarketQuantizer":
+        """
+        Сборка квантователя из market-словаря ccxt
+
+        Args:
+            market: результат client.market(symbol)
+            precision_mode: exchange.precisionMode (TICK_SIZE или DECIMAL_PLACES)
+        """
+        precision = market.get("precision") or {}
+        limits = market.get("limits") or {}
+        info = market.get("info") or {}
+
+        def to_step(value) -> float:
+            if value is None:
+                return 0.0
+            if precision_mode == DECIMAL_PLACES:
+                return 10.0 ** -int(value)
+            return float(value)
+
+        amount_limits = limits.get("amount") or {}
+        market_limits = limits.get("market") or {}
+        cost_limits = limits.get("cost") or {}
+
+        # Bybit отдаёт minNotionalValue / maxMktOrderQty только в сыром info
+        lot_filter = info.get("lotSizeFilter") or {}
+        min_cost = cost_limits.get("min") or lot_filter.get("minNotionalValue")
+        max_market_amount = market_limits.get("max") or lot_filter.get("maxMktOrderQty")
+
+        return cls(
+            symbol=market["symbol"],
+            amount_step=to_step(precision.get("amount")),
+            price_step=to_step(precision.get("price")),
+            min_amount=amount_limits.get("min"),
+            max_amount=amount_limits.get("max"),
+            max_market_amount=float(max_market_amount) if max_market_amount else None,
+            min_cost=float(min_cost) if min_cost else None,
+            contract_size=market.get("contractSize") or 1.0,
+        )
+
+    # ------------------------------------------------------------------
+    # ROUNDING
+    # ------------------------------------------------------------------
+
+    def amount(self, value: float) -> float:
+        """Округление количества вниз до шага лота"""
+        step = self.amount_step
+        if not step:
+            return value
+        steps = math.floor(value / step + self._EPS)
+        return round(steps * step, self.amount_decimals)
+
+    def notional(self, amount: float, price: float) -> float:
+        """Номинал в USDT: количество в контрактах × размер контракта × цена"""
+        return amount * self.contract_size * price
+
+    def price(self, value: float) -> float:
+        """Округление цены до ближайшего тика"""
+        step = self.price_step
+        if not step:
+            return value
+        steps = math.floor(value / step + 0.5)
+        return round(steps * step, self.price_decimals)
+
+    # ------------------------------------------------------------------
+    # ORDER
+    # ------------------------------------------------------------------
+
+    def quantize(
+        self,
+        amount: float,
+        price: float,
+        stop_loss: float,
+        take_profit: float,
+        side: str,
+        order_type: str = "market",
+        entry_price: Optional[float] = None,
+    ) -> QuantizedOrder:
+        """
+        Приведение параметров сделки к правилам рынка с локальной проверкой лимитов
+
+        Args:
+            amount: количество из риск-стратегии
+            price: цена для расчёта номинала
+            stop_loss: цена стоп-лосса
+            take_profit: цена тейк-профита
+            side: buy / sell
+            order_type: market / limit
+            entry_price: цена limit-ордера (если есть)
+
+        Returns:
+            QuantizedOrder
+
+        Raises:
+            ValueError если ордер будет отклонён биржей
+        """
+        q_amount = self.amount(amount)
+        q_entry = self.price(entry_price) if entry_price else None
+        q_stop = self.price(stop_loss)
+        q_take = self.price(take_profit)
+
+        ref_price = q_entry or price
+        notional = self.notional(q_amount, ref_price)
+
+        if q_amount <= 0:
+            raise ValueError(
+                f"{self.symbol}: количество {amount} меньше шага лота {self.amount_step}"
+            )
+
+        if self.min_amount and q_amount < self.min_amount:
+            raise ValueError(
+                f"{self.symbol}: количество {q_amount} меньше минимального {self.min_amount}"
+            )
+
+        max_amount = self.max_market_amount if order_type == "market" else self.max_amount
+        if max_amount and q_amount > max_amount:
+            raise ValueError(
+                f"{self.symbol}: количество {q_amount} больше максимального {max_amount}"
+            )
+
+        if self.min_cost and notional < self.min_cost:
+            raise ValueError(
+                f"{self.symbol}: номинал {notional:.4f} меньше минимального {self.min_cost}"
+            )
+
+        # после округления SL / TP должны остаться по свою сторону от цены
+        if side == "buy":
+            valid = q_stop < ref_price < q_take
+        else:
+            valid = q_take < ref_price < q_stop
+        if not valid:
+            raise ValueError(
+                f"{self.symbol}: SL={q_stop} / TP={q_take} схлопнулись с ценой {ref_price} после округления"
+            )
+
+        return QuantizedOrder(q_amount, q_entry, q_stop, q_take, notional)
@@ -0,0 +1,330 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Callable, Optional
+
+from app.config.settings import settings
+from app.exchange.client import ExchangeClient
+from app.exchange.pool import exchange_pool
+from app.utils.logger import logger
+
+# Биржи, где условные (trigger) ордера отдаются отдельным запросом
+CONDITIONAL_ORDER_PARAMS = {
+    "okx": {"trigger": True},
+    "bitget": {"trigger": True},
+}
+
+
+class ExpectedProtection:
+    """
+    Защита, которую бот выставил на позицию и ожидает увидеть на бирже.
+    """
+
+    __slots__ = (
+        "exchange", "symbol", "side", "stop_loss", "take_profit",
+        "stop_loss_order_id", "take_profit_order_id", "entry_order_id", "registered_at",
+    )
+
+    def __init__(
+        self,
+        exchange: str,
+        symbol: str,
+        side: str,
+        stop_loss: float,
+        take_profit: float,
+        stop_loss_order_id: Optional[str],
+        take_profit_order_id: Optional[str],
+        entry_order_id: Optional[str] = None,
+    ):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.side = side                    # сторона входа: buy / sell
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.stop_loss_order_id = stop_loss_order_id
+        self.take_profit_order_id = take_profit_order_id
+        self.entry_order_id = entry_order_id    # limit вход: позиции нет, пока он не исполнен
+        self.registered_at = time.monotonic()
+
+    @property
+    def position_side(self) -> str:
+        return "long" if self.side == "buy" else "short"
+
+    @property
+    def exit_side(self) -> str:
+        return "sell" if self.side == "buy" else "buy"
+
+    @property
+    def position_level(self) -> bool:
+        """SL / TP заданы на саму позицию (Bybit trading-stop), а не ордерами"""
+        return str(self.stop_loss_order_id).startswith("position_")
+
+    def to_dict(self) -> dict:
+        return {
+            "exchange": self.exchange,
+            "symbol": self.symbol,
+            "side": self.side,
+            "stop_loss": self.stop_loss,
+            "take_profit": self.take_profit,
+            "stop_loss_order_id": self.stop_loss_order_id,
+            "take_profit_order_id": self.take_profit_order_id,
+            "entry_order_id": self.entry_order_id,
+        }
+
+
+class PositionReconciler:
+    """
+    Периодическая сверка защиты открытых позиций.
+
+    За цикл на каждую биржу с ожидаемой защитой уходит один запрос
+    позиций и один запрос открытых ордеров аккаунта (плюс запрос
+    условных ордеров там, где они отдельно), независимо от числа
+    символов. Ожидаемое состояние хранится в памяти; расхождения:
+
+    - позиции нет — ожидание снимается, оставшиеся SL / TP ордера бота
+      отменяются (иначе сработают на будущей позиции); пока limit вход
+      ещё стоит в книге, позиции и не должно быть — ожидание остаётся;
+    - нет SL или TP — защита выставляется заново на текущий объём.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        # (exchange, symbol, side входа) -> ожидаемая защита
+        self._expected: dict[tuple[str, str, str], ExpectedProtection] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._closed_callbacks: list[Callable[[str, str, str], None]] = []
+        self.repairs_total = 0
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self.interval and self._task is None:
+            self._task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    # ------------------------------------------------------------------
+    # EXPECTED STATE
+    # ------------------------------------------------------------------
+
+    def expect(
+        self,
+        exchange: str,
+        symbol: str,
+        side: str,
+        stop_loss: float,
+        take_profit: float,
+        stop_loss_order: Optional[dict],
+        take_profit_order: Optional[dict],
+        entry_order_id: Optional[str] = None,
+    ) -> None:
+        """
+        Запоминает защиту позиции (последняя сделка по символу заменяет прежнюю).
+
+        entry_order_id — ордер входа: пока он открыт, отсутствие позиции
+        не считается её закрытием.
+        """
+        self._expected[(exchange, symbol, side)] = ExpectedProtection(
+            exchange,
+            symbol,
+            side,
+            stop_loss,
+            take_profit,
+            stop_loss_order.get("id") if stop_loss_order else None,
+            take_profit_order.get("id") if take_profit_order else None,
+            entry_order_id,
+        )
+
+    def update_stop_loss(
+        self, exchange: str, symbol: str, side: str, stop_loss: float, order_id: Optional[str] = None
+    ) -> None:
+        """SL позиции перенесён (безубыток / трейлинг)"""
+        expected = self._expected.get((exchange, symbol, side))
+        if expected is None:
+            return
+        expected.stop_loss = stop_loss
+        if order_id is not None:
+            expected.stop_loss_order_id = order_id
+
+    def on_position_closed(self, callback: Callable[[str, str, str], None]) -> None:
+        """callback(exchange, symbol, side) — сверка не нашла позицию на бирже"""
+        self._closed_callbacks.append(callback)
+
+    def snapshot(self) -> list[dict]:
+        return [expected.to_dict() for expected in self._expected.values()]
+
+    # ------------------------------------------------------------------
+    # RECONCILE
+    # ------------------------------------------------------------------
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            exchanges = sorted({expected.exchange for expected in self._expected.values()})
+            results = await asyncio.gather(
+                *(self.reconcile(name) for name in exchanges), return_exceptions=True
+            )
+            for exchange_name, result in zip(exchanges, results):
+                if isinstance(result, Exception):
+                    logger.warning(f"[RECONCILE] {exchange_name}: сверка не удалась: {result}")
+
+    async def reconcile(self, exchange_name: str) -> int:
+        """
+        Одна сверка биржи.
+
+        Returns:
+            число исправленных расхождений
+        """
+        client = await exchange_pool.get(exchange_name)
+        started_at = time.monotonic()
+
+        positions, open_orders = await asyncio.gather(
+            client.fetch_positions(),
+            self._fetch_protection_orders(client),
+        )
+
+        by_position: dict[tuple[str, str], dict] = {}
+        for position in positions:
+            if position.get("contracts"):
+                by_position[(position["symbol"], position.get("side"))] = position
+
+        orders_by_symbol: dict[str, list[dict]] = defaultdict(list)
+        for order in open_orders:
+            orders_by_symbol[order["symbol"]].append(order)
+
+        repaired = 0
+        for key, expected in list(self._expected.items()):
+            # защита, записанная после запроса позиций, сверяется в следующем цикле
+            if expected.exchange != exchange_name or expected.registered_at > started_at:
+                continue
+
+            position = by_position.get((expected.symbol, expected.position_side))
+            orders = orders_by_symbol.get(expected.symbol, [])
+
+            try:
+                if position is None:
+                    if self._entry_pending(expected, orders):
+                        continue
+                    await self._forget(client, key, expected, orders)
+                elif expected.position_level:
+                    repaired += await self._repair_position_level(client, expected, position)
+                else:
+                    repaired += await self._repair_orders(client, expected, position, orders)
+            except Exception as e:
+                logger.error(f"[RECONCILE] {exchange_name} {expected.symbol}: исправление не удалось: {e}")
+
+        self.repairs_total += repaired
+        logger.debug(
+            "[RECONCILE] %s | позиций=%s ордеров=%s ожиданий=%s исправлено=%s | %.1f ms",
+            exchange_name, len(by_position), len(open_orders), len(self._expected), repaired,
+            (time.monotonic() - started_at) * 1000,
+        )
+        return repaired
+
+    async def _fetch_protection_orders(self, client: ExchangeClient) -> list[dict]:
+        """Открытые ордера аккаунта одним запросом (плюс условные, если они отдельно)"""
+        orders = await client.fetch_open_orders()
+        params = CONDITIONAL_ORDER_PARAMS.get(client.exchange_name)
+        if params:
+            orders = orders + await client.fetch_open_orders(params=dict(params))
+        return orders
+
+    @staticmethod
+    def _entry_pending(expected: ExpectedProtection, orders: list[dict]) -> bool:
+        """Ордер входа ещё не исполнен и не отменён — позиция впереди"""
+        return expected.entry_order_id is not None and any(
+            order["id"] == expected.entry_order_id for order in orders
+        )
+
+    async def _forget(
+        self, client: ExchangeClient, key: tuple, expected: ExpectedProtection, orders: list[dict]
+    ) -> None:
+        """Позиция закрыта: снимаем ожидание и оставшиеся защитные ордера бота"""
+        self._expected.pop(key, None)
+        for callback in self._closed_callbacks:
+            callback(expected.exchange, expected.symbol, expected.side)
+        open_ids = {order["id"] for order in orders}
+        leftovers = (
+            (expected.stop_loss_order_id, {"trigger": True}),
+            (expected.take_profit_order_id, {}),
+        )
+        for order_id, params in leftovers:
+            if order_id in open_ids:
+                try:
+                    await client.cancel_order(order_id, expected.symbol, params)
+                except Exception as e:
+                    logger.warning(f"[RECONCILE] не удалось снять ордер {order_id} {expected.symbol}: {e}")
+        logger.info(f"[RECONCILE] {expected.exchange} {expected.symbol}: позиция закрыта")
+
+    async def _repair_position_level(
+        self, client: ExchangeClient, expected: ExpectedProtection, position: dict
+    ) -> int:
+        if position.get("stopLossPrice") and position.get("takeProfitPrice"):
+            return 0
+
+        logger.warning(
+            f"[RECONCILE] {expected.exchange} {expected.symbol}: на позиции нет SL / TP — выставляем"
+        )
+        position_idx = (position.get("info") or {}).get("positionIdx")
+        result = await client.set_position_tp_sl(
+            symbol=expected.symbol,
+            stop_loss=expected.stop_loss,
+            take_profit=expected.take_profit,
+            position_idx=int(position_idx) if position_idx is not None else None,
+        )
+        return 1 if result is not None else 0
+
+    async def _repair_orders(
+        self,
+        client: ExchangeClient,
+        expected: ExpectedProtection,
+        position: dict,
+        orders: list[dict],
+    ) -> int:
+        has_stop_loss = any(
+            order["id"] == expected.stop_loss_order_id
+            or self._same_price(self._trigger_price(order), expected.stop_loss)
+            for order in orders
+        )
+        has_take_profit = any(
+            order["id"] == expected.take_profit_order_id
+            or self._same_price(order.get("price"), expected.take_profit)
+            for order in orders
+        )
+        if has_stop_loss and has_take_profit:
+            return 0
+
+        amount = client.get_quantizer(expected.symbol).amount(position["contracts"])
+        repaired = 0
+        if not has_stop_loss:
+            logger.warning(f"[RECONCILE] {expected.exchange} {expected.symbol}: нет SL — выставляем")
+            order = await client.create_stop_loss_order(
+                symbol=expected.symbol, side=expected.exit_side, amount=amount, price=expected.stop_loss
+            )
+            expected.stop_loss_order_id = order.get("id")
+            repaired += 1
+        if not has_take_profit:
+            logger.warning(f"[RECONCILE] {expected.exchange} {expected.symbol}: нет TP — выставляем")
+            order = await client.create_take_profit_order(
+                symbol=expected.symbol, side=expected.exit_side, amount=amount, price=expected.take_profit
+            )
+            expected.take_profit_order_id = order.get("id")
+            repaired += 1
+        return repaired
+
+    @staticmethod
+    def _trigger_price(order: dict) -> Optional[float]:
+        return order.get("triggerPrice") or order.get("stopPrice")
+
+    @staticmethod
+    def _same_price(price: Optional[float], expected: float) -> bool:
+        return bool(price) and abs(price - expected) <= abs(expected) * 1e-6
+
+
+# Общий сверщик защиты процесса
+position_reconciler = PositionReconciler(settings.position_reconcile_interval)
@@ -0,0 +1,232 @@
+import asyncio
+import json
+import random
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from app.config.settings import settings
+from app.exchange.circuit_breaker import CircuitOpenError, TRADING
+from app.exchange.loader import import_ccxt
+from app.utils.deadline import DeadlineExceeded, active_deadline
+from app.utils.logger import logger
+
+ccxt_errors = import_ccxt("ccxt.base.errors")
+
+T = TypeVar("T")
+
+
+# ----------------------------------------------------------------------
+# ERROR CLASSES
+# ----------------------------------------------------------------------
+
+NETWORK = "network"                     # сеть, таймаут, биржа недоступна
+RATE_LIMIT = "rate_limit"               # лимит запросов / DDoS-защита
+NONCE = "nonce"                         # nonce / timestamp вне окна биржи
+INSUFFICIENT_FUNDS = "insufficient_funds"
+INVALID_ORDER = "invalid_order"         # ордер отклонён по параметрам
+NO_CHANGE = "no_change"                 # значение уже установлено
+AUTH = "auth"                           # ключи, права, блокировка аккаунта
+BAD_REQUEST = "bad_request"             # символ, аргументы, неподдерживаемый метод
+CIRCUIT_OPEN = "circuit_open"
+DEADLINE = "deadline"
+EXCHANGE = "exchange"                   # прочие ошибки биржи
+UNKNOWN = "unknown"
+
+# Порядок важен: подклассы ccxt раньше базовых
+_CLASSES = (
+    (ccxt_errors.RateLimitExceeded, RATE_LIMIT),
+    (ccxt_errors.DDoSProtection, RATE_LIMIT),
+    (ccxt_errors.InvalidNonce, NONCE),
+    (ccxt_errors.NetworkError, NETWORK),
+    (ccxt_errors.InsufficientFunds, INSUFFICIENT_FUNDS),
+    (ccxt_errors.InvalidOrder, INVALID_ORDER),
+    (ccxt_errors.NoChange, NO_CHANGE),
+    (ccxt_errors.AuthenticationError, AUTH),
+    (ccxt_errors.BadRequest, BAD_REQUEST),
+    (ccxt_errors.ArgumentsRequired, BAD_REQUEST),
+    (ccxt_errors.NotSupported, BAD_REQUEST),
+    (ccxt_errors.BadResponse, EXCHANGE),
+    (ccxt_errors.ExchangeError, EXCHANGE),
+    (CircuitOpenError, CIRCUIT_OPEN),
+    (DeadlineExceeded, DEADLINE),
+    (asyncio.TimeoutError, NETWORK),
+)
+
+# Ошибки, после которых запрос можно повторить. Для неидемпотентных
+# вызовов (создание ордера) — только те, где биржа точно отклонила
+# запрос: при обрыве сети ордер мог быть принят.
+RETRYABLE = {NETWORK, RATE_LIMIT, NONCE}
+RETRYABLE_UNSAFE = {RATE_LIMIT, NONCE}
+
+# Торговые вызовы, повтор которых не создаёт второй ордер
+IDEMPOTENT_TRADING = {
+    "cancel_order",
+    "edit_order",
+    "edit_orders",
+    "private_post_v5_position_trading_stop",
+}
+
+# Коды бирж, которые ccxt относит к общему классу, а нам нужен точный
+EXCEPTION_OVERRIDES = {
+    "bybit": {
+        "110043": ccxt_errors.NoChange,     # leverage not modified
+    },
+}
+
+
+def classify(error: BaseException) -> str:
+    """Класс ошибки вызова биржи (по типу исключения ccxt)"""
+    for error_class, kind in _CLASSES:
+        if isinstance(error, error_class):
+            return kind
+    return UNKNOWN
+
+
+def is_retryable(error: BaseException, idempotent: bool) -> bool:
+    return classify(error) in (RETRYABLE if idempotent else RETRYABLE_UNSAFE)
+
+
+def is_idempotent(endpoint: str, method_name: str) -> bool:
+    """Чтения и настройки повторяемы; из торговых — только перечисленные"""
+    return endpoint != TRADING or method_name in IDEMPOTENT_TRADING
+
+
+# ----------------------------------------------------------------------
+# RETRY BUDGET
+# ----------------------------------------------------------------------
+
+class RetryBudget:
+    """
+    Бюджет повторов одной биржи.
+
+    Каждый вызов добавляет ratio жетона (не больше capacity), каждый
+    повтор забирает один. Пока биржа отвечает, повторы почти бесплатны;
+    при массовых отказах их доля ограничена ratio от потока запросов —
+    повторы не умножают нагрузку на лежащую биржу.
+    """
+
+    __slots__ = ("ratio", "capacity", "tokens", "retries_total", "exhausted_total")
+
+    def __init__(self, ratio: float, capacity: float):
+        self.ratio = ratio
+        self.capacity = capacity
+        self.tokens = capacity
+        self.retries_total = 0
+        self.exhausted_total = 0
+
+    def deposit(self) -> None:
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1.0:
+            self.exhausted_total += 1
+            return False
+        self.tokens -= 1.0
+        self.retries_total += 1
+        return True
+
+
+_budgets: dict[str, RetryBudget] = {}
+
+
+def get_budget(exchange_name: str) -> RetryBudget:
+    budget = _budgets.get(exchange_name)
+    if budget is None:
+        budget = RetryBudget(settings.retry_budget_ratio, settings.retry_budget_burst)
+        _budgets[exchange_name] = budget
+    return budget
+
+
+def backoff(retry: int) -> float:
+    """Full jitter: случайная пауза до base * 2^(retry - 1), не больше max_delay"""
+    return random.uniform(0, min(settings.retry_max_delay, settings.retry_base_delay * 2 ** (retry - 1)))
+
+
+# ----------------------------------------------------------------------
+# RETRY
+# ----------------------------------------------------------------------
+
+async def with_retry(
+    exchange_name: str,
+    endpoint: str,
+    name: str,
+    attempt: Callable[[], Awaitable[T]],
+) -> T:
+    """
+    Выполняет attempt с повторами по классу ошибки.
+
+    Повтор — только для повторяемых ошибок, пока есть попытки
+    (retry_max_attempts), жетон в бюджете биржи и остаток дедлайна
+    сигнала больше паузы перед повтором.
+    """
+    budget = get_budget(exchange_name)
+    budget.deposit()
+    idempotent = is_idempotent(endpoint, name)
+
+    retry = 0
+    while True:
+        try:
+            return await attempt()
+        except Exception as e:
+            retry += 1
+            if retry >= settings.retry_max_attempts or not is_retryable(e, idempotent):
+                raise
+
+            delay = backoff(retry)
+            deadline = active_deadline()
+            if deadline is not None and deadline.remaining <= delay:
+                raise
+            if not budget.withdraw():
+                logger.warning(
+                    "[RETRY] %s %s: бюджет повторов исчерпан (%s)", exchange_name, name, classify(e),
+                )
+                raise
+
+            logger.warning(
+                "[RETRY] %s %s: %s, повтор %s через %.2fс: %s",
+                exchange_name, name, classify(e), retry, delay, e,
+            )
+            await asyncio.sleep(delay)
+
+
+def retry_metrics() -> str:
+    """Повторы и отказы бюджета по биржам в текстовом формате Prometheus"""
+    lines = [
+        "# TYPE exchange_retries_total counter",
+        *(
+            f'exchange_retries_total{{exchange="{name}"}} {budget.retries_total}'
+            for name, budget in sorted(_budgets.items())
+        ),
+        "# TYPE exchange_retry_budget_exhausted_total counter",
+        *(
+            f'exchange_retry_budget_exhausted_total{{exchange="{name}"}} {budget.exhausted_total}'
+            for name, budget in sorted(_budgets.items())
+        ),
+        "# TYPE exchange_retry_budget_tokens gauge",
+        *(
+            f'exchange_retry_budget_tokens{{exchange="{name}"}} {budget.tokens:.2f}'
+            for name, budget in sorted(_budgets.items())
+        ),
+    ]
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------------------------------------------------
+# EXCHANGE MESSAGES
+# ----------------------------------------------------------------------
+
+def exchange_message(error: BaseException) -> Optional[str]:
+    """
+    Текст ошибки из ответа биржи.
+
+    ccxt передаёт тело ответа после имени биржи: 'bybit {"retCode": ...,
+    "retMsg": "..."}'; Bybit кладёт текст в retMsg, Binance / Bitget /
+    OKX — в msg.
+    """
+    _, _, body = str(error).partition(" ")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    return payload.get("retMsg") or payload.get("msg") or None
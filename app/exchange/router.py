@@ -0,0 +1,197 @@
+import asyncio
+import time
+from typing import NamedTuple, Optional
+
+from app.config.profiles import trading_profiles
+from app.config.settings import settings
+from app.exchange.balance import balance_service
+from app.exchange.circuit_breaker import is_available, MARKET_DATA, TRADING
+from app.exchange.factory import ExchangeFactory, SUPPORTED_EXCHANGES
+from app.exchange.market_data import market_data
+from app.exchange.pool import exchange_pool
+from app.models.order import OrderRequest
+from app.utils.logger import logger
+
+
+class VenueQuote(NamedTuple):
+    """
+    Оценка исполнения сигнала на одной бирже.
+    """
+    exchange: str
+    price: Optional[float]          # ask для покупки, bid для продажи
+    fee: float                      # taker комиссия
+    effective_price: Optional[float]  # цена с учётом комиссии
+    free_margin: Optional[float]    # из кэша балансов (None — неизвестно)
+    skip: Optional[str] = None      # причина исключения биржи
+
+
+class VenueRouter:
+    """
+    Выбор биржи для сигнала без явно указанной биржи.
+
+    Все кандидаты оцениваются параллельно по кэшированным данным:
+    вершина стакана (MarketDataCache), taker комиссия из markets,
+    свободная маржа (BalanceService). Выбирается биржа с лучшей
+    ожидаемой ценой исполнения с учётом комиссии, на которой хватает
+    маржи под ожидаемый номинал.
+    """
+
+    def __init__(self):
+        self._warmup: Optional[asyncio.Task] = None
+
+    @property
+    def venues(self) -> list[str]:
+        configured = ExchangeFactory.configured_exchanges()
+        if not settings.routing_exchanges:
+            return configured
+        selected = [name.strip().lower() for name in settings.routing_exchanges.split(",")]
+        return [name for name in selected if name in SUPPORTED_EXCHANGES and name in configured]
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Клиенты и markets всех бирж загружаются заранее, а не на первом сигнале"""
+        if settings.smart_routing and self._warmup is None:
+            self._warmup = asyncio.create_task(self._warm_up())
+
+    async def stop(self) -> None:
+        if self._warmup:
+            self._warmup.cancel()
+            self._warmup = None
+
+    async def _warm_up(self) -> None:
+        venues = self.venues
+        results = await asyncio.gather(
+            *(exchange_pool.get(name) for name in venues), return_exceptions=True
+        )
+        for exchange_name, result in zip(venues, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Маршрутизация: биржа {exchange_name} недоступна: {result}")
+
+    # ------------------------------------------------------------------
+    # ROUTE
+    # ------------------------------------------------------------------
+
+    async def route(self, order_request: OrderRequest) -> OrderRequest:
+        """
+        Запрос с лучшей биржей и обоснованием выбора в routing (оно
+        попадает в журнал сделки).
+
+        Если подходящих бирж нет, биржа сигнала остаётся прежней.
+        """
+        if not settings.smart_routing:
+            return order_request
+
+        venues = self.venues
+        if len(venues) < 2:
+            return order_request
+
+        start_time = time.perf_counter()
+        notional = self._expected_notional(order_request)
+
+        quotes = await asyncio.gather(
+            *(self._quote(name, order_request, notional) for name in venues)
+        )
+        eligible = [quote for quote in quotes if quote.skip is None]
+
+        if eligible:
+            if order_request.side == "buy":
+                best = min(eligible, key=lambda quote: quote.effective_price)
+            else:
+                best = max(eligible, key=lambda quote: quote.effective_price)
+            chosen = best.exchange
+        else:
+            chosen = order_request.exchange
+
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        order_request = order_request.with_changes(
+            exchange=chosen,
+            routing={
+                "chosen": chosen,
+                "requested": order_request.exchange,
+                "notional": notional,
+                "elapsed_ms": round(elapsed_ms, 3),
+                "venues": {quote.exchange: quote._asdict() for quote in quotes},
+            },
+        )
+
+        logger.info(
+            "[ROUTE] %s %s -> %s | %s | %.2f ms",
+            order_request.symbol,
+            order_request.side,
+            chosen,
+            ", ".join(
+                f"{quote.exchange}={quote.effective_price:.8g}" if quote.skip is None
+                else f"{quote.exchange}:{quote.skip}"
+                for quote in quotes
+            ),
+            elapsed_ms,
+        )
+        return order_request
+
+    async def route_many(
+        self, order_requests: list[OrderRequest], routable: list[bool]
+    ) -> list[OrderRequest]:
+        """Маршрутизирует запросы с routable=True, остальные возвращает как есть"""
+        routed = list(order_requests)
+        indexes = [index for index, flag in enumerate(routable) if flag]
+        results = await asyncio.gather(*(self.route(routed[index]) for index in indexes))
+        for index, order_request in zip(indexes, results):
+            routed[index] = order_request
+        return routed
+
+    @staticmethod
+    def _expected_notional(order_request: OrderRequest) -> float:
+        """Номинал, под который проверяется маржа (до расчёта риска — оценка сверху)"""
+        # биржа ещё не выбрана — профиль символа без привязки к бирже
+        profile = trading_profiles.resolve(None, order_request.symbol, order_request.strategy)
+        if profile.risk_mode == "fixed_size":
+            return profile.size_position
+        return settings.max_position_usdt
+
+    async def _quote(
+        self, exchange_name: str, order_request: OrderRequest, notional: float
+    ) -> VenueQuote:
+        snapshot = balance_service.get(exchange_name)
+        free_margin = snapshot.free_margin if snapshot and not snapshot.error else None
+
+        if not is_available(exchange_name, MARKET_DATA, TRADING):
+            return VenueQuote(exchange_name, None, 0.0, None, free_margin, "circuit open")
+
+        try:
+            client = await exchange_pool.get(exchange_name)
+            symbol = ExchangeFactory.get_symbol_format(
+                exchange_name, order_request.symbol, order_request.contract_type
+            )
+            if symbol not in client.client.markets:
+                return VenueQuote(exchange_name, None, 0.0, None, free_margin, "no market")
+
+            market = client.market(symbol)
+            fee = market.get("taker")
+            if fee is None:
+                fee = client.client.fees.get("trading", {}).get("taker") or 0.0
+
+            ticker = await market_data.ticker(exchange_name, symbol)
+        except Exception as e:
+            return VenueQuote(exchange_name, None, 0.0, None, free_margin, f"error: {e}")
+
+        if order_request.side == "buy":
+            price = ticker.ask or ticker.last
+            effective_price = price * (1 + fee) if price else None
+        else:
+            price = ticker.bid or ticker.last
+            effective_price = price * (1 - fee) if price else None
+
+        if not effective_price:
+            return VenueQuote(exchange_name, price, fee, None, free_margin, "no price")
+
+        if free_margin is not None and free_margin * order_request.leverage < notional:
+            return VenueQuote(exchange_name, price, fee, effective_price, free_margin, "margin")
+
+        return VenueQuote(exchange_name, price, fee, effective_price, free_margin)
+
+
+# Общий маршрутизатор процесса
+venue_router = VenueRouter()
@@ -0,0 +1,11 @@
+from app.config.settings import settings
+from .trade_journal import TradeJournal, TradeState
+
+# Общий журнал процесса; запускается в lifespan приложения
+trade_journal = TradeJournal(settings.journal_path)
+
+__all__ = [
+    "TradeJournal",
+    "TradeState",
+    "trade_journal",
+]
@@ -0,0 +1,232 @@
+import asyncio
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Optional
+
+from app.utils.logger import logger
+
+
+class TradeState:
+    """
+    Состояния сделки в журнале (в порядке переходов).
+    """
+    RECEIVED = "received"          # сигнал принят
+    SIZED = "sized"                # объём и SL/TP рассчитаны (на диске до отправки входа)
+    ENTRY_ACKED = "entry_acked"    # биржа подтвердила ордер входа
+    PROTECTED = "protected"        # SL/TP подтверждены — сделка завершена
+    FAILED = "failed"              # сделка прервана до входа
+    ABANDONED = "abandoned"        # не завершена до рестарта, вход не подтверждён
+
+    # сделки в этих состояниях требуют внимания после рестарта
+    UNFINISHED = (RECEIVED, SIZED, ENTRY_ACKED)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    trade_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trades_state ON trades(state);
+"""
+
+_STOP = object()
+
+
+class TradeJournal:
+    """
+    Журнал сделок с упреждающей записью (SQLite в режиме WAL).
+
+    record() только кладёт событие в очередь — это микросекунды в потоке
+    event loop. Фоновый поток пачками пишет события в таблицу events
+    (append-only история) и обновляет последнее состояние в trades,
+    где payload накапливается: каждое событие дополняет данные сделки.
+
+    commit() — то же, но дожидается фиксации транзакции: им пишется
+    состояние перед отправкой ордера на биржу, чтобы падение процесса
+    после отправки не потеряло сделку.
+    """
+
+    def __init__(self, path: str, batch_size: int = 256):
+        self.path = path
+        self.batch_size = batch_size
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # схема создаётся синхронно, чтобы load_unfinished работал сразу
+        connection = self._connect()
+        connection.executescript(_SCHEMA)
+        connection.close()
+
+        self._thread = threading.Thread(
+            target=self._writer, name="trade-journal", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Журнал сделок: {self.path}")
+
+    def close(self) -> None:
+        """Дописывает очередь и останавливает поток записи"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    # ------------------------------------------------------------------
+    # WRITE
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def new_trade_id() -> str:
+        return uuid.uuid4().hex
+
+    def record(self, trade_id: str, state: str, **payload) -> None:
+        """
+        Фиксирует переход сделки в состояние state.
+
+        Не блокирует: сериализация и запись выполняются в фоновом потоке.
+        """
+        if self._thread is None:
+            return
+        self._queue.put((trade_id, state, payload, time.time(), None))
+
+    async def commit(self, trade_id: str, state: str, **payload) -> None:
+        """
+        Фиксирует переход и ждёт COMMIT в SQLite (не блокируя event loop).
+
+        Одновременные commit() попадают в одну пачку и одну транзакцию.
+
+        Raises:
+            sqlite3.Error если запись не удалась
+        """
+        if self._thread is None:
+            return
+        done: Future = Future()
+        self._queue.put((trade_id, state, payload, time.time(), done))
+        await asyncio.wrap_future(done)
+
+    def _writer(self) -> None:
+        connection = self._connect()
+        stopping = False
+
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if batch[-1] is _STOP:
+                batch.pop()
+                stopping = True
+            elif _STOP in batch:
+                batch = [item for item in batch if item is not _STOP]
+                stopping = True
+
+            if batch:
+                error = None
+                try:
+                    self._write_batch(connection, batch)
+                except Exception as e:
+                    error = e
+                    logger.error(f"Журнал сделок: ошибка записи {len(batch)} событий: {e}")
+                    if connection.in_transaction:
+                        connection.execute("ROLLBACK")
+                for *_, done in batch:
+                    if done is not None:
+                        if error is None:
+                            done.set_result(None)
+                        else:
+                            done.set_exception(error)
+
+        connection.close()
+
+    @staticmethod
+    def _write_batch(connection: sqlite3.Connection, batch: list) -> None:
+        # payload сделок пачки: слияние в Python, json_patch удалил бы ключи со значением null
+        merged: dict[str, dict] = {}
+        connection.execute("BEGIN")
+        for trade_id, state, payload, ts, _ in batch:
+            connection.execute(
+                "INSERT INTO events (trade_id, state, payload, ts) VALUES (?, ?, ?, ?)",
+                (trade_id, state, json.dumps(payload, default=str), ts),
+            )
+            current = merged.get(trade_id)
+            if current is None:
+                row = connection.execute(
+                    "SELECT payload FROM trades WHERE trade_id = ?", (trade_id,)
+                ).fetchone()
+                current = merged[trade_id] = json.loads(row[0]) if row else {}
+            current.update(payload)
+            connection.execute(
+                """
+                INSERT INTO trades (trade_id, state, payload, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(trade_id) DO UPDATE SET
+                    state = excluded.state,
+                    payload = excluded.payload,
+                    updated_at = excluded.updated_at
+                """,
+                (trade_id, state, json.dumps(current, default=str), ts, ts),
+            )
+        connection.execute("COMMIT")
+
+    # ------------------------------------------------------------------
+    # RECOVERY
+    # ------------------------------------------------------------------
+
+    def load_unfinished(self) -> list[dict]:
+        """
+        Сделки, не дошедшие до конечного состояния (вызывается при старте).
+
+        Returns:
+            список {"trade_id", "state", **payload}
+        """
+        connection = self._connect()
+        try:
+            placeholders = ", ".join("?" for _ in TradeState.UNFINISHED)
+            rows = connection.execute(
+                f"SELECT trade_id, state, payload FROM trades "
+                f"WHERE state IN ({placeholders}) ORDER BY created_at",
+                TradeState.UNFINISHED,
+            ).fetchall()
+        finally:
+            connection.close()
+
+        return [
+            {"trade_id": trade_id, "state": state, **json.loads(payload)}
+            for trade_id, state, payload in rows
+        ]
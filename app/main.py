@@ -1,13 +1,32 @@
 from fastapi import FastAPI, Request, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 from app.webhook.handler import WebhookHandler
 from app.webhook.validator import validate_webhook_token
+from app.webhook.decoder import decode_webhook_body
 from app.models.webhook import TradingViewWebhook
-from app.exchange.factory import ExchangeFactory
 from app.config.settings import settings
-from app.utils.logger import logger
+from app.config.profiles import trading_profiles
+from app.utils.logger import logger, stop_logging
+from app.utils.shutdown import shutdown_coordinator
+from app.journal import trade_journal
+from app.utils.coordination import coordinator
+from app.risk.exposure import exposure_ledger
+from app.exchange.balance import balance_service
+from app.exchange.market_data import market_data
+from app.exchange.router import venue_router
+from app.exchange.orderbook import order_books
+from app.exchange.execution_algos import execution_scheduler
+from app.exchange.circuit_breaker import breaker_metrics
+from app.exchange.retry import retry_metrics
+from app.exchange.hedging import hedged_reads
+from app.exchange.pool import exchange_pool
+from app.exchange.cassette import cassette
+from app.exchange.reconciler import position_reconciler
+from app.exchange.position_manager import position_manager
 from app.api.signal import router as signal_router
+from app.api.alerts import router as alerts_router
+from app.alerts import alert_engine
 
 
 # Глобальный обработчик вебхуков
@@ -21,11 +40,50 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Запуск приложения...")
     webhook_handler = WebhookHandler()
+    if settings.journal_enabled:
+        trade_journal.start()
+        # сделки, прерванные прошлым процессом, дозащищает только лидер,
+        # иначе каждый воркер выставил бы свои SL/TP
+        coordinator.on_leadership(webhook_handler.order_manager.resume_unfinished)
+    # локальные алерты исполняются тем же путём, что и вебхуки TradingView;
+    # до coordinator.start, чтобы лидер загрузил их из таблицы
+    alert_engine.start(webhook_handler.process_trade_signals)
+    await coordinator.start()
+    # дальше — сервисы каждого воркера: кэши тикеров и балансов для своих
+    # запросов, сверка и трейлинг своих сделок (лимит запросов ccxt поделён
+    # между воркерами); резервы экспозиции общие (exposure.json)
+    exposure_ledger.start()
+    balance_service.start()
+    market_data.start()
+    venue_router.start()
+    position_reconciler.start()
+    position_manager.start()
+    trading_profiles.start()
+
+    # порядок остановки: сначала сделки в полёте, затем сервисы,
+    # клиенты бирж (общий пул обоих OrderManager), журнал и логи
+    shutdown_coordinator.on_drain("execution_scheduler", execution_scheduler.drain)
+    shutdown_coordinator.on_close("coordinator", coordinator.stop)
+    shutdown_coordinator.on_close("trading_profiles", trading_profiles.stop)
+    shutdown_coordinator.on_close("alert_engine", alert_engine.stop)
+    shutdown_coordinator.on_close("position_reconciler", position_reconciler.stop)
+    shutdown_coordinator.on_close("position_manager", position_manager.stop)
+    shutdown_coordinator.on_close("exposure_ledger", exposure_ledger.stop)
+    shutdown_coordinator.on_close("balance_service", balance_service.stop)
+    shutdown_coordinator.on_close("market_data", market_data.stop)
+    shutdown_coordinator.on_close("venue_router", venue_router.stop)
+    shutdown_coordinator.on_close("order_books", order_books.stop)
+    shutdown_coordinator.on_close("execution_scheduler", execution_scheduler.stop)
+    shutdown_coordinator.on_close("exchange_pool", exchange_pool.close_all)
+    shutdown_coordinator.on_close("hedged_reads", hedged_reads.close)
+    shutdown_coordinator.on_close("cassette", cassette.close)
+    shutdown_coordinator.on_close("trade_journal", trade_journal.close)
     yield
     # Shutdown
     logger.info("Остановка приложения...")
-    if webhook_handler:
-        await webhook_handler.cleanup()
+    await shutdown_coordinator.shutdown()
+    logger.info("Приложение остановлено")
+    stop_logging()
 
 
 app = FastAPI(
@@ -35,6 +93,25 @@ app = FastAPI(
     lifespan=lifespan
 )
 app.include_router(signal_router)
+app.include_router(alerts_router)
+
+
+@app.middleware("http")
+async def drain_guard(request: Request, call_next):
+    """
+    Во время остановки новые сигналы (POST) получают 503, чтобы
+    отправитель повторил их на другом воркере; принятые — дожидаются.
+    """
+    if request.method != "POST":
+        return await call_next(request)
+    if shutdown_coordinator.draining:
+        return JSONResponse(
+            status_code=503,
+            content={"success": False, "error": "Сервис останавливается"},
+            headers={"Retry-After": "5"},
+        )
+    with shutdown_coordinator.track():
+        return await call_next(request)
 
 
 @app.get("/")
@@ -46,64 +123,56 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
+    if shutdown_coordinator.draining:
+        return JSONResponse(status_code=503, content={"status": "draining"})
     return {"status": "healthy"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Размыкатели цепи, повторы и дубли чтений бирж (формат Prometheus)"""
+    return PlainTextResponse(breaker_metrics() + retry_metrics() + hedged_reads.metrics())
+
+
 @app.get("/balance")
 async def get_balance(
-    exchange: str = Query(None, description="Название биржи (по умолчанию из .env)"),
-    token: str = Query(..., description="Секретный токен для доступа")
+    exchange: str = Query(None, description="Название биржи (по умолчанию — все настроенные)"),
+    token: str = Query(..., description="Секретный токен для доступа"),
+    refresh: bool = Query(False, description="Запросить свежий баланс у биржи"),
 ):
     """
-    Получение баланса на бирже
+    Получение балансов из кэша BalanceService
     
     Args:
-        exchange: название биржи (binance, okx, bybit, bitget). Если не указано, используется из .env
+        exchange: название биржи (binance, okx, bybit, bitget). Если не указано — все биржи с ключами в .env
         token: секретный токен для доступа
+        refresh: не ждать фонового обновления, запросить баланс сразу
     
     Returns:
-        JSON с балансом
+        JSON с балансами, временем обновления и признаком устаревания
     """
     # Валидация токена
     validate_webhook_token(token)
     
-    # Определяем биржу
-    exchange_name = exchange.lower() if exchange else settings.exchange
-    
     try:
-        # Создаем клиент
-        client = ExchangeFactory.create_client(exchange_name)
-        await client.load_markets()
-        
-        # Получаем баланс
-        balance = await client.get_balance()
-        
-        # Форматируем ответ
-        result = {
-            "exchange": exchange_name,
-            "balance": {}
-        }
-        
-        # Извлекаем доступные балансы
-        if "USDT" in balance:
-            result["balance"]["USDT"] = {
-                "free": balance["USDT"].get("free", 0),
-                "used": balance["USDT"].get("used", 0),
-                "total": balance["USDT"].get("total", 0)
+        if exchange:
+            exchange_name = exchange.lower()
+            snapshot = (
+                await balance_service.refresh(exchange_name)
+                if refresh
+                else await balance_service.get_fresh(exchange_name, max_age=float("inf"))
+            )
+            return JSONResponse(content=balance_service.describe(snapshot))
+
+        if refresh:
+            await balance_service.refresh_all()
+        snapshots = await balance_service.get_all()
+        return JSONResponse(content={
+            "exchanges": {
+                snapshot.exchange: balance_service.describe(snapshot)
+                for snapshot in snapshots
             }
-        
-        # Добавляем другие валюты если есть
-        for currency, info in balance.items():
-            if currency not in ["info", "free", "used", "total"] and isinstance(info, dict):
-                if info.get("total", 0) > 0 or info.get("free", 0) > 0:
-                    result["balance"][currency] = {
-                        "free": info.get("free", 0),
-                        "used": info.get("used", 0),
-                        "total": info.get("total", 0)
-                    }
-        
-        await client.close()
-        return JSONResponse(content=result)
+        })
         
     except Exception as e:
         logger.error(f"Ошибка при получении баланса: {e}")
@@ -113,6 +182,59 @@ async def get_balance(
         )
 
 
+@app.get("/exposure")
+async def get_exposure(
+    token: str = Query(..., description="Секретный токен для доступа")
+):
+    """Открытый номинал по символам, биржам и в сумме (учёт этого воркера)"""
+    validate_webhook_token(token)
+    return exposure_ledger.snapshot()
+
+
+@app.get("/protection")
+async def get_protection(
+    token: str = Query(..., description="Секретный токен для доступа")
+):
+    """Ожидаемые SL / TP открытых позиций и их трейлинг в этом воркере"""
+    validate_webhook_token(token)
+    return {
+        "positions": position_reconciler.snapshot(),
+        "repairs_total": position_reconciler.repairs_total,
+        "managed": position_manager.snapshot(),
+        "stop_amendments_total": position_manager.amendments_total,
+    }
+
+
+@app.get("/profiles")
+async def get_profiles(
+    token: str = Query(..., description="Секретный токен для доступа")
+):
+    """Действующие профили риска и исполнения (версия файла этого воркера)"""
+    validate_webhook_token(token)
+    return trading_profiles.snapshot()
+
+
+@app.get("/executions")
+async def get_executions(
+    token: str = Query(..., description="Секретный токен для доступа")
+):
+    """Прогресс алгоритмов исполнения (TWAP / айсберг / post-only)"""
+    validate_webhook_token(token)
+    return {"executions": [parent.to_dict() for parent in execution_scheduler.list()]}
+
+
+@app.delete("/executions/{parent_id}")
+async def cancel_execution(
+    parent_id: str,
+    token: str = Query(..., description="Секретный токен для доступа")
+):
+    """Остановка алгоритма; исполненная часть остаётся под защитой SL / TP"""
+    validate_webhook_token(token)
+    if not execution_scheduler.cancel(parent_id):
+        return JSONResponse(status_code=404, content={"success": False, "error": "not running"})
+    return {"success": True}
+
+
 @app.post("/webhook/tradingview")
 async def tradingview_webhook(
     request: Request,
@@ -131,25 +253,24 @@ async def tradingview_webhook(
     # Валидация токена
     validate_webhook_token(token)
     
-    # Получаем тело запроса
+    # Тело читается один раз, формат определяется без исключений
+    body = await request.body()
     try:
-        body = await request.json()
-        webhook = TradingViewWebhook(**body)
+        payload = decode_webhook_body(body, request.headers.get("content-type"))
     except Exception as e:
-        # Если не JSON, пробуем получить как текст
-        try:
-            body_text = await request.body()
-            webhook = TradingViewWebhook(message=body_text.decode('utf-8'))
-        except Exception as e2:
-            logger.error(f"Ошибка при парсинге тела запроса: {e2}")
-            return JSONResponse(
-                status_code=400,
-                content={"success": False, "error": "Не удалось распарсить тело запроса"}
-            )
+        logger.error(f"Ошибка при парсинге тела запроса: {e}")
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "error": "Не удалось распарсить тело запроса"}
+        )
     
     # Обрабатываем вебхук
     try:
-        result = await webhook_handler.process_webhook(webhook)
+        if isinstance(payload, TradingViewWebhook):
+            result = await webhook_handler.process_webhook(payload)
+        else:
+            # Структурированный JSON алерт — текстовый парсинг не нужен
+            result = await webhook_handler.process_trade_signals(payload)
         return JSONResponse(content=result)
     except Exception as e:
         logger.error(f"Ошибка при обработке вебхука: {e}")
@@ -160,6 +281,6 @@ async def tradingview_webhook(
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from app.server import run
+    run()
 
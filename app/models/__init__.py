@@ -1,9 +1,10 @@
-from .webhook import TradingViewWebhook
+from .webhook import TradingViewWebhook, TradingViewAlert
 from .trade import TradeSignal
 from .order import OrderRequest, OrderResponse
 
 __all__ = [
     "TradingViewWebhook",
+    "TradingViewAlert",
     "TradeSignal",
     "OrderRequest",
     "OrderResponse",
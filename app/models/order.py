@@ -1,9 +1,16 @@
-from pydantic import BaseModel
+from dataclasses import dataclass, fields, replace
 from typing import Optional, Literal
 
 
-class OrderRequest(BaseModel):
-    """Запрос на создание ордера"""
+@dataclass(frozen=True, slots=True)
+class OrderRequest:
+    """
+    Запрос на создание ордера.
+
+    Неизменяемый: биржа после маршрутизации и SL / TP после расчёта
+    риска дают новый запрос (with_changes), прежний остаётся в журнале
+    и у вызывающего без изменений.
+    """
     symbol: str
     side: Literal["buy", "sell"]
     amount: float
@@ -13,15 +20,61 @@ class OrderRequest(BaseModel):
     contract_type: Literal["USDT-M", "COIN-M"]
     exchange: str
     entry_price: Optional[float] = None  # Цена входа (для limit ордеров)
+    routing: Optional[dict] = None       # Обоснование выбора биржи (smart routing)
+    strategy: Optional[str] = None       # Профиль стратегии (config/profiles.yaml)
+
+    def with_changes(self, **changes) -> "OrderRequest":
+        return replace(self, **changes)
+
+    def to_dict(self) -> dict:
+        """Поля запроса для журнала сделок и кассеты"""
+        return {
+            "symbol": self.symbol,
+            "side": self.side,
+            "amount": self.amount,
+            "leverage": self.leverage,
+            "stop_loss": self.stop_loss,
+            "take_profit": self.take_profit,
+            "contract_type": self.contract_type,
+            "exchange": self.exchange,
+            "entry_price": self.entry_price,
+            "routing": self.routing,
+            "strategy": self.strategy,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "OrderRequest":
+        """Запрос из журнала; поля, которых нет в этой версии, пропускаются"""
+        return cls(**{name: data[name] for name in _REQUEST_FIELDS if name in data})
+
+
+_REQUEST_FIELDS = tuple(field.name for field in fields(OrderRequest))
 
 
-class OrderResponse(BaseModel):
+@dataclass(frozen=True, slots=True)
+class OrderResponse:
     """Ответ после создания ордера"""
     success: bool
     order_id: Optional[str] = None
     position_id: Optional[str] = None
     stop_loss_order_id: Optional[str] = None
     take_profit_order_id: Optional[str] = None
+    stop_loss: Optional[float] = None       # итоговые цены защиты после квантования
+    take_profit: Optional[float] = None
     message: Optional[str] = None
     error: Optional[str] = None
+    error_kind: Optional[str] = None        # класс ошибки биржи (app/exchange/retry.py)
 
+    def to_dict(self) -> dict:
+        return {
+            "success": self.success,
+            "order_id": self.order_id,
+            "position_id": self.position_id,
+            "stop_loss_order_id": self.stop_loss_order_id,
+            "take_profit_order_id": self.take_profit_order_id,
+            "stop_loss": self.stop_loss,
+            "take_profit": self.take_profit,
+            "message": self.message,
+            "error": self.error,
+            "error_kind": self.error_kind,
+        }
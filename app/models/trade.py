@@ -1,13 +1,41 @@
-from pydantic import BaseModel
+from dataclasses import dataclass, fields, replace
+from datetime import datetime
 from typing import Optional, Literal
 
 
-class TradeSignal(BaseModel):
-    """Распарсенный торговый сигнал из алерта TradingView"""
+@dataclass(frozen=True, slots=True)
+class TradeSignal:
+    """
+    Распарсенный торговый сигнал из алерта TradingView.
+
+    Внутренняя модель без валидации: значения уже проверены на входе
+    (регулярное выражение парсера или схема TradingViewAlert).
+    """
     symbol: str
     direction: Literal["LONG", "SHORT"]
     entry_price: float
     size: Optional[float] = None
     leverage: Optional[int] = None
     exchange: Optional[Literal["binance", "okx", "bybit", "bitget"]] = None
+    alert_time: Optional[datetime] = None  # время срабатывания алерта в TradingView
+    strategy: Optional[str] = None         # профиль стратегии (config/profiles.yaml)
+
+    def with_changes(self, **changes) -> "TradeSignal":
+        return replace(self, **changes)
+
+    def to_dict(self) -> dict:
+        """Поля сигнала для хранилища алертов (время — ISO строкой)"""
+        data = {name: getattr(self, name) for name in _SIGNAL_FIELDS}
+        if self.alert_time is not None:
+            data["alert_time"] = self.alert_time.isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TradeSignal":
+        data = {name: data[name] for name in _SIGNAL_FIELDS if name in data}
+        if data.get("alert_time"):
+            data["alert_time"] = datetime.fromisoformat(data["alert_time"])
+        return cls(**data)
+
 
+_SIGNAL_FIELDS = tuple(field.name for field in fields(TradeSignal))
@@ -1,15 +1,70 @@
-from pydantic import BaseModel
-from typing import Optional
+from dataclasses import dataclass
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict, model_validator
+from typing import Optional, Literal
 
 
-class TradingViewWebhook(BaseModel):
-    """Модель входящего вебхука от TradingView"""
+@dataclass(frozen=True, slots=True)
+class TradingViewWebhook:
+    """Текстовый вебхук от TradingView (дальше — текстовый парсер)"""
     message: Optional[str] = None
     text: Optional[str] = None
     symbol: Optional[str] = None
     action: Optional[str] = None
-    
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "TradingViewWebhook":
+        """Поля из JSON тела; прочие ключи игнорируются"""
+        values = {}
+        for name in _WEBHOOK_FIELDS:
+            value = payload.get(name)
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"{name}: ожидается строка")
+            values[name] = value
+        return cls(**values)
+
     def get_message_text(self) -> str:
         """Извлекает текст сообщения из вебхука"""
         return self.message or self.text or ""
 
+
+_WEBHOOK_FIELDS = ("message", "text", "symbol", "action")
+
+
+class TradingViewAlert(BaseModel):
+    """
+    Структурированный JSON алерт (без текстового парсинга).
+
+    Схема проверки тела на входе; дальше по конвейеру идёт TradeSignal.
+
+    Пример тела:
+    {"symbol": "LTCUSDT", "direction": "LONG", "price": 76.47,
+     "size": 100, "leverage": 35, "exchange": "bybit", "alert_time": "{{timenow}}"}
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    symbol: str
+    direction: Literal["LONG", "SHORT"]
+    price: float
+    size: Optional[float] = None
+    leverage: Optional[int] = None
+    exchange: Optional[Literal["binance", "okx", "bybit", "bitget"]] = None
+    alert_time: Optional[datetime] = None
+    strategy: Optional[str] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def _normalize(cls, data):
+        # один вызов Python на алерт вместо валидатора на каждое поле
+        if not isinstance(data, dict):
+            return data
+        data = dict(data)
+        symbol, direction, exchange = data.get("symbol"), data.get("direction"), data.get("exchange")
+        if isinstance(symbol, str):
+            # Убираем TradingView ".P" суффикс фьючерсов Bybit
+            data["symbol"] = symbol.replace(".P", "").replace(".p", "")
+        if isinstance(direction, str):
+            data["direction"] = direction.upper()
+        if isinstance(exchange, str):
+            data["exchange"] = exchange.lower()
+        return data
@@ -89,6 +89,7 @@
 #
 import re
 from app.models.trade import TradeSignal
+from app.config.profiles import trading_profiles
 from app.config.settings import settings
 from app.utils.logger import logger
 
@@ -98,60 +99,90 @@ class TradingViewParser:
 
     EXCHANGES = ["binance", "okx", "bybit", "bitget"]
 
+    # Вся грамматика алерта в одном скомпилированном выражении:
+    # [EXCHANGE:]SYMBOL Crossing Up/Down PRICE [size=SIZE] [lev=LEVERAGE] [strategy=NAME] [EXCHANGE]
+    # Префикс биржи TradingView ({{exchange}}:{{ticker}}) учитывается, если
+    # биржа не указана в хвосте; префиксы других площадок игнорируются.
+    # Хвост после цены разбирается повторяющейся группой — порядок
+    # опциональных полей произвольный, неизвестные токены пропускаются.
+    # Хвост не пересекает перевод строки, поэтому finditer по телу
+    # с несколькими алертами отдаёт ровно один match на алерт.
+    ALERT_PATTERN = re.compile(
+        r"(?:(?P<prefix>\w+):)?(?P<symbol>[\w.]+)[ \t]+Crossing[ \t]+(?P<direction>Up|Down)[ \t]+"
+        r"(?P<price>\d[\d,]*(?:\.\d+)?)"
+        r"(?:[ \t]+(?:"
+        r"(?i:size=)(?P<size>\d+(?:\.\d+)?)"
+        r"|(?i:lev=)(?P<leverage>\d+)"
+        r"|(?i:strategy=)(?P<strategy>[\w-]+)"
+        r"|(?P<exchange>(?i:" + "|".join(EXCHANGES) + r"))\b"
+        r"|\S+"
+        r"))*"
+    )
+
     @staticmethod
-    def parse_alert(message: str) -> TradeSignal:
+    def parse_alerts(message: str) -> list[TradeSignal]:
         """
-        Формат: SYMBOL Crossing Up/Down PRICE [size=SIZE] [lev=LEVERAGE] [EXCHANGE]
+        Разбор тела вебхука с одним или несколькими алертами (по одному на строку),
+        например пачки "alert on any function call" от TradingView.
 
-        Примеры:
+        Примеры строк:
         - LTCUSDT Crossing Down 76.47
-        - BTCUSDT Crossing Down 90,350.00
+        - BTCUSDT Crossing Down 90,350.00 size=100 lev=20 Bybit
+        - ETHUSDT Crossing Up 3120.5 strategy=scalp
         - ONTUSDT.P Crossing Up 0.07624
+        - BINANCE:LTCUSDT Crossing Up 76.47
+
+        Returns:
+            список TradeSignal в порядке следования в сообщении
+
+        Raises:
+            ValueError если в сообщении нет ни одного алерта
         """
-        message = message.strip()
-        logger.info(f"Парсинг алерта: {message}")
-
-        # ---- Определяем направление ----
-        if "Crossing Up" in message:
-            direction = "LONG"
-            pattern = r"([\w\.]+)\s+Crossing Up\s+([\d.,]+)"
-        elif "Crossing Down" in message:
-            direction = "SHORT"
-            pattern = r"([\w\.]+)\s+Crossing Down\s+([\d.,]+)"
-        else:
-            raise ValueError(f"Не удалось определить направление в сообщении: {message}")
-
-        # ---- Извлекаем символ и цену ----
-        match = re.search(pattern, message)
-        if not match:
-            raise ValueError(f"Не удалось распарсить символ и цену из: {message}")
-
-        symbol_raw = match.group(1)
+        signals = [
+            TradingViewParser._build_signal(match)
+            for match in TradingViewParser.ALERT_PATTERN.finditer(message)
+        ]
 
+        if not signals:
+            raise ValueError(f"Не удалось определить направление в сообщении: {message.strip()}")
+
+        return signals
+
+    @staticmethod
+    def parse_alert(message: str) -> TradeSignal:
+        """
+        Формат: [EXCHANGE:]SYMBOL Crossing Up/Down PRICE [size=SIZE] [lev=LEVERAGE] [strategy=NAME] [EXCHANGE]
+
+        Возвращает первый алерт из сообщения.
+        """
+        return TradingViewParser.parse_alerts(message)[0]
+
+    @staticmethod
+    def _build_signal(match: re.Match) -> TradeSignal:
         # Убираем TradingView ".P" суффикс фьючерсов Bybit
-        symbol = symbol_raw.replace(".P", "").replace(".p", "")
+        symbol = match["symbol"].replace(".P", "").replace(".p", "")
+        direction = "LONG" if match["direction"] == "Up" else "SHORT"
+        entry_price = float(match["price"].replace(",", ""))
 
-        # ---- Цена ----
-        raw_price = match.group(2)
-        entry_price = float(raw_price.replace(",", ""))
+        # биржа не указана — None: её выберет маршрутизация (или EXCHANGE)
+        exchange = match["exchange"] or match["prefix"]
+        exchange = exchange.lower() if exchange else None
+        if exchange not in TradingViewParser.EXCHANGES:
+            exchange = None
 
-        # ---- Размер позиции ----
-        size_match = re.search(r"size=([\d.]+)", message, re.IGNORECASE)
-        size = float(size_match.group(1)) if size_match else settings.size_position
+        # размер и плечо по умолчанию — из профиля символа / стратегии
+        strategy = match["strategy"]
+        profile = trading_profiles.resolve(exchange or settings.exchange, symbol, strategy)
 
-        # ---- Плечо ----
-        lev_match = re.search(r"lev=(\d+)", message, re.IGNORECASE)
-        leverage = int(lev_match.group(1)) if lev_match else settings.default_leverage
+        size = match["size"]
+        size = float(size) if size else profile.size_position
 
-        # ---- Биржа ----
-        message_lower = message.lower()
-        exchange = next((ex for ex in TradingViewParser.EXCHANGES if ex in message_lower), None)
-        if not exchange:
-            exchange = settings.exchange
+        leverage = match["leverage"]
+        leverage = int(leverage) if leverage else profile.leverage
 
         logger.info(
-            f"Распарсено: symbol={symbol}, direction={direction}, "
-            f"price={entry_price}, size={size}, leverage={leverage}, exchange={exchange}"
+            "Распарсено: symbol=%s, direction=%s, price=%s, size=%s, leverage=%s, exchange=%s, profile=%s",
+            symbol, direction, entry_price, size, leverage, exchange, profile.name,
         )
 
         return TradeSignal(
@@ -160,5 +191,6 @@ class TradingViewParser:
             entry_price=entry_price,
             size=size,
             leverage=leverage,
-            exchange=exchange
+            exchange=exchange,
+            strategy=strategy,
         )
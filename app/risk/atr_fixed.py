@@ -1,6 +1,7 @@
 from app.risk.base import BaseRiskStrategy
 from app.risk.models import RiskResult
 from app.utils.indicators import get_atr_for_symbol
+from app.config.profiles import active_profile
 from app.config.settings import settings
 from app.utils.logger import logger
 
@@ -59,26 +60,24 @@ class AtrFixedRisk(BaseRiskStrategy):
     ATR + фиксированный риск в $ + ДЕНЕЖНЫЙ тейк.
     """
 
-    async def calculate(self, client, symbol, entry_price, side) -> RiskResult:
-        atr = await get_atr_for_symbol(client, symbol)
+    async def calculate(self, client, symbol, entry_price, side, atr=None) -> RiskResult:
+        profile = active_profile()
+        if atr is None:
+            atr = await get_atr_for_symbol(client, symbol, profile)
 
-        stop_distance = atr * settings.atr_multiplier
-        risk = settings.risk_per_trade
-        rr = settings.risk_reward_ratio
+        stop_distance = atr * profile.atr_multiplier
+        risk = profile.risk_per_trade
+        rr = profile.risk_reward_ratio
 
         # 🔹 Размер позиции (гарантирует -risk USDT на стопе)
         amount = risk / stop_distance
         notional = amount * entry_price
 
         logger.info(
-            f"[RISK] {symbol} | "
-            f"price={entry_price:.6f} | "
-            f"ATR={atr:.6f} | "
-            f"stop={stop_distance:.6f} | "
-            f"amount={amount:.4f} | "
-            f"notional={notional:.2f} | "
-            f"min={settings.min_position_usdt} | "
-            f"max={settings.max_position_usdt}"
+            "[RISK] %s | price=%.6f | ATR=%.6f | stop=%.6f | amount=%.4f | "
+            "notional=%.2f | min=%s | max=%s",
+            symbol, entry_price, atr, stop_distance, amount,
+            notional, settings.min_position_usdt, settings.max_position_usdt,
         )
 
         if notional > settings.max_position_usdt:
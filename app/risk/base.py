@@ -9,5 +9,6 @@ class BaseRiskStrategy:
         symbol: str,
         entry_price: float,
         side: str,
+        atr: float | None = None,
     ):
         raise NotImplementedError
@@ -0,0 +1,410 @@
+import asyncio
+import fcntl
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from app.config.settings import settings
+from app.utils.coordination import coordinator, WorkerCoordinator
+from app.utils.logger import logger
+
+
+class Reservation:
+    """
+    Резерв номинала под сделку.
+
+    Живёт от расчёта риска до подтверждения входа: пока сделка
+    в полёте, её номинал уже учитывается в лимитах.
+    """
+
+    __slots__ = ("exchange", "symbol", "requested", "notional", "confirmed")
+
+    def __init__(self, exchange: str, symbol: str, requested: float, notional: float):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.requested = requested
+        self.notional = notional
+        self.confirmed = False
+
+    @property
+    def scale(self) -> float:
+        """Доля запрошенного номинала, которую разрешили лимиты"""
+        return self.notional / self.requested if self.requested else 0.0
+
+
+class ExposureLedger:
+    """
+    Учёт открытого номинала в памяти: по символу, по бирже и в сумме.
+
+    Проверка лимита — только арифметика над словарями, без сети и без
+    await, поэтому в event loop она атомарна: параллельные сигналы
+    резервируют номинал строго по очереди и не могут вместе превысить лимит.
+
+    Подтверждённые позиции периодически сверяются с fetch_positions:
+    закрытые по SL/TP позиции уходят из учёта, позиции, открытые
+    другими воркерами или вручную, — появляются.
+
+    С несколькими воркерами (coordinator задан) резервы и ещё не
+    сверенные входы каждого воркера лежат в общем exposure.json в
+    coordination_dir. Резерв проверяется и записывается под flock этого
+    файла, поэтому лимит общий для всех воркеров, а не свой у каждого.
+    Записи упавших воркеров отбрасываются.
+    """
+
+    def __init__(
+        self,
+        max_total: float,
+        max_exchange: float,
+        max_symbol: float,
+        reconcile_interval: float,
+        coordinator: Optional[WorkerCoordinator] = None,
+    ):
+        self.max_total = max_total
+        self.max_exchange = max_exchange
+        self.max_symbol = max_symbol
+        self.reconcile_interval = reconcile_interval
+
+        # exchange -> symbol -> номинал подтверждённых позиций
+        self._open: dict[str, dict[str, float]] = defaultdict(dict)
+        # exchange -> symbol -> номинал неподтверждённых резервов
+        self._pending: dict[str, dict[str, float]] = defaultdict(dict)
+
+        # агрегаты (open + pending), обновляются инкрементально
+        self._symbol_totals: dict[tuple[str, str], float] = defaultdict(float)
+        self._exchange_totals: dict[str, float] = defaultdict(float)
+        self._total = 0.0
+
+        # подтверждения, пришедшие во время сверки биржи
+        self._reconciling: dict[str, dict[str, float]] = {}
+
+        self._clients: dict = {}
+        self._task: Optional[asyncio.Task] = None
+
+        # общий учёт воркеров; None — один воркер, всё в памяти
+        self._coordinator = coordinator
+        self._shared_path = os.path.join(coordinator.directory, "exposure.json") if coordinator else None
+        # свои подтверждённые входы для других воркеров: [time, exchange, symbol, notional]
+        self._published: list[list] = []
+        # exchange -> time.time() начала последней применённой сверки
+        self._reconciled_at: dict[str, float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_total or self.max_exchange or self.max_symbol)
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._clients.clear()
+
+    async def attach(self, exchange_name: str, client) -> None:
+        """
+        Подключает клиента биржи к сверке и загружает текущие позиции
+        (вызывается один раз при создании клиента).
+        """
+        if not self.enabled:
+            return
+        self._clients[exchange_name] = client
+        try:
+            await self.reconcile(exchange_name, client)
+        except Exception as e:
+            logger.warning(f"Экспозиция: не удалось загрузить позиции {exchange_name}: {e}")
+
+    def detach(self, exchange_name: str) -> None:
+        self._clients.pop(exchange_name, None)
+
+    # ------------------------------------------------------------------
+    # RESERVE
+    # ------------------------------------------------------------------
+
+    def reserve(self, exchange: str, symbol: str, notional: float) -> Reservation:
+        """
+        Резервирует номинал сделки в пределах лимитов.
+
+        Если свободного лимита меньше запрошенного, номинал урезается;
+        сделка меньше min_position_usdt отклоняется.
+
+        Raises:
+            ValueError если лимит исчерпан
+        """
+        granted = notional
+        with self._shared() as peers:
+            if self.enabled:
+                headroom = self._headroom(exchange, symbol, peers)
+                if headroom < notional:
+                    if headroom < settings.min_position_usdt:
+                        raise ValueError(
+                            f"Лимит экспозиции исчерпан для {exchange} {symbol}: "
+                            f"свободно {max(headroom, 0.0):.2f} USDT, нужно {notional:.2f}"
+                        )
+                    granted = headroom
+                    logger.warning(
+                        "[EXPOSURE] %s %s урезан: %.2f -> %.2f USDT",
+                        exchange, symbol, notional, granted,
+                    )
+
+            self._add(self._pending, exchange, symbol, granted)
+        return Reservation(exchange, symbol, notional, granted)
+
+    def resize(self, reservation: Reservation, notional: float, enforce: bool = True) -> None:
+        """
+        Уточняет резерв после квантования или по факту исполнения.
+
+        Номинал может и вырасти (limit вход выше рынка, цена исполнения
+        IOC / кусков) — прирост проверяется по лимитам, как новый резерв.
+        До отправки ордера (enforce) нехватка лимита отклоняет сделку;
+        после исполнения позиция уже на бирже и учитывается как есть.
+
+        Raises:
+            ValueError если enforce и прирост не помещается в лимит
+        """
+        delta = notional - reservation.notional
+        if not delta:
+            return
+        exchange, symbol = reservation.exchange, reservation.symbol
+        with self._shared() as peers:
+            if delta > 0 and self.enabled:
+                headroom = self._headroom(exchange, symbol, peers)
+                if headroom < delta:
+                    if enforce:
+                        raise ValueError(
+                            f"Лимит экспозиции исчерпан для {exchange} {symbol}: "
+                            f"свободно {max(headroom, 0.0):.2f} USDT, "
+                            f"номинал вырос на {delta:.2f} после квантования"
+                        )
+                    logger.warning(
+                        "[EXPOSURE] %s %s исполнено сверх лимита: %.2f -> %.2f USDT",
+                        exchange, symbol, reservation.notional, notional,
+                    )
+            self._add(self._pending, exchange, symbol, delta)
+        reservation.notional = notional
+
+    def confirm(self, reservation: Reservation) -> None:
+        """Биржа подтвердила вход — резерв становится открытой позицией"""
+        if reservation.confirmed:
+            return
+        exchange, symbol, notional = reservation.exchange, reservation.symbol, reservation.notional
+        with self._shared():
+            self._add(self._pending, exchange, symbol, -notional)
+            self._add(self._open, exchange, symbol, notional)
+            if self._shared_path:
+                self._published.append([time.time(), exchange, symbol, notional])
+        reservation.confirmed = True
+
+        in_flight = self._reconciling.get(exchange)
+        if in_flight is not None:
+            in_flight[symbol] = in_flight.get(symbol, 0.0) + notional
+
+    def release(self, reservation: Reservation) -> None:
+        """Сделка не состоялась — резерв освобождается"""
+        if reservation.confirmed or not reservation.notional:
+            return
+        with self._shared():
+            self._add(self._pending, reservation.exchange, reservation.symbol, -reservation.notional)
+        reservation.notional = 0.0
+
+    def _headroom(self, exchange: str, symbol: str, peers: dict[tuple[str, str], float]) -> float:
+        headroom = float("inf")
+        if self.max_symbol:
+            symbol_total = self._symbol_totals[(exchange, symbol)] + peers.get((exchange, symbol), 0.0)
+            headroom = min(headroom, self.max_symbol - symbol_total)
+        if self.max_exchange:
+            exchange_total = self._exchange_totals[exchange] + sum(
+                value for (peer_exchange, _), value in peers.items() if peer_exchange == exchange
+            )
+            headroom = min(headroom, self.max_exchange - exchange_total)
+        if self.max_total:
+            headroom = min(headroom, self.max_total - self._total - sum(peers.values()))
+        return headroom
+
+    def _add(self, book: dict, exchange: str, symbol: str, delta: float) -> None:
+        positions = book[exchange]
+        value = positions.get(symbol, 0.0) + delta
+        if value > 1e-9:
+            positions[symbol] = value
+        else:
+            positions.pop(symbol, None)
+
+        self._symbol_totals[(exchange, symbol)] += delta
+        self._exchange_totals[exchange] += delta
+        self._total += delta
+
+    # ------------------------------------------------------------------
+    # SHARED (несколько воркеров)
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _shared(self) -> Iterator[dict[tuple[str, str], float]]:
+        """
+        Номинал других воркеров, ещё не видимый в своём учёте, под общим
+        замком; после блока публикуется своё состояние.
+
+        Чужой вход учитывается, пока его не покрыла своя сверка с биржей.
+        Без общего учёта — пустой словарь.
+        """
+        if self._shared_path is None or not self.enabled:
+            yield {}
+            return
+
+        fd = os.open(self._shared_path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # замок держится на чтение и запись маленького файла
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                with open(self._shared_path) as file:
+                    workers = json.load(file)
+            except (FileNotFoundError, ValueError):
+                workers = {}
+
+            own_id = self._coordinator.worker_id
+            peers: dict[tuple[str, str], float] = defaultdict(float)
+            for worker_id, state in list(workers.items()):
+                if worker_id == own_id:
+                    continue
+                if not self._coordinator.is_alive(worker_id):
+                    del workers[worker_id]
+                    continue
+                for exchange, symbol, notional in state["pending"]:
+                    peers[(exchange, symbol)] += notional
+                for confirmed_at, exchange, symbol, notional in state["confirmed"]:
+                    if confirmed_at >= self._reconciled_at.get(exchange, 0.0):
+                        peers[(exchange, symbol)] += notional
+
+            yield peers
+
+            workers[own_id] = self._own_state()
+            tmp_path = f"{self._shared_path}.{own_id}"
+            with open(tmp_path, "w") as file:
+                json.dump(workers, file)
+            os.replace(tmp_path, self._shared_path)
+        finally:
+            os.close(fd)
+
+    def _own_state(self) -> dict:
+        if self.reconcile_interval:
+            # за два интервала вход успевает попасть в сверку каждого воркера
+            horizon = time.time() - 2 * self.reconcile_interval
+            self._published = [entry for entry in self._published if entry[0] >= horizon]
+        return {
+            "pending": [
+                [exchange, symbol, notional]
+                for exchange, positions in self._pending.items()
+                for symbol, notional in positions.items()
+            ],
+            "confirmed": self._published,
+        }
+
+    # ------------------------------------------------------------------
+    # RECONCILE
+    # ------------------------------------------------------------------
+
+    async def reconcile(self, exchange_name: str, client) -> None:
+        """
+        Заменяет подтверждённые позиции биржи данными fetch_positions.
+
+        Входы, подтверждённые пока шёл запрос, добавляются сверху:
+        в ответ биржи они могли ещё не попасть.
+        """
+        started_at = time.time()
+        self._reconciling[exchange_name] = {}
+        try:
+            positions = await client.fetch_positions()
+            confirmed_meanwhile = self._reconciling[exchange_name]
+        finally:
+            self._reconciling.pop(exchange_name, None)
+
+        snapshot: dict[str, float] = defaultdict(float)
+        for position in positions:
+            notional = self._position_notional(position)
+            if notional:
+                snapshot[position["symbol"]] += notional
+        for symbol, notional in confirmed_meanwhile.items():
+            snapshot[symbol] += notional
+
+        self._open[exchange_name] = dict(snapshot)
+        self._rebuild_totals()
+        # чужие входы до started_at теперь в своём учёте
+        self._reconciled_at[exchange_name] = started_at
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            for exchange_name, client in list(self._clients.items()):
+                try:
+                    await self.reconcile(exchange_name, client)
+                except Exception as e:
+                    logger.warning(f"Экспозиция: сверка {exchange_name} не удалась: {e}")
+
+    @staticmethod
+    def _position_notional(position: dict) -> float:
+        notional = position.get("notional")
+        if notional is None:
+            contracts = position.get("contracts") or 0.0
+            contract_size = position.get("contractSize") or 1.0
+            price = position.get("markPrice") or position.get("entryPrice") or 0.0
+            notional = contracts * contract_size * price
+        return abs(float(notional or 0.0))
+
+    def _rebuild_totals(self) -> None:
+        self._symbol_totals.clear()
+        self._exchange_totals.clear()
+        for book in (self._open, self._pending):
+            for exchange, positions in book.items():
+                for symbol, notional in positions.items():
+                    self._symbol_totals[(exchange, symbol)] += notional
+                    self._exchange_totals[exchange] += notional
+        self._total = sum(self._exchange_totals.values())
+
+    # ------------------------------------------------------------------
+    # SNAPSHOT
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        """Текущая экспозиция для API / логов (вместе с другими воркерами)"""
+        with self._shared() as peers:
+            symbols = defaultdict(float, self._symbol_totals)
+            for key, value in peers.items():
+                symbols[key] += value
+        exchanges: dict[str, float] = defaultdict(float)
+        for (exchange, _), value in symbols.items():
+            exchanges[exchange] += value
+        return {
+            "total": round(sum(exchanges.values()), 2),
+            "exchanges": {
+                exchange: round(value, 2)
+                for exchange, value in exchanges.items()
+                if value
+            },
+            "symbols": {
+                f"{exchange}:{symbol}": round(value, 2)
+                for (exchange, symbol), value in symbols.items()
+                if value
+            },
+            "limits": {
+                "total": self.max_total,
+                "exchange": self.max_exchange,
+                "symbol": self.max_symbol,
+            },
+        }
+
+
+# Общий учёт экспозиции процесса; с WEB_WORKERS > 1 лимиты общие для всех воркеров
+exposure_ledger = ExposureLedger(
+    max_total=settings.max_total_exposure_usdt,
+    max_exchange=settings.max_exchange_exposure_usdt,
+    max_symbol=settings.max_symbol_exposure_usdt,
+    reconcile_interval=settings.exposure_reconcile_interval,
+    coordinator=coordinator if settings.web_workers > 1 else None,
+)
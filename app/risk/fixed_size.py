@@ -1,7 +1,7 @@
 from app.risk.base import BaseRiskStrategy
 from app.risk.models import RiskResult
 from app.utils.indicators import get_atr_for_symbol
-from app.config.settings import settings
+from app.config.profiles import active_profile
 
 
 class FixedSizeRisk(BaseRiskStrategy):
@@ -10,13 +10,15 @@ class FixedSizeRisk(BaseRiskStrategy):
     Риск плавающий (SL / TP от ATR).
     """
 
-    async def calculate(self, client, symbol, entry_price, side) -> RiskResult:
-        atr = await get_atr_for_symbol(client, symbol)
+    async def calculate(self, client, symbol, entry_price, side, atr=None) -> RiskResult:
+        profile = active_profile()
+        if atr is None:
+            atr = await get_atr_for_symbol(client, symbol, profile)
 
-        amount = settings.size_position / entry_price
+        amount = profile.size_position / entry_price
 
-        stop_distance = atr * settings.stop_loss_rate
-        take_distance = atr * settings.take_profit_rate
+        stop_distance = atr * profile.stop_loss_rate
+        take_distance = atr * profile.take_profit_rate
 
         if side == "buy":
             stop = entry_price - stop_distance
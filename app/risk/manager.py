@@ -1,15 +1,21 @@
-from app.config.settings import settings
+from app.config.profiles import active_profile
 from app.risk.fixed_size import FixedSizeRisk
 from app.risk.atr_fixed import AtrFixedRisk
+from app.risk.percent_equity import PercentEquityRisk
 
 
 class RiskManager:
     """
     Фабрика риск-стратегий.
+
+    Режим риска берётся из профиля текущей сделки (символ / стратегия).
     """
 
     @staticmethod
     def get_strategy():
-        if settings.risk_mode == "fixed_risk_atr":
+        risk_mode = active_profile().risk_mode
+        if risk_mode == "fixed_risk_atr":
             return AtrFixedRisk()
+        if risk_mode == "percent_equity":
+            return PercentEquityRisk()
         return FixedSizeRisk()
@@ -0,0 +1,50 @@
+from app.risk.base import BaseRiskStrategy
+from app.risk.models import RiskResult
+from app.exchange.balance import balance_service
+from app.utils.indicators import get_atr_for_symbol
+from app.config.profiles import active_profile
+from app.config.settings import settings
+from app.utils.logger import logger
+
+
+class PercentEquityRisk(BaseRiskStrategy):
+    """
+    Номинал позиции — процент свободной маржи биржи.
+    SL / TP от ATR, как в fixed_size.
+    """
+
+    async def calculate(self, client, symbol, entry_price, side, atr=None) -> RiskResult:
+        profile = active_profile()
+        if atr is None:
+            atr = await get_atr_for_symbol(client, symbol, profile)
+
+        # баланс из кэша сервиса; запрос к бирже — только если снимок устарел
+        free_margin = await balance_service.free_margin(client.exchange_name)
+
+        notional = free_margin * profile.equity_percent / 100
+        amount = notional / entry_price
+
+        logger.info(
+            "[RISK] %s | price=%.6f | ATR=%.6f | free_margin=%.2f | pct=%s | "
+            "amount=%.4f | notional=%.2f | min=%s | max=%s",
+            symbol, entry_price, atr, free_margin, profile.equity_percent,
+            amount, notional, settings.min_position_usdt, settings.max_position_usdt,
+        )
+
+        if notional > settings.max_position_usdt:
+            raise ValueError("Position too large")
+
+        if notional < settings.min_position_usdt:
+            raise ValueError("Position too small")
+
+        stop_distance = atr * profile.stop_loss_rate
+        take_distance = atr * profile.take_profit_rate
+
+        if side == "buy":
+            stop = entry_price - stop_distance
+            take = entry_price + take_distance
+        else:
+            stop = entry_price + stop_distance
+            take = entry_price - take_distance
+
+        return RiskResult(amount, stop, take)
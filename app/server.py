@@ -0,0 +1,84 @@
+import asyncio
+import os
+import signal
+from types import FrameType
+from typing import Optional
+
+import uvicorn
+from uvicorn._subprocess import get_subprocess
+from uvicorn.supervisors import Multiprocess
+from uvicorn.supervisors.multiprocess import HANDLED_SIGNALS
+
+from app.config.settings import settings
+from app.utils.logger import logger
+from app.utils.shutdown import shutdown_coordinator
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    uvicorn с фазой draining перед остановкой.
+
+    Сам uvicorn по SIGTERM сразу закрывает порт, а lifespan shutdown
+    выполняет уже после ответа на все открытые запросы — флаг draining,
+    выставленный там, клиентам не виден. Здесь SIGTERM сначала включает
+    draining, и ещё shutdown_drain_grace секунд воркер принимает запросы:
+    новые POST получают 503 с Retry-After, /health — 503 draining.
+    Затем остановка идёт обычным путём uvicorn.
+    """
+
+    def handle_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        stop = super().handle_exit
+        grace = settings.shutdown_drain_grace
+        if sig != signal.SIGTERM or grace <= 0 or shutdown_coordinator.draining:
+            # Ctrl+C и повторный сигнал — без ожидания
+            shutdown_coordinator.draining = True
+            stop(sig, frame)
+            return
+
+        shutdown_coordinator.draining = True
+        logger.info(f"🛑 SIGTERM: новые сигналы отклоняются, порт закроется через {grace:.0f}с")
+        asyncio.get_running_loop().call_later(grace, stop, sig, frame)
+
+
+class DrainingMultiprocess(Multiprocess):
+    """
+    Сигнал остановки уходит всем воркерам сразу: draining идёт параллельно.
+
+    Каждый воркер получает свой номер в WEB_WORKER_INDEX (с 1) —
+    по нему выбирается отдельный файл логов.
+    """
+
+    def startup(self) -> None:
+        logger.info(f"Родительский процесс {self.pid} запущен")
+        for sig in HANDLED_SIGNALS:
+            signal.signal(sig, self.signal_handler)
+
+        # spawn-процесс наследует окружение на момент start()
+        for index in range(1, self.config.workers + 1):
+            os.environ["WEB_WORKER_INDEX"] = str(index)
+            process = get_subprocess(config=self.config, target=self.target, sockets=self.sockets)
+            process.start()
+            self.processes.append(process)
+        os.environ.pop("WEB_WORKER_INDEX", None)
+
+    def shutdown(self) -> None:
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+        logger.info(f"Родительский процесс {self.pid} остановлен")
+
+
+def run() -> None:
+    """Запуск API на 0.0.0.0:8000 с WEB_WORKERS воркерами"""
+    config = uvicorn.Config("app.main:app", host="0.0.0.0", port=8000, workers=settings.web_workers)
+    server = DrainingServer(config=config)
+    if config.workers > 1:
+        sock = config.bind_socket()
+        DrainingMultiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    run()
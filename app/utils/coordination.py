@@ -0,0 +1,262 @@
+import asyncio
+import fcntl
+import hashlib
+import os
+import time
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+from app.config.settings import settings
+from app.utils.logger import logger
+
+
+class WorkerCoordinator:
+    """
+    Координация нескольких uvicorn воркеров без внешних сервисов.
+
+    Всё построено на файловых блокировках (flock) в coordination_dir:
+    - locks/<key>.lock — блокировка символа на время сделки
+    - dedupe/<hash>    — отметка обработанного сигнала (с TTL)
+    - leader.lock      — единственный владелец общих задач: восстановление
+      сделок по журналу, локальные алерты, очистка dedupe
+    - workers/<id>.lock — держится воркером всю жизнь; по нему лидер
+      отличает сделки живых воркеров от сделок упавших
+
+    Кэши (рыночные данные, балансы) и сверка защиты / трейлинг своих
+    сделок остаются в каждом воркере: они обслуживают запросы и сделки
+    этого процесса, а лимит запросов ccxt поделён между воркерами.
+
+    Блокировки flock снимаются ядром при смерти процесса, поэтому
+    упавший воркер не оставляет «висящих» замков, а лидерство
+    подхватывает следующий живой воркер.
+    """
+
+    LEADER_RETRY_SECONDS = 5.0
+    LOCK_POLL_SECONDS = 0.005
+
+    def __init__(self, directory: str, dedupe_ttl: float):
+        self.directory = directory
+        self.dedupe_ttl = dedupe_ttl
+        self.is_leader = False
+        # pid + случайный хвост: pid повторяются после рестарта контейнера
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._worker_fd: Optional[int] = None
+        self._leader_fd: Optional[int] = None
+        self._leader_task: Optional[asyncio.Task] = None
+        self._purge_task: Optional[asyncio.Task] = None
+        self._leader_callbacks: list[Callable[[], Awaitable[None]]] = []
+        self._local_locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+        self._locks_dir = os.path.join(directory, "locks")
+        self._dedupe_dir = os.path.join(directory, "dedupe")
+        self._workers_dir = os.path.join(directory, "workers")
+        os.makedirs(self._locks_dir, exist_ok=True)
+        os.makedirs(self._dedupe_dir, exist_ok=True)
+        os.makedirs(self._workers_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        if self._worker_fd is None:
+            fd = os.open(self._worker_path(self.worker_id), os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            self._worker_fd = fd
+        if not await self._try_become_leader():
+            self._leader_task = asyncio.create_task(self._wait_for_leadership())
+
+    async def stop(self) -> None:
+        for task in (self._leader_task, self._purge_task):
+            if task:
+                task.cancel()
+        self._leader_task = None
+        self._purge_task = None
+        if self._leader_fd is not None:
+            os.close(self._leader_fd)  # закрытие fd снимает flock
+            self._leader_fd = None
+        self.is_leader = False
+        if self._worker_fd is not None:
+            os.unlink(self._worker_path(self.worker_id))
+            os.close(self._worker_fd)
+            self._worker_fd = None
+
+    # ------------------------------------------------------------------
+    # WORKERS
+    # ------------------------------------------------------------------
+
+    def _worker_path(self, worker_id: str) -> str:
+        return os.path.join(self._workers_dir, f"{worker_id}.lock")
+
+    def is_alive(self, worker_id: Optional[str]) -> bool:
+        """
+        Жив ли воркер worker_id: его flock держится, пока жив процесс.
+
+        Замок удалось взять — владелец умер, файл удаляется.
+        """
+        if not worker_id:
+            return False
+        try:
+            fd = os.open(self._worker_path(worker_id), os.O_RDWR)
+        except FileNotFoundError:
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        else:
+            try:
+                os.unlink(self._worker_path(worker_id))
+            except FileNotFoundError:
+                pass
+            return False
+        finally:
+            os.close(fd)
+
+    # ------------------------------------------------------------------
+    # LEADERSHIP
+    # ------------------------------------------------------------------
+
+    def on_leadership(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """
+        Регистрирует корутину, которая запускается в воркере-лидере
+        (сразу, если он уже лидер, или при переходе лидерства).
+        """
+        self._leader_callbacks.append(callback)
+
+    async def _try_become_leader(self) -> bool:
+        fd = os.open(os.path.join(self.directory, "leader.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+        self._leader_fd = fd
+        self.is_leader = True
+        logger.info(f"👑 Воркер {os.getpid()} стал лидером (фоновые задачи)")
+
+        if self.dedupe_ttl > 0:
+            self._purge_task = asyncio.create_task(self._purge_loop())
+
+        for callback in self._leader_callbacks:
+            try:
+                await callback()
+            except Exception as e:
+                logger.error(f"Ошибка задачи лидера {callback.__qualname__}: {e}")
+        return True
+
+    async def _wait_for_leadership(self) -> None:
+        while not await self._try_become_leader():
+            await asyncio.sleep(self.LEADER_RETRY_SECONDS)
+        self._leader_task = None
+
+    # ------------------------------------------------------------------
+    # SYMBOL LOCK
+    # ------------------------------------------------------------------
+
+    @asynccontextmanager
+    async def symbol_lock(self, exchange: str, symbol: str):
+        """
+        Межпроцессная блокировка символа на время сделки.
+
+        Внутри процесса конкуренты ждут на asyncio.Lock, между процессами —
+        на flock без блокировки event loop (опрос с LOCK_NB).
+        """
+        key = f"{exchange}_{symbol}".replace("/", "-").replace(":", "-")
+
+        async with self._local_locks[key]:
+            fd = os.open(os.path.join(self._locks_dir, f"{key}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                while True:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        await asyncio.sleep(self.LOCK_POLL_SECONDS)
+                yield
+            finally:
+                os.close(fd)
+
+    # ------------------------------------------------------------------
+    # DEDUPE
+    # ------------------------------------------------------------------
+
+    def claim_signal(self, key: str) -> bool:
+        """
+        Атомарно отмечает сигнал как обработанный.
+
+        Returns:
+            True — сигнал новый (этот воркер его исполняет),
+            False — такой же сигнал уже принят в пределах dedupe_ttl
+        """
+        if self.dedupe_ttl <= 0:
+            return True
+
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        path = os.path.join(self._dedupe_dir, digest)
+        now = time.time()
+
+        # общий замок держится микросекунды: проверка и запись отметки
+        fd = os.open(os.path.join(self.directory, "dedupe.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if now - os.stat(path).st_mtime < self.dedupe_ttl:
+                    return False
+            except FileNotFoundError:
+                pass
+            with open(path, "w"):
+                pass
+            return True
+        finally:
+            os.close(fd)
+
+    async def _purge_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(self.dedupe_ttl, 1.0) * 10)
+            try:
+                await asyncio.to_thread(self.purge_expired)
+            except Exception as e:
+                logger.warning(f"Очистка отметок дедупликации не удалась: {e}")
+
+    def purge_expired(self) -> int:
+        """Удаляет просроченные отметки дедупликации (вызывает лидер)"""
+        removed = 0
+        deadline = time.time() - max(self.dedupe_ttl, 0)
+        with os.scandir(self._dedupe_dir) as entries:
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime < deadline:
+                        os.unlink(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+def signal_key(
+    exchange: str,
+    symbol: str,
+    direction: str,
+    price: Optional[float] = None,
+    alert_time: Optional[datetime] = None,
+) -> str:
+    """
+    Ключ дедупликации сигнала — один для вебхука TradingView и /signal.
+
+    Повтор — та же биржа, символ, направление и цена алерта; alert_time
+    (если передан) отличает новое срабатывание алерта от повтора.
+    """
+    key = f"{exchange.lower()}:{symbol}:{direction.upper()}:{price}"
+    if alert_time is not None:
+        key += f":{alert_time.isoformat()}"
+    return key
+
+
+# Общий координатор процесса; запускается в lifespan приложения
+coordinator = WorkerCoordinator(settings.coordination_dir, settings.signal_dedupe_ttl)
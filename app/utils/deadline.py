@@ -0,0 +1,131 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Awaitable, Iterator, Optional, TypeVar
+
+from app.config.settings import settings
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """Бюджет времени сигнала исчерпан — сделка не отправляется на биржу"""
+
+    def __init__(self, stage: str, overdue: float):
+        self.stage = stage
+        self.overdue = overdue
+        super().__init__(f"Сигнал устарел ({stage}): бюджет превышен на {overdue:.2f}с")
+
+
+class Deadline:
+    """
+    Бюджет времени сигнала от поступления (или от срабатывания
+    алерта в TradingView, если время алерта известно).
+
+    Активный дедлайн задачи (use_deadline) ограничивает таймауты
+    запросов к бирже остатком бюджета. После отправки входа дедлайн
+    снимается (disarm): защита SL / TP ставится без ограничения.
+    """
+
+    __slots__ = ("budget", "expires_at", "armed", "owner")
+
+    def __init__(self, budget: float, expires_at: float):
+        self.budget = budget
+        self.expires_at = expires_at        # time.monotonic()
+        self.armed = True
+        self.owner: Optional[asyncio.Task] = None
+
+    @classmethod
+    def for_signal(
+        cls, alert_time: Optional[datetime] = None, budget: Optional[float] = None
+    ) -> Optional["Deadline"]:
+        """
+        Дедлайн нового сигнала; None, если signal_max_age = 0.
+
+        Возраст алерта вычитается из бюджета: алерт, пролежавший
+        в очереди TradingView, получает меньше времени.
+        """
+        budget = settings.signal_max_age if budget is None else budget
+        if not budget:
+            return None
+        expires_at = time.monotonic() + budget
+        if alert_time is not None:
+            expires_at -= signal_age(alert_time)
+        return cls(budget, expires_at)
+
+    @property
+    def remaining(self) -> float:
+        if not self.armed:
+            return float("inf")
+        return self.expires_at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining <= 0
+
+    def check(self, stage: str) -> None:
+        """
+        Raises:
+            DeadlineExceeded если бюджет исчерпан
+        """
+        remaining = self.remaining
+        if remaining <= 0:
+            raise DeadlineExceeded(stage, -remaining)
+
+    def disarm(self) -> None:
+        self.armed = False
+
+    async def wait_for(self, awaitable: Awaitable[T], stage: str) -> T:
+        """Ожидание не дольше остатка бюджета"""
+        self.check(stage)
+        if not self.armed:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, self.remaining)
+        except asyncio.TimeoutError:
+            if not self.expired:
+                raise
+            raise DeadlineExceeded(stage, -self.remaining) from None
+
+
+def signal_age(alert_time: datetime) -> float:
+    """Возраст алерта в секундах (время без зоны считается UTC)"""
+    if alert_time.tzinfo is None:
+        alert_time = alert_time.replace(tzinfo=timezone.utc)
+    # часы TradingView могут спешить — будущее время считаем нулевым возрастом
+    return max((datetime.now(timezone.utc) - alert_time).total_seconds(), 0.0)
+
+
+# ----------------------------------------------------------------------
+# ACTIVE DEADLINE
+# ----------------------------------------------------------------------
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def use_deadline(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Делает дедлайн активным для текущей задачи"""
+    if deadline is not None:
+        deadline.owner = asyncio.current_task()
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def active_deadline() -> Optional[Deadline]:
+    """
+    Дедлайн текущей задачи.
+
+    Фоновые задачи, созданные во время сделки (общие запросы кэшей,
+    алгоритмы исполнения), наследуют контекст, но дедлайн сделки
+    к ним не относится — он действует только в задаче-владельце.
+    """
+    deadline = _current.get()
+    if deadline is None or not deadline.armed or deadline.owner is not asyncio.current_task():
+        return None
+    return deadline
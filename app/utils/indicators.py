@@ -1,5 +1,5 @@
-from typing import List
-from app.config.settings import settings
+from typing import List, Optional
+from app.config.profiles import TradingProfile, active_profile
 from app.utils.logger import logger
 
 
@@ -33,44 +33,49 @@ def calculate_atr(highs: List[float], lows: List[float], closes: List[float], pe
     atr_values = true_ranges[-period:]
     atr = sum(atr_values) / len(atr_values)
     
-    logger.info(f"ATR рассчитан: {atr:.4f} (период: {period})")
+    logger.info("ATR рассчитан: %.4f (период: %s)", atr, period)
     return atr
 
 
-async def get_atr_for_symbol(exchange_client, symbol: str) -> float:
+async def get_atr_for_symbol(exchange_client, symbol: str, profile: Optional[TradingProfile] = None) -> float:
     """
     Получение ATR для символа через биржу
     
     Args:
         exchange_client: клиент CCXT
         symbol: торговый символ (например, 'LTC/USDT:USDT')
+        profile: период и таймфрейм ATR; по умолчанию — профиль текущей сделки
     
     Returns:
         Среднее значение ATR
     """
+    if profile is None:
+        profile = active_profile()
+    period = profile.atr_period
+
     try:
         # Получаем исторические данные (OHLCV)
         # Нужно получить достаточно свечей для расчета ATR
         # Обычно нужно period + несколько дополнительных свечей
-        limit = settings.atr_period + 10  # Берем с запасом
+        limit = period + 10  # Берем с запасом
         
-        ohlcv = await exchange_client.client.fetch_ohlcv(symbol, timeframe=settings.atr_timeframe, limit=limit)
+        ohlcv = await exchange_client.fetch_ohlcv(symbol, timeframe=profile.atr_timeframe, limit=limit)
         
-        if len(ohlcv) < settings.atr_period + 2:  # +2: period + 1 для расчета + 1 текущая свеча
-            raise ValueError(f"Недостаточно данных для расчета ATR. Получено {len(ohlcv)} свечей, требуется минимум {settings.atr_period + 2}")
+        if len(ohlcv) < period + 2:  # +2: period + 1 для расчета + 1 текущая свеча
+            raise ValueError(f"Недостаточно данных для расчета ATR. Получено {len(ohlcv)} свечей, требуется минимум {period + 2}")
         
         # Исключаем последнюю (текущую) свечу, так как она еще не закрылась
         # Используем только закрытые свечи для расчета ATR
         ohlcv_closed = ohlcv[:-1]  # Все кроме последней свечи
         
-        logger.info(f"Получено {len(ohlcv)} свечей, используем {len(ohlcv_closed)} закрытых свечей для расчета ATR")
+        logger.info("Получено %s свечей, используем %s закрытых свечей для расчета ATR", len(ohlcv), len(ohlcv_closed))
         
         # Извлекаем данные из закрытых свечей
         highs = [candle[2] for candle in ohlcv_closed]  # индекс 2 = high
         lows = [candle[3] for candle in ohlcv_closed]   # индекс 3 = low
         closes = [candle[4] for candle in ohlcv_closed] # индекс 4 = close
         
-        atr = calculate_atr(highs, lows, closes, settings.atr_period)
+        atr = calculate_atr(highs, lows, closes, period)
         return atr
         
     except Exception as e:
@@ -1,35 +1,94 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 import os
-from datetime import datetime
+from typing import Optional
 
+from app.config.settings import settings
 
-def setup_logger(name: str = "bot_trader") -> logging.Logger:
-    """Настройка логгера"""
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    
+
+# Фоновый поток, который пишет записи из очереди в консоль и файл
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _log_path() -> str:
+    """
+    Файл логов процесса.
+
+    Воркеры app.server (WEB_WORKERS > 1) пишут каждый в свой файл
+    logs/bot_trader.<номер>.log: ротация в полночь переименовывает файл,
+    и при общем файле воркеры затирали бы записи друг друга.
+    """
+    index = os.environ.get("WEB_WORKER_INDEX")
+    return f"logs/bot_trader.{index}.log" if index else "logs/bot_trader.log"
+
+
+def _build_handlers() -> list[logging.Handler]:
+    """Конечные обработчики: работают только в фоновом потоке"""
     # Создаем папку для логов если её нет
     os.makedirs("logs", exist_ok=True)
-    
+
     # Формат логов
     formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
-    
+
     # Консольный handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
-    # Файловый handler
-    file_handler = logging.FileHandler(f'logs/bot_trader_{datetime.now().strftime("%Y%m%d")}.log')
+
+    # Файловый handler: ротация в полночь, logs/bot_trader.log.YYYY-MM-DD
+    file_handler = logging.handlers.TimedRotatingFileHandler(
+        _log_path(),
+        when='midnight',
+        backupCount=settings.log_backup_count,
+        encoding='utf-8',
+    )
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-    
+
+    return [console_handler, file_handler]
+
+
+def attach_queue_listener(
+    logger: logging.Logger, handlers: list[logging.Handler]
+) -> logging.handlers.QueueListener:
+    """
+    Подключает к логгеру очередь вместо синхронных обработчиков.
+
+    В потоке event loop остаётся только постановка записи в очередь,
+    запись в stdout и на диск выполняет QueueListener в своём потоке.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    listener.start()
+    return listener
+
+
+def stop_logging() -> None:
+    """Дописывает очередь до конца и останавливает фоновый поток"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logger(name: str = "bot_trader") -> logging.Logger:
+    """Настройка логгера"""
+    global _listener
+    logger = logging.getLogger(name)
+    logger.setLevel(settings.log_level.upper())
+
+    _listener = attach_queue_listener(logger, _build_handlers())
+    atexit.register(stop_logging)
+
     return logger
 
 
 logger = setup_logger()
-
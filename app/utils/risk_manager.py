@@ -12,9 +12,9 @@ class RiskManager:
             logger.warning(f"Размер позиции должен быть больше 0: {size}")
             return False
         
-        if size > settings.max_position_size:
+        if size > settings.max_position_usdt:
             logger.warning(
-                f"Размер позиции {size} превышает максимальный лимит {settings.max_position_size}"
+                f"Размер позиции {size} превышает максимальный лимит {settings.max_position_usdt}"
             )
             return False
         
@@ -45,7 +45,7 @@ class RiskManager:
             return False, "Некорректная цена"
         
         if not RiskManager.validate_position_size(size):
-            return False, f"Размер позиции превышает лимит {settings.max_position_size}"
+            return False, f"Размер позиции превышает лимит {settings.max_position_usdt}"
         
         if not RiskManager.validate_leverage(leverage):
             return False, "Некорректное значение кредитного плеча"
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator, Union
+
+from app.config.settings import settings
+from app.utils.logger import logger
+
+DrainCallback = Callable[[float], Awaitable[None]]
+CloseCallback = Callable[[], Union[Awaitable[None], None]]
+
+
+class ShutdownCoordinator:
+    """
+    Плавная остановка процесса.
+
+    1. draining: новые сигналы отклоняются (503), /health сообщает
+       балансировщику, что воркер уходит. Включается по SIGTERM, пока
+       порт ещё открыт (app.server.DrainingServer).
+    2. drain: ожидание сделок в полёте (вход → SL / TP) и остановка
+       фоновых исполнений не дольше drain_timeout.
+    3. close: сервисы останавливаются в порядке регистрации — пулы
+       клиентов бирж, журнал, логи закрываются последними.
+    """
+
+    def __init__(self, drain_timeout: float):
+        self.drain_timeout = drain_timeout
+        self.draining = False
+
+        self._inflight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._drain_callbacks: list[tuple[str, DrainCallback]] = []
+        self._close_callbacks: list[tuple[str, CloseCallback]] = []
+
+    # ------------------------------------------------------------------
+    # REGISTRATION
+    # ------------------------------------------------------------------
+
+    def on_drain(self, name: str, callback: DrainCallback) -> None:
+        """callback(timeout) доводит фоновые исполнения до безопасного состояния"""
+        self._drain_callbacks.append((name, callback))
+
+    def on_close(self, name: str, callback: CloseCallback) -> None:
+        """Остановка сервиса после drain (синхронная или async)"""
+        self._close_callbacks.append((name, callback))
+
+    # ------------------------------------------------------------------
+    # IN-FLIGHT
+    # ------------------------------------------------------------------
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Сделка / запрос в полёте: drain дождётся выхода из блока"""
+        self._inflight += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._inflight -= 1
+            if not self._inflight:
+                self._idle.set()
+
+    # ------------------------------------------------------------------
+    # SHUTDOWN
+    # ------------------------------------------------------------------
+
+    async def shutdown(self) -> None:
+        self.draining = True
+        deadline = time.monotonic() + self.drain_timeout
+
+        if self._inflight:
+            logger.info(f"🛑 Остановка: ждём сделки в полёте ({self._inflight})")
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.error(
+                f"🛑 За {self.drain_timeout:.0f}с не завершились {self._inflight} сделок — "
+                f"проверьте позиции и защиту после рестарта"
+            )
+
+        for name, callback in self._drain_callbacks:
+            remaining = max(deadline - time.monotonic(), 0.0)
+            try:
+                await callback(remaining)
+            except Exception as e:
+                logger.error(f"🛑 Остановка {name} не удалась: {e}")
+
+        for name, callback in self._close_callbacks:
+            try:
+                result = callback()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"🛑 Закрытие {name} не удалось: {e}")
+
+
+# Общий координатор остановки процесса
+shutdown_coordinator = ShutdownCoordinator(settings.shutdown_drain_timeout)
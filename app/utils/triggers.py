@@ -0,0 +1,51 @@
+from bisect import bisect_right, insort
+from typing import Generic, Protocol, TypeVar
+
+
+class Triggerable(Protocol):
+    direction: int      # 1 — срабатывает при цене >= trigger, -1 — при цене <= trigger
+    trigger: float
+    seq: int            # уникальный номер, порядок при равных уровнях
+
+
+T = TypeVar("T", bound=Triggerable)
+
+
+class TriggerIndex(Generic[T]):
+    """
+    Отсортированные уровни срабатывания одного символа и направления.
+
+    Ключ — уровень со знаком направления (для направления -1 — минус
+    цена), поэтому сработавшие уровни всегда образуют префикс списка:
+    поиск границы — bisect, O(log n) на тик.
+    """
+
+    __slots__ = ("keys", "items")
+
+    def __init__(self):
+        self.keys: list[tuple[float, int]] = []
+        self.items: dict[int, T] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, item: T) -> None:
+        insort(self.keys, (item.direction * item.trigger, item.seq))
+        self.items[item.seq] = item
+
+    def remove(self, item: T) -> None:
+        if self.items.pop(item.seq, None) is None:
+            return
+        key = (item.direction * item.trigger, item.seq)
+        index = bisect_right(self.keys, key) - 1
+        if index >= 0 and self.keys[index] == key:
+            del self.keys[index]
+
+    def pop_triggered(self, signed_price: float) -> list[T]:
+        """Все уровни, достигнутые ценой (цена умножена на направление индекса)"""
+        if not self.keys or self.keys[0][0] > signed_price:
+            return []
+        count = bisect_right(self.keys, (signed_price, float("inf")))
+        fired = [self.items.pop(seq) for _, seq in self.keys[:count]]
+        del self.keys[:count]
+        return fired
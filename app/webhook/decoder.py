@@ -0,0 +1,94 @@
+from typing import Union
+
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:  # orjson не установлен — стандартный json медленнее, но совместим
+    import json
+
+    _json_loads = json.loads
+
+from app.config.profiles import trading_profiles
+from app.config.settings import settings
+from app.models.trade import TradeSignal
+from app.models.webhook import TradingViewAlert, TradingViewWebhook
+
+
+# Первые значимые байты JSON документа
+_JSON_START = (ord("{"), ord("["))
+_WHITESPACE = b" \t\r\n"
+
+
+def _is_json_body(body: bytes, content_type: str | None) -> bool:
+    """
+    Определение формата тела без попытки парсинга.
+
+    TradingView шлёт application/json только если тело — валидный JSON,
+    иначе text/plain, поэтому text/plain сразу идёт в текстовый парсер.
+    Для остальных типов (ручные запросы, прокси без заголовка)
+    решает первый значимый байт.
+    """
+    if content_type and content_type.startswith("text/plain"):
+        return False
+    stripped = body.lstrip(_WHITESPACE)
+    return bool(stripped) and stripped[0] in _JSON_START
+
+
+def _alert_to_signal(alert: TradingViewAlert) -> TradeSignal:
+    size, leverage = alert.size, alert.leverage
+    if not size or not leverage:
+        # профиль нужен только для незаданных в алерте полей
+        profile = trading_profiles.resolve(alert.exchange or settings.exchange, alert.symbol, alert.strategy)
+        size = size or profile.size_position
+        leverage = leverage or profile.leverage
+    return TradeSignal(
+        symbol=alert.symbol,
+        direction=alert.direction,
+        entry_price=alert.price,
+        size=size,
+        leverage=leverage,
+        exchange=alert.exchange,               # None — биржу выберет маршрутизация
+        alert_time=alert.alert_time,
+        strategy=alert.strategy,
+    )
+
+
+def _is_structured(item) -> bool:
+    return isinstance(item, dict) and "direction" in item and "price" in item
+
+
+def decode_webhook_body(
+    body: bytes, content_type: str | None = None
+) -> Union[TradingViewWebhook, list[TradeSignal]]:
+    """
+    Разбор тела вебхука за одно чтение.
+
+    - текст алерта → TradingViewWebhook (дальше текстовый парсер)
+    - JSON {"message": "..."} / {"text": "..."} → TradingViewWebhook
+    - JSON алерт по схеме TradingViewAlert (или список таких) →
+      готовые TradeSignal, текстовый парсинг пропускается
+
+    Raises:
+        ValueError если тело пустое или не соответствует ни одному формату
+    """
+    if not body or not body.strip():
+        raise ValueError("Пустое тело запроса")
+
+    if not _is_json_body(body, content_type):
+        return TradingViewWebhook(message=body.decode("utf-8"))
+
+    payload = _json_loads(body)
+
+    if isinstance(payload, list):
+        if payload and all(_is_structured(item) for item in payload):
+            return [_alert_to_signal(TradingViewAlert.model_validate(item)) for item in payload]
+        raise ValueError("Список алертов должен содержать только структурированные алерты")
+
+    if _is_structured(payload):
+        return [_alert_to_signal(TradingViewAlert.model_validate(payload))]
+
+    if isinstance(payload, dict):
+        return TradingViewWebhook.from_payload(payload)
+
+    raise ValueError("Неподдерживаемый формат JSON вебхука")
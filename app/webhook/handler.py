@@ -3,11 +3,23 @@ from app.models.webhook import TradingViewWebhook
 from app.models.trade import TradeSignal
 from app.parser.tradingview import TradingViewParser
 from app.exchange.order_manager import OrderManager
-from app.exchange.factory import ExchangeFactory
-from app.models.order import OrderRequest
+from app.exchange.router import venue_router
+from app.exchange.retry import AUTH, INSUFFICIENT_FUNDS, classify, exchange_message
+from app.models.order import OrderRequest, OrderResponse
 from app.utils.risk_manager import RiskManager
+from app.config.profiles import trading_profiles
 from app.config.settings import settings
 from app.utils.logger import logger
+from app.utils.coordination import coordinator, signal_key
+from app.utils.deadline import Deadline
+
+
+class TradeFailed(Exception):
+    """Сделка не исполнена; kind — класс исходной ошибки биржи"""
+
+    def __init__(self, message: str, kind: str | None):
+        super().__init__(message)
+        self.kind = kind
 
 
 class WebhookHandler:
@@ -22,105 +34,223 @@ class WebhookHandler:
         Обработка вебхука от TradingView
         
         Args:
-            webhook: данные вебхука
+            webhook: данные вебхука (один или несколько алертов, по одному на строку)
         
         Returns:
-            dict с результатом обработки
+            dict с результатом обработки; для пачки алертов — с результатом по каждому
         """
-        import time
-        webhook_start_time = time.time()
         try:
             # Извлекаем текст сообщения
             message = webhook.get_message_text()
             if not message:
                 raise ValueError("Пустое сообщение в вебхуке")
             
-            logger.info(f"Получен вебхук: {message}")
-            
-            # Парсим алерт
-            trade_signal = self.parser.parse_alert(message)
-            
-            # Проверяем риски
-            is_valid, error_msg = RiskManager.check_risk_limits(
-                size=trade_signal.size or settings.size_position,
-                leverage=trade_signal.leverage or settings.default_leverage,
-                price=trade_signal.entry_price
-            )
-            
-            if not is_valid:
-                raise ValueError(f"Проверка рисков не пройдена: {error_msg}")
+            logger.info("Получен вебхук: %s", message)
             
-            # Определяем биржу
-            exchange = trade_signal.exchange or settings.exchange
-            
-            # Рассчитываем стоп-лосс и тейк-профит на основе ATR
-            stop_loss, take_profit = await self.order_manager.calculate_stop_loss_take_profit(
-                exchange_name=exchange,
-                symbol=trade_signal.symbol,
-                entry_price=trade_signal.entry_price,
-                direction=trade_signal.direction,
-                contract_type=settings.contract_type
-            )
-            
-            # Определяем сторону ордера
-            side = "buy" if trade_signal.direction == "LONG" else "sell"
-            
-            # Создаем запрос на ордер
-            order_request = OrderRequest(
-                symbol=trade_signal.symbol,
-                side=side,
-                amount=trade_signal.size or settings.size_position,
-                leverage=trade_signal.leverage or settings.default_leverage,
-                stop_loss=stop_loss,
-                take_profit=take_profit,
-                contract_type=settings.contract_type,
-                exchange=exchange,
-                entry_price=trade_signal.entry_price  # Цена из алерта (для limit ордеров)
-            )
+            # Парсим алерты
+            trade_signals = self.parser.parse_alerts(message)
+        except Exception as e:
+            raise self._to_http_error(e)
+
+        return await self.process_trade_signals(trade_signals)
+
+    async def process_trade_signals(self, trade_signals: list[TradeSignal]) -> dict:
+        """
+        Исполнение уже распарсенных сигналов (текстовый парсер или JSON схема)
+        
+        Returns:
+            dict с результатом: одиночная сделка или результат по каждому сигналу
+        """
+        if len(trade_signals) == 1:
+            return await self.process_signal(trade_signals[0])
+
+        return await self.process_signals(trade_signals)
+
+    async def process_signal(self, trade_signal: TradeSignal) -> dict:
+        """
+        Исполнение одного распарсенного сигнала
+        
+        Args:
+            trade_signal: торговый сигнал
+        
+        Returns:
+            dict с результатом сделки
+        """
+        import time
+        webhook_start_time = time.time()
+        try:
+            deadline = self._start_deadline(trade_signal)
+            order_request = self._build_order_request(trade_signal)
+
+            # Биржа не указана в алерте — выбираем лучшую
+            if not trade_signal.exchange:
+                order_request = await venue_router.route(order_request)
             
             # Выполняем сделку
-            order_response = await self.order_manager.execute_trade(order_request)
+            order_response = await self.order_manager.execute_trade(order_request, deadline=deadline)
             
             if order_response.success:
-                total_time = time.time() - webhook_start_time
-                logger.info(
-                    f"Сделка успешно выполнена: {trade_signal.symbol} "
-                    f"{trade_signal.direction} @ {trade_signal.entry_price} "
-                    f"(общее время обработки: {total_time:.2f}с)"
-                )
-                return {
-                    "success": True,
-                    "message": "Сделка успешно выполнена",
-                    "order_id": order_response.order_id,
-                    "stop_loss": round(stop_loss, 4),
-                    "take_profit": round(take_profit, 4),
-                    "symbol": trade_signal.symbol,
-                    "direction": trade_signal.direction,
-                    "entry_price": trade_signal.entry_price,
-                    "execution_time_seconds": round(total_time, 2)
-                }
+                return self._format_result(trade_signal, order_response, webhook_start_time)
             else:
-                raise Exception(order_response.error or "Неизвестная ошибка при выполнении сделки")
+                raise TradeFailed(
+                    order_response.error or "Неизвестная ошибка при выполнении сделки",
+                    order_response.error_kind,
+                )
                 
         except Exception as e:
-            error_msg = str(e)
-            logger.error(f"Ошибка при обработке вебхука: {error_msg}")
-            # Более понятные сообщения об ошибках
-            if "apiKey" in error_msg.lower() or "credential" in error_msg.lower():
-                error_msg = "Не настроены API ключи для биржи. Проверьте файл .env"
-            elif "not enough" in error_msg.lower() or "insufficient" in error_msg.lower() or "110007" in error_msg:
-                error_msg = "Недостаточно баланса для открытия позиции. Проверьте баланс на бирже."
-            elif "retCode" in error_msg or "retMsg" in error_msg:
-                # Парсим ошибку от Bybit
-                import json
-                try:
-                    if "{" in error_msg:
-                        error_json = json.loads(error_msg.split("{")[1].split("}")[0] + "}")
-                        if "retMsg" in error_json:
-                            error_msg = f"Ошибка биржи: {error_json['retMsg']}"
-                except:
-                    pass
-            raise HTTPException(status_code=400, detail=error_msg)
+            raise self._to_http_error(e)
+
+    async def process_signals(self, trade_signals: list[TradeSignal]) -> dict:
+        """
+        Пакетное исполнение сигналов из одного вебхука через OrderManager.execute_batch
+        
+        Returns:
+            dict с результатом по каждому сигналу
+        """
+        import time
+        webhook_start_time = time.time()
+        logger.info(f"Пачка алертов: {len(trade_signals)} сигналов")
+
+        results: list[dict | None] = [None] * len(trade_signals)
+        order_requests: list[OrderRequest] = []
+        deadlines: list[Deadline | None] = []
+        positions: list[int] = []
+
+        for index, trade_signal in enumerate(trade_signals):
+            try:
+                deadline = self._start_deadline(trade_signal)
+                order_requests.append(self._build_order_request(trade_signal))
+                deadlines.append(deadline)
+                positions.append(index)
+            except Exception as e:
+                results[index] = self._format_error(trade_signal, e)
+
+        order_requests = await venue_router.route_many(
+            order_requests,
+            [not trade_signals[index].exchange for index in positions],
+        )
+
+        order_responses = await self.order_manager.execute_batch(order_requests, deadlines)
+
+        for index, order_response in zip(positions, order_responses):
+            trade_signal = trade_signals[index]
+            if order_response.success:
+                results[index] = self._format_result(trade_signal, order_response, webhook_start_time)
+            else:
+                results[index] = self._format_error(
+                    trade_signal,
+                    TradeFailed(order_response.error or "Неизвестная ошибка", order_response.error_kind),
+                )
+
+        return {
+            "success": all(result["success"] for result in results),
+            "count": len(results),
+            "results": results,
+        }
+
+    @staticmethod
+    def _start_deadline(trade_signal: TradeSignal) -> Deadline | None:
+        """
+        Бюджет времени сигнала (signal_max_age) от поступления или от
+        alert_time; алерт, устаревший ещё до обработки, отклоняется сразу.
+        """
+        deadline = Deadline.for_signal(trade_signal.alert_time)
+        if deadline is not None:
+            deadline.check("приём")
+        return deadline
+
+    def _build_order_request(self, trade_signal: TradeSignal) -> OrderRequest:
+        # Биржа не указана — EXCHANGE, пока маршрутизация не выберет лучшую
+        exchange = trade_signal.exchange or settings.exchange
+
+        # Размер и плечо по умолчанию — из профиля символа / стратегии
+        profile = trading_profiles.resolve(exchange, trade_signal.symbol, trade_signal.strategy)
+        size = trade_signal.size or profile.size_position
+        leverage = trade_signal.leverage or profile.leverage
+
+        # Проверяем риски
+        is_valid, error_msg = RiskManager.check_risk_limits(
+            size=size,
+            leverage=leverage,
+            price=trade_signal.entry_price
+        )
+        
+        if not is_valid:
+            raise ValueError(f"Проверка рисков не пройдена: {error_msg}")
+
+        # Повтор того же алерта (в этом или другом воркере) не исполняем
+        key = signal_key(
+            exchange, trade_signal.symbol, trade_signal.direction,
+            trade_signal.entry_price, trade_signal.alert_time,
+        )
+        if not coordinator.claim_signal(key):
+            raise ValueError(f"Дубликат сигнала {key}, пропущен")
+        
+        # Определяем сторону ордера
+        side = "buy" if trade_signal.direction == "LONG" else "sell"
+        
+        # Создаем запрос на ордер
+        # SL / TP рассчитываются риск-стратегией внутри OrderManager
+        return OrderRequest(
+            symbol=trade_signal.symbol,
+            side=side,
+            amount=size,
+            leverage=leverage,
+            stop_loss=0.0,
+            take_profit=0.0,
+            contract_type=settings.contract_type,
+            exchange=exchange,
+            entry_price=trade_signal.entry_price,  # Цена из алерта (для limit ордеров)
+            strategy=trade_signal.strategy,
+        )
+
+    @staticmethod
+    def _format_result(
+        trade_signal: TradeSignal,
+        order_response: OrderResponse,
+        start_time: float,
+    ) -> dict:
+        import time
+        total_time = time.time() - start_time
+        logger.info(
+            "Сделка успешно выполнена: %s %s @ %s (общее время обработки: %.2fс)",
+            trade_signal.symbol, trade_signal.direction, trade_signal.entry_price, total_time,
+        )
+        return {
+            "success": True,
+            "message": "Сделка успешно выполнена",
+            "order_id": order_response.order_id,
+            "stop_loss": round(order_response.stop_loss or 0.0, 4),
+            "take_profit": round(order_response.take_profit or 0.0, 4),
+            "symbol": trade_signal.symbol,
+            "direction": trade_signal.direction,
+            "entry_price": trade_signal.entry_price,
+            "execution_time_seconds": round(total_time, 2)
+        }
+
+    @classmethod
+    def _format_error(cls, trade_signal: TradeSignal, error: Exception) -> dict:
+        return {
+            "success": False,
+            "symbol": trade_signal.symbol,
+            "direction": trade_signal.direction,
+            "error": cls._to_http_error(error).detail,
+        }
+
+    @staticmethod
+    def _to_http_error(e: Exception) -> HTTPException:
+        """Перевод исключения в понятную HTTP ошибку"""
+        error_msg = str(e)
+        logger.error(f"Ошибка при обработке вебхука: {error_msg}")
+        # Более понятные сообщения об ошибках — по классу исключения ccxt
+        kind = e.kind if isinstance(e, TradeFailed) else classify(e)
+        if kind == AUTH:
+            error_msg = "Биржа отклонила API ключи. Проверьте файл .env"
+        elif kind == INSUFFICIENT_FUNDS:
+            error_msg = "Недостаточно баланса для открытия позиции. Проверьте баланс на бирже."
+        elif message := exchange_message(e):
+            error_msg = f"Ошибка биржи: {message}"
+        return HTTPException(status_code=400, detail=error_msg)
     
     async def cleanup(self):
         """Очистка ресурсов"""
@@ -0,0 +1,53 @@
+"""
+Бенчмарк журнала сделок.
+
+Запуск:
+    python -m benchmarks.bench_journal
+
+Измеряет задержку record() в вызывающем потоке (то, что платит event loop)
+и время, за которое фоновый поток сохраняет все события на диск.
+"""
+import os
+import tempfile
+import time
+
+os.environ.setdefault("WEBHOOK_SECRET_TOKEN", "bench")
+os.environ.setdefault("TRADE_SIGNAL_TOKEN", "bench")
+
+from app.journal.trade_journal import TradeJournal, TradeState  # noqa: E402
+
+TRADES = 5000
+STATES = (TradeState.RECEIVED, TradeState.SIZED, TradeState.ENTRY_ACKED, TradeState.PROTECTED)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        journal = TradeJournal(os.path.join(directory, "journal.db"))
+        journal.start()
+
+        request = {"symbol": "LTCUSDT", "side": "buy", "leverage": 35, "exchange": "bybit"}
+        latencies = []
+        started = time.perf_counter()
+
+        for state in STATES:
+            for n in range(TRADES):
+                t0 = time.perf_counter()
+                journal.record(f"trade-{n}", state, request=request, amount=0.3)
+                latencies.append(time.perf_counter() - t0)
+
+        enqueued = time.perf_counter()
+        journal.close()
+        persisted = time.perf_counter()
+
+        latencies_us = sorted(latency * 1e6 for latency in latencies)
+        count = len(latencies_us)
+        print(f"событий:          {count}")
+        print(f"record() p50:     {latencies_us[count // 2]:.2f} мкс")
+        print(f"record() p99:     {latencies_us[int(count * 0.99)]:.2f} мкс")
+        print(f"record() p99.9:   {latencies_us[int(count * 0.999)]:.2f} мкс")
+        print(f"постановка всех:  {(enqueued - started) * 1000:.1f} мс")
+        print(f"сохранение всех:  {(persisted - started) * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Бенчмарк задержки event loop при логировании.
+
+Запуск:
+    python -m benchmarks.bench_logging
+
+Имитирует поток сделок (по 15 строк лога на сделку) и медленный диск
+(периодические подвисания записи). Сравнивает задержку event loop при
+синхронных обработчиках и при очереди с фоновым потоком записи.
+"""
+import asyncio
+import io
+import logging
+import os
+import statistics
+import time
+
+os.environ.setdefault("WEBHOOK_SECRET_TOKEN", "bench")
+os.environ.setdefault("TRADE_SIGNAL_TOKEN", "bench")
+
+from app.utils.logger import attach_queue_listener  # noqa: E402
+
+TRADES = 200
+LINES_PER_TRADE = 15
+STALL_EVERY = 50          # каждая N-я запись подвисает
+STALL_SECONDS = 0.005     # на столько
+
+
+class StallingStream(io.StringIO):
+    """Поток, имитирующий подвисания диска"""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s):
+        self.writes += 1
+        if self.writes % STALL_EVERY == 0:
+            time.sleep(STALL_SECONDS)
+        return super().write(s)
+
+
+def make_handler() -> logging.Handler:
+    handler = logging.StreamHandler(StallingStream())
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    return handler
+
+
+async def measure(logger: logging.Logger) -> list[float]:
+    lags: list[float] = []
+    running = True
+
+    async def monitor():
+        interval = 0.001
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - start - interval)
+
+    async def trades():
+        for n in range(TRADES):
+            for line in range(LINES_PER_TRADE):
+                logger.info("🔥 Сделка %s | шаг %s | price=%.6f | amount=%.4f", n, line, 76.47, 0.3)
+            logger.debug("отладка %s", n)  # отсекается уровнем без форматирования
+            await asyncio.sleep(0.001)
+
+    monitor_task = asyncio.create_task(monitor())
+    await trades()
+    running = False
+    await monitor_task
+    return lags
+
+
+def report(label: str, lags: list[float]) -> None:
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    p99 = lags_ms[int(len(lags_ms) * 0.99) - 1]
+    print(
+        f"{label:<22} средняя={statistics.mean(lags_ms):6.3f} мс  "
+        f"p99={p99:6.3f} мс  макс={lags_ms[-1]:6.3f} мс"
+    )
+
+
+def main() -> None:
+    sync_logger = logging.getLogger("bench_sync")
+    sync_logger.propagate = False
+    sync_logger.setLevel(logging.INFO)
+    sync_logger.addHandler(make_handler())
+    report("синхронные handlers", asyncio.run(measure(sync_logger)))
+
+    queue_logger = logging.getLogger("bench_queue")
+    queue_logger.propagate = False
+    queue_logger.setLevel(logging.INFO)
+    listener = attach_queue_listener(queue_logger, [make_handler()])
+    report("очередь + поток", asyncio.run(measure(queue_logger)))
+    listener.stop()
+
+
+if __name__ == "__main__":
+    main()
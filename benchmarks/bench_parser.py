@@ -0,0 +1,59 @@
+"""
+Микро-бенчмарк парсера алертов TradingView.
+
+Запуск:
+    python -m benchmarks.bench_parser
+
+Показывает пропускную способность (алертов в секунду) для одиночных
+алертов и для пачек из нескольких строк в одном теле вебхука.
+"""
+import logging
+import os
+import time
+
+os.environ.setdefault("WEBHOOK_SECRET_TOKEN", "bench")
+os.environ.setdefault("TRADE_SIGNAL_TOKEN", "bench")
+
+from app.parser.tradingview import TradingViewParser  # noqa: E402
+from app.utils.logger import logger  # noqa: E402
+
+ALERTS = [
+    "LTCUSDT Crossing Down 76.47",
+    "BTCUSDT Crossing Down 90,350.00 size=100",
+    "ONTUSDT.P Crossing Up 0.07624 size=100 lev=35",
+    "ETHUSDT Crossing Up 3120.5 lev=20 Bybit",
+    "SOLUSDT Crossing Down 141.07 size=50 lev=10 Binance",
+]
+
+
+def bench(label: str, body: str, alerts_per_body: int, seconds: float = 1.0) -> None:
+    parse = TradingViewParser.parse_alerts
+    iterations = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            parse(body)
+        iterations += 100
+    elapsed = time.perf_counter() - start
+    alerts = iterations * alerts_per_body
+    print(
+        f"{label:<28} {alerts / elapsed:>12,.0f} алертов/с "
+        f"{elapsed / iterations * 1e6:>10.2f} мкс/тело"
+    )
+
+
+def main() -> None:
+    # логирование не должно попадать в замер
+    logger.setLevel(logging.WARNING)
+
+    for alert in ALERTS:
+        bench(alert.split()[0], alert, 1)
+
+    for size in (10, 100):
+        body = "\n".join(ALERTS[i % len(ALERTS)] for i in range(size))
+        bench(f"batch x{size}", body, size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Бенчмарк внутреннего конвейера сигнала: разбор → риск → ордер → ответ.
+
+Запуск:
+    python -m benchmarks.bench_pipeline
+
+Сравнивает прежние pydantic модели (TradeSignal / OrderRequest /
+OrderResponse с изменением запроса на месте и model_dump для журнала)
+с неизменяемыми dataclass(slots=True) из app/models. Для каждого пути —
+время на сигнал, пик памяти на сигнал (tracemalloc) и размер объектов
+моделей. Биржа не нужна: ATR передаётся готовым, как в пакетном режиме.
+"""
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Literal, Optional
+
+os.environ.setdefault("WEBHOOK_SECRET_TOKEN", "bench")
+os.environ.setdefault("TRADE_SIGNAL_TOKEN", "bench")
+
+from pydantic import BaseModel  # noqa: E402
+
+from app.config.profiles import trading_profiles, use_profile  # noqa: E402
+from app.config.settings import settings  # noqa: E402
+from app.models.order import OrderResponse  # noqa: E402
+from app.models.webhook import TradingViewAlert, TradingViewWebhook  # noqa: E402
+from app.parser.tradingview import TradingViewParser  # noqa: E402
+from app.risk.manager import RiskManager  # noqa: E402
+from app.utils.coordination import coordinator  # noqa: E402
+from app.utils.logger import logger  # noqa: E402
+from app.utils.risk_manager import RiskManager as LimitsChecker  # noqa: E402
+from app.webhook.decoder import decode_webhook_body  # noqa: E402
+from app.webhook.handler import WebhookHandler  # noqa: E402
+
+TEXT_BODY = b"LTCUSDT Crossing Up 76.47 size=100 lev=35 Bybit"
+STRUCTURED_BODY = json.dumps({
+    "symbol": "LTCUSDT",
+    "direction": "LONG",
+    "price": 76.47,
+    "size": 100,
+    "leverage": 35,
+    "exchange": "bybit",
+}).encode()
+ATR = 0.85
+
+
+# ----------------------------------------------------------------------
+# LEGACY MODELS (pydantic, как до перехода на dataclass)
+# ----------------------------------------------------------------------
+
+class LegacyWebhook(BaseModel):
+    message: Optional[str] = None
+    text: Optional[str] = None
+    symbol: Optional[str] = None
+    action: Optional[str] = None
+
+
+class LegacyTradeSignal(BaseModel):
+    symbol: str
+    direction: Literal["LONG", "SHORT"]
+    entry_price: float
+    size: Optional[float] = None
+    leverage: Optional[int] = None
+    exchange: Optional[Literal["binance", "okx", "bybit", "bitget"]] = None
+    alert_time: Optional[datetime] = None
+    strategy: Optional[str] = None
+
+
+class LegacyOrderRequest(BaseModel):
+    symbol: str
+    side: Literal["buy", "sell"]
+    amount: float
+    leverage: int
+    stop_loss: float
+    take_profit: float
+    contract_type: Literal["USDT-M", "COIN-M"]
+    exchange: str
+    entry_price: Optional[float] = None
+    routing: Optional[dict] = None
+    strategy: Optional[str] = None
+
+
+class LegacyOrderResponse(BaseModel):
+    success: bool
+    order_id: Optional[str] = None
+    position_id: Optional[str] = None
+    stop_loss_order_id: Optional[str] = None
+    take_profit_order_id: Optional[str] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
+    error_kind: Optional[str] = None
+
+
+def _run(coroutine):
+    """Корутина без ожиданий (ATR уже известен) — без цикла событий"""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("расчёт риска ушёл в ожидание")
+
+
+def _calculate_risk(exchange: str, symbol: str, strategy, entry_price: float, side: str):
+    profile = trading_profiles.resolve(exchange, symbol, strategy)
+    with use_profile(profile):
+        return _run(RiskManager.get_strategy().calculate(None, symbol, entry_price, side, atr=ATR))
+
+
+# ----------------------------------------------------------------------
+# PIPELINES
+# ----------------------------------------------------------------------
+
+def _legacy_signals(body: bytes) -> list[LegacyTradeSignal]:
+    """Прежний разбор: те же шаги, что decode_webhook_body + парсер, на pydantic"""
+    if body.lstrip()[:1] == b"{":
+        alert = TradingViewAlert.model_validate(json.loads(body))
+        exchange = alert.exchange or settings.exchange
+        profile = trading_profiles.resolve(exchange, alert.symbol, alert.strategy)
+        return [LegacyTradeSignal(
+            symbol=alert.symbol,
+            direction=alert.direction,
+            entry_price=alert.price,
+            size=alert.size or profile.size_position,
+            leverage=alert.leverage or profile.leverage,
+            exchange=exchange,
+            alert_time=alert.alert_time,
+            strategy=alert.strategy,
+        )]
+
+    webhook = LegacyWebhook(message=body.decode("utf-8"))
+    signals = []
+    for signal in TradingViewParser.parse_alerts(webhook.message):
+        signals.append(LegacyTradeSignal(
+            symbol=signal.symbol,
+            direction=signal.direction,
+            entry_price=signal.entry_price,
+            size=signal.size,
+            leverage=signal.leverage,
+            exchange=signal.exchange,
+            strategy=signal.strategy,
+        ))
+    return signals
+
+
+def legacy(body: bytes, content_type: str) -> list[dict]:
+    responses = []
+    for signal in _legacy_signals(body):
+        exchange = signal.exchange or settings.exchange
+        LimitsChecker.check_risk_limits(signal.size, signal.leverage, signal.entry_price)
+        coordinator.claim_signal(f"{exchange}:{signal.symbol}:{signal.direction}:{signal.entry_price}")
+        order_request = LegacyOrderRequest(
+            symbol=signal.symbol,
+            side="buy" if signal.direction == "LONG" else "sell",
+            amount=signal.size,
+            leverage=signal.leverage,
+            stop_loss=0.0,
+            take_profit=0.0,
+            contract_type=settings.contract_type,
+            exchange=exchange,
+            entry_price=signal.entry_price,
+            strategy=signal.strategy,
+        )
+        order_request.model_dump()                      # журнал: RECEIVED
+
+        risk = _calculate_risk(
+            exchange, order_request.symbol, order_request.strategy,
+            signal.entry_price, order_request.side,
+        )
+        order_request.stop_loss = risk.stop_loss
+        order_request.take_profit = risk.take_profit
+        order_request.model_dump()                      # журнал: SIZED
+
+        response = LegacyOrderResponse(success=True, order_id="1", message="Позиция открыта")
+        responses.append(response.model_dump())
+    return responses
+
+
+handler = WebhookHandler()
+
+
+def current(body: bytes, content_type: str) -> list[dict]:
+    payload = decode_webhook_body(body, content_type)
+    if isinstance(payload, TradingViewWebhook):
+        signals = TradingViewParser.parse_alerts(payload.get_message_text())
+    else:
+        signals = payload
+
+    responses = []
+    for signal in signals:
+        order_request = handler._build_order_request(signal)
+        order_request.to_dict()                         # журнал: RECEIVED
+
+        risk = _calculate_risk(
+            order_request.exchange, order_request.symbol, order_request.strategy,
+            signal.entry_price, order_request.side,
+        )
+        order_request = order_request.with_changes(
+            stop_loss=risk.stop_loss, take_profit=risk.take_profit
+        )
+        order_request.to_dict()                         # журнал: SIZED
+
+        response = OrderResponse(
+            success=True,
+            order_id="1",
+            stop_loss=order_request.stop_loss,
+            take_profit=order_request.take_profit,
+            message="Позиция открыта",
+        )
+        responses.append(response.to_dict())
+    return responses
+
+
+# ----------------------------------------------------------------------
+# MEASUREMENT
+# ----------------------------------------------------------------------
+
+def _peak_bytes(fn, *args) -> int:
+    """Пик памяти одного прогона сверх уже занятой"""
+    fn(*args)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return peak
+
+
+def bench(label: str, fn, *args, seconds: float = 1.0) -> float:
+    iterations = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            fn(*args)
+        iterations += 100
+    per_call = (time.perf_counter() - start) / iterations * 1e6
+    print(f"{label:<28} {per_call:>8.2f} мкс/сигнал  пик {_peak_bytes(fn, *args):>6} Б")
+    return per_call
+
+
+def _object_size(obj) -> int:
+    """Объект со служебными контейнерами (у pydantic — __dict__ и набор полей)"""
+    size = sys.getsizeof(obj)
+    for name in ("__dict__", "__pydantic_fields_set__"):
+        if hasattr(obj, name):
+            size += sys.getsizeof(getattr(obj, name))
+    return size
+
+
+def main() -> None:
+    logger.setLevel(logging.WARNING)
+    coordinator.dedupe_ttl = 0              # повтор одного и того же сигнала — не дубликат
+
+    bench("текст: pydantic", legacy, TEXT_BODY, "text/plain")
+    bench("текст: dataclass", current, TEXT_BODY, "text/plain")
+    bench("JSON схема: pydantic", legacy, STRUCTURED_BODY, "application/json")
+    bench("JSON схема: dataclass", current, STRUCTURED_BODY, "application/json")
+
+    legacy_request = LegacyOrderRequest(
+        symbol="LTCUSDT", side="buy", amount=100, leverage=35, stop_loss=0.0,
+        take_profit=0.0, contract_type="USDT-M", exchange="bybit",
+    )
+    signal = TradingViewParser.parse_alert(TEXT_BODY.decode())
+    request = handler._build_order_request(signal)
+    print(f"OrderRequest: pydantic {_object_size(legacy_request)} Б, dataclass {_object_size(request)} Б")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Бенчмарк старта: время импорта app.main и пиковая память процесса.
+
+Запуск:
+    python -m benchmarks.bench_startup
+
+Каждый вариант запускается в отдельном интерпретаторе:
+- lazy: как в приложении — загружается только модуль биржи из EXCHANGE
+- full: прежнее поведение — `import ccxt.async_support` тянет все биржи
+"""
+import json
+import os
+import subprocess
+import sys
+
+RUNS = 3
+
+PROBE = """
+import json, resource, time
+start = time.perf_counter()
+if {full}:
+    import ccxt.async_support
+import app.main
+from app.config.settings import settings
+from app.exchange.loader import load_exchange_class
+load_exchange_class(settings.exchange)
+elapsed = time.perf_counter() - start
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({{"seconds": elapsed, "rss_mb": rss_mb}}))
+"""
+
+
+def run(full: bool) -> dict:
+    env = dict(os.environ)
+    env.setdefault("WEBHOOK_SECRET_TOKEN", "bench")
+    env.setdefault("TRADE_SIGNAL_TOKEN", "bench")
+    env["JOURNAL_ENABLED"] = "false"
+    output = subprocess.check_output(
+        [sys.executable, "-c", PROBE.format(full=full)], env=env, text=True
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    for label, full in (("full ccxt", True), ("lazy loader", False)):
+        results = [run(full) for _ in range(RUNS)]
+        seconds = min(result["seconds"] for result in results)
+        rss_mb = min(result["rss_mb"] for result in results)
+        print(f"{label:<12} импорт={seconds * 1000:7.1f} мс  RSS={rss_mb:6.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
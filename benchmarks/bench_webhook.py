@@ -0,0 +1,80 @@
+"""
+Бенчмарк разбора тела вебхука: тело → список TradeSignal.
+
+Запуск:
+    python -m benchmarks.bench_webhook
+
+Сравнивает прежний путь (request.json() → исключение → повторное чтение
+как текста → regex) с decode_webhook_body для текстового алерта,
+JSON с полем message и структурированного JSON алерта.
+"""
+import json
+import logging
+import os
+import time
+
+os.environ.setdefault("WEBHOOK_SECRET_TOKEN", "bench")
+os.environ.setdefault("TRADE_SIGNAL_TOKEN", "bench")
+
+from app.models.webhook import TradingViewWebhook  # noqa: E402
+from app.parser.tradingview import TradingViewParser  # noqa: E402
+from app.utils.logger import logger  # noqa: E402
+from app.webhook.decoder import decode_webhook_body  # noqa: E402
+
+TEXT_BODY = b"LTCUSDT Crossing Up 76.47 size=100 lev=35 Bybit"
+MESSAGE_BODY = json.dumps({"message": TEXT_BODY.decode()}).encode()
+STRUCTURED_BODY = json.dumps({
+    "symbol": "LTCUSDT",
+    "direction": "LONG",
+    "price": 76.47,
+    "size": 100,
+    "leverage": 35,
+    "exchange": "bybit",
+    "alert_time": "2026-01-05T12:00:00Z",
+}).encode()
+
+
+def legacy(body: bytes) -> list:
+    """Прежняя логика tradingview_webhook из app/main.py"""
+    try:
+        webhook = TradingViewWebhook(**json.loads(body))
+    except Exception:
+        webhook = TradingViewWebhook(message=body.decode("utf-8"))
+    return TradingViewParser.parse_alerts(webhook.get_message_text())
+
+
+def current(body: bytes, content_type: str) -> list:
+    payload = decode_webhook_body(body, content_type)
+    if isinstance(payload, TradingViewWebhook):
+        return TradingViewParser.parse_alerts(payload.get_message_text())
+    return payload
+
+
+def bench(label: str, fn, *args, seconds: float = 0.3, rounds: int = 7) -> float:
+    """Лучший из rounds замеров: шум планировщика только добавляет время"""
+    best = float("inf")
+    for _ in range(rounds):
+        iterations = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while time.perf_counter() < deadline:
+            for _ in range(100):
+                fn(*args)
+            iterations += 100
+        best = min(best, (time.perf_counter() - start) / iterations * 1e6)
+    print(f"{label:<36} {best:>8.2f} мкс/вебхук")
+    return best
+
+
+def main() -> None:
+    logger.setLevel(logging.WARNING)
+
+    bench("текст: прежний путь", legacy, TEXT_BODY)
+    bench("текст: decode_webhook_body", current, TEXT_BODY, "text/plain")
+    bench("JSON message: прежний путь", legacy, MESSAGE_BODY)
+    bench("JSON message: decode_webhook_body", current, MESSAGE_BODY, "application/json")
+    bench("JSON схема: decode_webhook_body", current, STRUCTURED_BODY, "application/json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Воспроизведение записанной сессии через OrderManager без сети.
+
+Запуск:
+    python -m benchmarks.replay_cassette data/exchange.cassette.jsonl.gz
+    python -m benchmarks.replay_cassette data/exchange.cassette.jsonl.gz --fast
+
+Кассета пишется ботом при CASSETTE_MODE=record. Входы сделок
+воспроизводятся с записанными интервалами и задержками бирж, а с
+--fast — подряд и без задержек (регрессия и профилирование пути
+исполнения на реальной форме трафика).
+"""
+import asyncio
+import os
+import sys
+import time
+
+if len(sys.argv) < 2:
+    sys.exit(__doc__)
+
+os.environ["CASSETTE_MODE"] = "replay"
+os.environ["CASSETTE_PATH"] = sys.argv[1]
+os.environ["CASSETTE_TIMING"] = "fast" if "--fast" in sys.argv else "original"
+os.environ["JOURNAL_ENABLED"] = "false"
+os.environ.setdefault("WEBHOOK_SECRET_TOKEN", "bench")
+os.environ.setdefault("TRADE_SIGNAL_TOKEN", "bench")
+
+from app.config.settings import settings  # noqa: E402
+from app.exchange.cassette import cassette  # noqa: E402
+from app.exchange.order_manager import OrderManager  # noqa: E402
+from app.exchange.pool import exchange_pool  # noqa: E402
+from app.models.order import OrderRequest  # noqa: E402
+
+
+async def replay_trade(order_manager: OrderManager, trade: dict) -> tuple[float, object]:
+    started = time.perf_counter()
+    response = await order_manager.execute_trade(
+        OrderRequest.from_dict(trade["request"]),
+        entry_price=trade.get("entry_price"),
+        atr=trade.get("atr"),
+    )
+    return time.perf_counter() - started, response
+
+
+async def main() -> None:
+    trades = cassette.trades()
+    if not trades:
+        sys.exit("В кассете нет сделок")
+
+    order_manager = OrderManager()
+    fast = settings.cassette_timing == "fast"
+    started = time.perf_counter()
+
+    if fast:
+        results = [await replay_trade(order_manager, trade) for _, trade in trades]
+    else:
+        first = trades[0][0]
+
+        async def scheduled(offset: float, trade: dict):
+            await asyncio.sleep(max(offset - first - (time.perf_counter() - started), 0.0))
+            return await replay_trade(order_manager, trade)
+
+        results = await asyncio.gather(*(scheduled(offset, trade) for offset, trade in trades))
+
+    total = time.perf_counter() - started
+    await exchange_pool.close_all()
+
+    print(f"{'symbol':<20} {'side':<5} {'ms':>9}  result")
+    for (_, trade), (elapsed, response) in zip(trades, results):
+        request = trade["request"]
+        result = "ok" if response.success else f"error: {response.error}"
+        print(f"{request['symbol']:<20} {request['side']:<5} {elapsed * 1000:>9.2f}  {result}")
+
+    latencies = sorted(elapsed for elapsed, _ in results)
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+    succeeded = sum(1 for _, response in results if response.success)
+    print()
+    print(
+        f"сделок {len(results)} (успешно {succeeded}) за {total:.3f}с | "
+        f"p50 {p50 * 1000:.2f} ms | p95 {p95 * 1000:.2f} ms | max {latencies[-1] * 1000:.2f} ms | "
+        f"промахов кассеты {cassette.misses} | timing={settings.cassette_timing}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
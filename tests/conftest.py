@@ -0,0 +1,5 @@
+import os
+
+# Settings читаются при импорте app: обязательные токены до первого импорта
+os.environ.setdefault("WEBHOOK_SECRET_TOKEN", "test")
+os.environ.setdefault("TRADE_SIGNAL_TOKEN", "test")
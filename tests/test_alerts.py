@@ -0,0 +1,40 @@
+import os
+
+from app.alerts import AlertEngine, AlertStore
+from app.models.trade import TradeSignal
+
+
+def make_engine(path: str) -> AlertEngine:
+    store = AlertStore(path)
+    store.start()
+    return AlertEngine(store, sync_interval=0)
+
+
+def test_alerts_are_shared_through_the_store(tmp_path):
+    path = os.path.join(str(tmp_path), "journal.db")
+    follower, leader = make_engine(path), make_engine(path)
+    try:
+        signal = TradeSignal(symbol="LTCUSDT", direction="LONG", entry_price=76.47, size=100.0, exchange="bybit")
+        alert = follower.add(signal)
+
+        # поставлен через другой воркер — виден всем, исполняет лидер
+        assert [item["alert_id"] for item in leader.snapshot()] == [alert.alert_id]
+        leader.sync()
+        assert alert.alert_id in leader._alerts
+        assert leader._alerts[alert.alert_id].signal == signal
+
+        # снят через другой воркер — лидер убирает его из индексов
+        assert follower.remove(alert.alert_id)
+        leader.sync()
+        assert not leader._alerts
+        assert not follower.remove(alert.alert_id)
+
+        # рестарт: новый движок загружает ожидающие алерты из таблицы
+        kept = follower.add(signal.with_changes(direction="SHORT", entry_price=70.0))
+        restarted = make_engine(path)
+        restarted.sync()
+        assert list(restarted._alerts) == [kept.alert_id]
+        restarted.store.close()
+    finally:
+        follower.store.close()
+        leader.store.close()
@@ -0,0 +1,105 @@
+import pytest
+
+from app.exchange import circuit_breaker
+from app.exchange.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class FakeTime:
+    """Подменяет модуль time размыкателя: время двигает тест"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeTime:
+    fake = FakeTime()
+    monkeypatch.setattr(circuit_breaker, "time", fake)
+    return fake
+
+
+def make_breaker(**overrides) -> CircuitBreaker:
+    options = dict(
+        failure_rate=0.5, min_calls=4, window=10.0, slow_call=2.0,
+        open_seconds=30.0, half_open_probes=2,
+    )
+    options.update(overrides)
+    return CircuitBreaker("bybit:trading", **options)
+
+
+def test_full_cycle_closed_open_half_open_closed(clock):
+    breaker = make_breaker()
+
+    # отказов много, но вызовов в окне меньше min_calls — цепь замкнута
+    for _ in range(3):
+        assert breaker.allow() is False
+        breaker.record(failed=True, latency=0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record(failed=False, latency=0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.is_open
+
+    clock.now += 29.0
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    assert breaker.rejected_total == 1
+
+    # open_seconds прошли — пробные вызовы, не больше half_open_probes
+    clock.now += 1.0
+    assert not breaker.is_open
+    assert breaker.allow() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    breaker.record(failed=False, latency=0.1, probe=True)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record(failed=False, latency=0.1, probe=True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()["window_calls"] == 0
+    assert breaker.opened_total == 1
+
+
+def test_failed_probe_reopens(clock):
+    breaker = make_breaker(min_calls=1, half_open_probes=1)
+    breaker.record(failed=True, latency=0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now += 30.0
+    assert breaker.allow() is True
+    breaker.record(failed=True, latency=0.1, probe=True)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened_total == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = make_breaker(min_calls=2)
+    breaker.record(failed=False, latency=0.1)
+    breaker.record(failed=False, latency=2.5)    # дольше slow_call
+
+    assert breaker.failures_total == 1
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_old_failures_leave_the_window(clock):
+    # без окна отказ 1 из 3 (0.33) разомкнул бы цепь
+    breaker = make_breaker(min_calls=2, failure_rate=0.3)
+    breaker.record(failed=True, latency=0.1)
+
+    clock.now += 11.0
+    breaker.record(failed=False, latency=0.1)
+    breaker.record(failed=False, latency=0.1)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()["failure_rate"] == 0.0
@@ -0,0 +1,36 @@
+import fcntl
+import os
+from datetime import datetime, timezone
+
+from app.utils.coordination import WorkerCoordinator, signal_key
+
+
+def test_worker_liveness_follows_its_lock(tmp_path):
+    coordinator = WorkerCoordinator(str(tmp_path), dedupe_ttl=0)
+    path = os.path.join(str(tmp_path), "workers", "123-abc.lock")
+
+    assert not coordinator.is_alive("123-abc")
+    assert not coordinator.is_alive(None)
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    assert coordinator.is_alive("123-abc")
+
+    os.close(fd)        # воркер умер — ядро сняло flock
+    assert not coordinator.is_alive("123-abc")
+    assert not os.path.exists(path)
+
+
+def test_signal_key_is_shared_by_both_entry_points(tmp_path):
+    coordinator = WorkerCoordinator(str(tmp_path), dedupe_ttl=60)
+    fired_at = datetime(2026, 1, 5, 12, 0, tzinfo=timezone.utc)
+
+    # вебхук и /signal строят ключ одинаково
+    assert signal_key("Bybit", "LTCUSDT", "long", 76.47) == signal_key("bybit", "LTCUSDT", "LONG", 76.47)
+
+    assert coordinator.claim_signal(signal_key("bybit", "LTCUSDT", "LONG", 76.47, fired_at))
+    assert not coordinator.claim_signal(signal_key("bybit", "LTCUSDT", "LONG", 76.47, fired_at))
+    # новое срабатывание того же алерта — не повтор
+    assert coordinator.claim_signal(
+        signal_key("bybit", "LTCUSDT", "LONG", 76.47, fired_at.replace(minute=5))
+    )
@@ -0,0 +1,65 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.utils.deadline import Deadline, DeadlineExceeded, active_deadline, signal_age, use_deadline
+
+
+def test_alert_age_is_taken_from_the_budget():
+    fresh = Deadline.for_signal(budget=30.0)
+    aged = Deadline.for_signal(datetime.now(timezone.utc) - timedelta(seconds=20), budget=30.0)
+
+    assert 29.0 < fresh.remaining <= 30.0
+    assert 9.0 < aged.remaining <= 10.0
+    assert Deadline.for_signal(budget=0) is None
+
+    # алерт старше бюджета отклоняется на приёме
+    stale = Deadline.for_signal(datetime.now(timezone.utc) - timedelta(seconds=31), budget=30.0)
+    with pytest.raises(DeadlineExceeded) as error:
+        stale.check("приём")
+    assert error.value.stage == "приём"
+    assert error.value.overdue >= 1.0
+
+
+def test_naive_and_future_alert_times():
+    naive_utc = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=5)
+    assert 4.0 < signal_age(naive_utc) < 6.0
+    # часы TradingView спешат — возраст нулевой
+    assert signal_age(datetime.now(timezone.utc) + timedelta(seconds=5)) == 0.0
+
+
+def test_wait_for_is_bounded_by_the_remaining_budget():
+    async def scenario():
+        deadline = Deadline.for_signal(budget=0.05)
+        with pytest.raises(DeadlineExceeded):
+            await deadline.wait_for(asyncio.sleep(1.0), "тикер")
+
+        # после disarm ожидание без ограничения
+        deadline.disarm()
+        assert deadline.remaining == float("inf")
+        deadline.check("защита")
+        assert await deadline.wait_for(asyncio.sleep(0.06, result="ok"), "защита") == "ok"
+
+    asyncio.run(scenario())
+
+
+def test_active_deadline_belongs_to_the_owner_task():
+    async def scenario():
+        deadline = Deadline.for_signal(budget=10.0)
+        with use_deadline(deadline):
+            assert active_deadline() is deadline
+            # фоновая задача наследует контекст, но не дедлайн сделки
+            assert await asyncio.create_task(_active()) is None
+        assert active_deadline() is None
+
+        deadline = Deadline.for_signal(budget=10.0)
+        with use_deadline(deadline):
+            deadline.disarm()
+            assert active_deadline() is None
+
+    asyncio.run(scenario())
+
+
+async def _active():
+    return active_deadline()
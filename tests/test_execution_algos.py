@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from app.exchange.execution_algos import ExecutionAlgo, ParentOrder, TwapAlgo
+from app.exchange.quantizer import MarketQuantizer
+
+
+class NoPriceClient:
+    """Биржа подтверждает market ордер без цены и без статуса"""
+
+    exchange_name = "bybit"
+
+    def __init__(self):
+        self.sent: list[float] = []
+
+    def get_quantizer(self, symbol: str) -> MarketQuantizer:
+        return MarketQuantizer(symbol, amount_step=0.001, price_step=0.1, min_amount=0.001)
+
+    async def create_market_order(self, symbol, side, amount, params=None):
+        self.sent.append(amount)
+        return {"id": f"child-{len(self.sent)}", "filled": amount}
+
+    async def fetch_order(self, order_id, symbol):
+        raise ConnectionError("status unavailable")
+
+
+def test_unpriced_fills_still_reduce_the_remaining_amount():
+    client = NoPriceClient()
+    parent = ParentOrder("bybit", "BTC/USDT:USDT", "buy", amount=0.3, algo="twap")
+    algo = TwapAlgo(client, parent, on_fill=None, slices=3, duration=0.0)
+
+    asyncio.run(algo.run())
+
+    assert sum(client.sent) == pytest.approx(0.3)
+    assert parent.filled == pytest.approx(0.3)
+    assert parent.remaining == 0.0
+    assert parent.average_price is None
+
+
+def test_average_price_ignores_unpriced_fills():
+    parent = ParentOrder("bybit", "BTC/USDT:USDT", "buy", amount=3.0, algo="twap")
+    parent.add_fill({"id": "1"}, 1.0, 100.0)
+    parent.add_fill({"id": "2"}, 1.0, None)
+    parent.add_fill({"id": "3"}, 1.0, 110.0)
+
+    assert parent.filled == 3.0
+    assert parent.average_price == pytest.approx(105.0)
+
+
+def test_execution_algo_is_abstract():
+    with pytest.raises(TypeError):
+        ExecutionAlgo(NoPriceClient(), ParentOrder("bybit", "X", "buy", 1.0, "base"), None)
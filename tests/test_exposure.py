@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from app.risk.exposure import ExposureLedger
+from app.utils.coordination import WorkerCoordinator
+
+
+def make_ledger(coordinator: WorkerCoordinator) -> ExposureLedger:
+    return ExposureLedger(
+        max_total=1000.0, max_exchange=0.0, max_symbol=600.0,
+        reconcile_interval=30.0, coordinator=coordinator,
+    )
+
+
+def test_limits_are_shared_between_workers(tmp_path):
+    async def scenario():
+        first = WorkerCoordinator(str(tmp_path), dedupe_ttl=0)
+        second = WorkerCoordinator(str(tmp_path), dedupe_ttl=0)
+        await first.start()
+        await second.start()
+        try:
+            ledger_a, ledger_b = make_ledger(first), make_ledger(second)
+
+            reservation = ledger_a.reserve("bybit", "BTC/USDT:USDT", 500.0)
+            # резерв другого воркера уже занимает лимит символа
+            assert ledger_b.reserve("bybit", "BTC/USDT:USDT", 500.0).notional == pytest.approx(100.0)
+
+            # подтверждённый, но ещё не сверенный вход тоже учитывается
+            ledger_a.confirm(reservation)
+            with pytest.raises(ValueError):
+                ledger_b.reserve("bybit", "BTC/USDT:USDT", 50.0)
+            assert ledger_b.snapshot()["total"] == pytest.approx(600.0)
+
+            # воркер упал — его записи больше не держат лимит
+            await first.stop()
+            assert ledger_b.reserve("bybit", "ETH/USDT:USDT", 550.0).notional == pytest.approx(550.0)
+        finally:
+            await first.stop()
+            await second.stop()
+
+    asyncio.run(scenario())
+
+
+def test_resize_growth_is_checked_against_limits():
+    ledger = ExposureLedger(
+        max_total=1000.0, max_exchange=0.0, max_symbol=600.0,
+        reconcile_interval=30.0,
+    )
+    reservation = ledger.reserve("okx", "BTC/USDT:USDT", 500.0)
+
+    # limit вход выше рынка: прирост в пределах лимита
+    ledger.resize(reservation, 580.0)
+    assert reservation.notional == pytest.approx(580.0)
+
+    # до отправки ордера прирост сверх лимита отклоняет сделку
+    with pytest.raises(ValueError):
+        ledger.resize(reservation, 650.0)
+    assert reservation.notional == pytest.approx(580.0)
+
+    # после исполнения позиция уже на бирже — учитывается как есть
+    ledger.resize(reservation, 650.0, enforce=False)
+    ledger.confirm(reservation)
+    assert ledger.snapshot()["total"] == pytest.approx(650.0)
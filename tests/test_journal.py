@@ -0,0 +1,28 @@
+import asyncio
+import os
+
+from app.journal import TradeJournal, TradeState
+
+
+def test_commit_is_durable_and_keeps_nulls(tmp_path):
+    async def scenario():
+        journal = TradeJournal(os.path.join(str(tmp_path), "journal.db"))
+        journal.start()
+        try:
+            journal.record("t1", TradeState.RECEIVED, request={"symbol": "BTCUSDT"}, owner="w1")
+            await journal.commit("t1", TradeState.SIZED, amount=0.5, entry_price=None)
+
+            # commit() вернулся — запись уже в базе, без close()
+            trades = journal.load_unfinished()
+        finally:
+            journal.close()
+        return trades
+
+    trades = asyncio.run(scenario())
+    assert len(trades) == 1
+    trade = trades[0]
+    assert trade["state"] == TradeState.SIZED
+    assert trade["owner"] == "w1"
+    assert trade["amount"] == 0.5
+    # null сохраняется как значение, а не удаляет ключ
+    assert "entry_price" in trade and trade["entry_price"] is None
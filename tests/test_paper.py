@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from app.config.settings import settings
+from app.exchange.paper import PaperExchangeClient, PaperPosition
+
+SYMBOL = "BTC/USDT:USDT"
+
+
+@pytest.fixture
+def paper(monkeypatch) -> PaperExchangeClient:
+    monkeypatch.setattr(settings, "paper_balance", 10_000.0)
+    monkeypatch.setattr(settings, "paper_fee_maker", 0.0)
+    monkeypatch.setattr(settings, "paper_fee_taker", 0.0)
+    monkeypatch.setattr(settings, "paper_slippage_bps", 0.0)
+    monkeypatch.setattr(settings, "paper_price_file", "")
+    client = PaperExchangeClient("bybit")
+    client.on_price(SYMBOL, 99.0, 101.0, 100.0)
+    return client
+
+
+def status(client: PaperExchangeClient, order: dict) -> str:
+    return asyncio.run(client.fetch_order(order["id"], SYMBOL))["status"]
+
+
+def contracts(client: PaperExchangeClient) -> float:
+    return client._positions[SYMBOL].contracts
+
+
+def test_position_flip_and_close_pnl():
+    position = PaperPosition(SYMBOL, leverage=10)
+    assert position.apply(2.0, 100.0) == 0.0
+
+    # продажа 3 при long 2: закрыто 2 с прибылью, остаток — short 1 по цене сделки
+    assert position.apply(-3.0, 110.0) == pytest.approx(20.0)
+    assert position.contracts == pytest.approx(-1.0)
+    assert position.entry_price == pytest.approx(110.0)
+
+    assert position.apply(1.0, 100.0) == pytest.approx(10.0)
+    assert position.contracts == 0.0
+    assert position.realized_pnl == pytest.approx(30.0)
+
+
+def test_limit_orders_fill_when_the_opposite_side_reaches_them(paper):
+    buy = asyncio.run(paper.create_limit_order(SYMBOL, "buy", 1.0, 95.0))
+    sell = asyncio.run(paper.create_limit_order(SYMBOL, "sell", 1.0, 105.0, {"reduceOnly": True}))
+
+    # last ниже лимита не исполняет buy: нужен ask
+    paper.on_price(SYMBOL, 94.0, 96.0, 94.5)
+    assert status(paper, buy) == "open"
+
+    paper.on_price(SYMBOL, 94.0, 95.0, 94.5)
+    assert status(paper, buy) == "closed"
+    assert contracts(paper) == 1.0
+    assert paper._positions[SYMBOL].entry_price == 95.0
+
+    # sell-лимит — по bid, исполняется по своей цене
+    paper.on_price(SYMBOL, 104.0, 106.0, 105.5)
+    assert status(paper, sell) == "open"
+    paper.on_price(SYMBOL, 105.0, 106.0, 105.5)
+    assert status(paper, sell) == "closed"
+    assert contracts(paper) == 0.0
+    assert paper.wallet == pytest.approx(10_010.0)
+
+
+def test_stop_triggers_on_last_against_the_position(paper):
+    asyncio.run(paper.create_market_order(SYMBOL, "buy", 2.0))
+    assert paper._positions[SYMBOL].entry_price == 101.0     # по ask
+
+    stop = asyncio.run(paper.create_stop_loss_order(SYMBOL, "sell", 2.0, 95.0))
+
+    # рост цены sell-стоп не трогает, bid ниже стопа при last выше — тоже
+    paper.on_price(SYMBOL, 119.0, 121.0, 120.0)
+    paper.on_price(SYMBOL, 94.0, 97.0, 96.0)
+    assert status(paper, stop) == "open"
+
+    paper.on_price(SYMBOL, 94.0, 96.0, 95.0)
+    assert status(paper, stop) == "closed"
+    assert contracts(paper) == 0.0
+    # исполнение по рынку (bid), а не по цене стопа
+    assert paper.wallet == pytest.approx(10_000.0 + (94.0 - 101.0) * 2)
+
+
+def test_position_take_profit_triggers_in_the_profit_direction(paper):
+    asyncio.run(paper.create_market_order(SYMBOL, "sell", 1.0))       # short по bid 99
+    asyncio.run(paper.set_position_tp_sl(SYMBOL, stop_loss=110.0, take_profit=90.0))
+    stop_loss = paper._position_orders[SYMBOL]["sl"]
+    take_profit = paper._position_orders[SYMBOL]["tp"]
+
+    # добор после установки: позиционный TP закрывает весь объём
+    asyncio.run(paper.create_market_order(SYMBOL, "sell", 1.0))
+    assert contracts(paper) == -2.0
+
+    paper.on_price(SYMBOL, 104.0, 106.0, 105.0)
+    assert take_profit.status == stop_loss.status == "open"
+
+    paper.on_price(SYMBOL, 89.0, 90.0, 90.0)
+    assert take_profit.status == "closed"
+    assert take_profit.filled == 2.0
+    assert contracts(paper) == 0.0
+    # второй ордер защиты снят вместе с позицией
+    assert stop_loss.status == "canceled"
+    assert paper.wallet == pytest.approx(10_000.0 + (99.0 - 90.0) * 2)
+
+
+def test_reduce_only_is_capped_by_the_position(paper):
+    # без позиции reduce-only ничего не исполняет
+    empty = asyncio.run(paper.create_market_order(SYMBOL, "sell", 1.0, {"reduceOnly": True}))
+    assert empty["status"] == "canceled"
+
+    asyncio.run(paper.create_market_order(SYMBOL, "buy", 1.0))
+    closing = asyncio.run(paper.create_market_order(SYMBOL, "sell", 3.0, {"reduceOnly": True}))
+
+    assert closing["filled"] == 1.0
+    assert contracts(paper) == 0.0     # не развернулся в short
+
+
+def test_fees_and_margin_in_balance(paper, monkeypatch):
+    monkeypatch.setattr(settings, "paper_fee_taker", 0.001)
+    asyncio.run(paper.set_leverage(SYMBOL, 10))
+    asyncio.run(paper.create_market_order(SYMBOL, "buy", 10.0))
+
+    balance = asyncio.run(paper.get_balance())["USDT"]
+    fee = 10.0 * 101.0 * 0.001
+    assert paper.wallet == pytest.approx(10_000.0 - fee)
+    assert balance["used"] == pytest.approx(10.0 * 101.0 / 10)
+    # нереализованный PnL по last 100 входит в total
+    assert balance["total"] == pytest.approx(10_000.0 - fee - 10.0)
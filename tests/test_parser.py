@@ -0,0 +1,31 @@
+import pytest
+
+from app.parser.tradingview import TradingViewParser
+from app.webhook.decoder import decode_webhook_body
+
+
+@pytest.mark.parametrize(
+    ("message", "exchange"),
+    [
+        ("BINANCE:LTCUSDT Crossing Up 76.47", "binance"),
+        ("BINANCE:LTCUSDT Crossing Up 76.47 Bybit", "bybit"),
+        ("okx:ETHUSDT.P Crossing Down 3120.5 size=100", "okx"),
+    ],
+)
+def test_exchange_prefix(message, exchange):
+    signal = TradingViewParser.parse_alert(message)
+    assert signal.exchange == exchange
+    assert ":" not in signal.symbol
+
+
+def test_unknown_prefix_is_ignored():
+    signal = TradingViewParser.parse_alert("COINBASE:BTCUSD Crossing Up 1")
+    assert signal.symbol == "BTCUSD"
+    assert signal.exchange is None
+
+
+def test_exchange_left_for_routing():
+    # без биржи в алерте её выбирает маршрутизация, а не EXCHANGE из .env
+    assert TradingViewParser.parse_alert("LTCUSDT Crossing Up 76.47").exchange is None
+    signals = decode_webhook_body(b'{"symbol": "LTCUSDT", "direction": "LONG", "price": 76.47}')
+    assert signals[0].exchange is None
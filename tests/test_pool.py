@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from app.exchange.factory import ExchangeFactory
+from app.exchange.pool import ExchangePool
+
+
+class FailingClient:
+    def __init__(self):
+        self.closed = False
+
+    async def load_markets(self):
+        raise ConnectionError("markets unavailable")
+
+    async def close(self):
+        self.closed = True
+
+
+def test_client_is_closed_when_markets_fail(monkeypatch):
+    created = []
+
+    def create_client(exchange_name):
+        created.append(FailingClient())
+        return created[-1]
+
+    monkeypatch.setattr(ExchangeFactory, "create_client", staticmethod(create_client))
+    pool = ExchangePool()
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            asyncio.run(pool.get("bybit"))
+
+    assert len(created) == 2
+    assert all(client.closed for client in created)
+    assert not pool.clients
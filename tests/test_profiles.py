@@ -0,0 +1,75 @@
+import pytest
+from pydantic import ValidationError
+
+from app.config.profiles import ProfilesFile, TradingProfiles, compile_profiles
+from app.config.settings import settings
+
+PROFILES_YAML = """
+defaults:
+  leverage: 5
+  size_position: 50
+strategies:
+  scalp:
+    order_type: limit
+    leverage: 10
+  swing:
+    risk_mode: percent_equity
+symbols:
+  BTCUSDT:
+    strategy: swing
+    size_position: 200
+  bybit:BTCUSDT.P:
+    leverage: 3
+"""
+
+
+@pytest.fixture
+def profiles(tmp_path) -> TradingProfiles:
+    path = tmp_path / "profiles.yaml"
+    path.write_text(PROFILES_YAML, encoding="utf-8")
+    store = TradingProfiles(str(path), reload_interval=0)
+    store.load()
+    return store
+
+
+def test_layers_apply_in_order(profiles):
+    # символ наследует свою стратегию, она — defaults
+    btc = profiles.resolve("okx", "BTCUSDT")
+    assert btc.name == "BTCUSDT"
+    assert (btc.risk_mode, btc.size_position, btc.leverage) == ("percent_equity", 200, 5)
+
+    # символ на бирже — поверх общей записи символа
+    bybit_btc = profiles.resolve("bybit", "btcusdt")
+    assert bybit_btc.name == "bybit:BTCUSDT"
+    assert (bybit_btc.risk_mode, bybit_btc.size_position, bybit_btc.leverage) == ("percent_equity", 200, 3)
+
+    # без записи символа — стратегия или defaults поверх Settings
+    sol = profiles.resolve("okx", "SOLUSDT", "scalp")
+    assert (sol.name, sol.order_type, sol.leverage, sol.size_position) == ("scalp", "limit", 10, 50)
+    default = profiles.resolve(None, "SOLUSDT")
+    assert (default.leverage, default.atr_period) == (5, settings.atr_period)
+
+
+def test_signal_strategy_replaces_the_symbol_strategy(profiles):
+    profile = profiles.resolve("bybit", "BTCUSDT", "scalp")
+
+    assert profile.name == "scalp/bybit:BTCUSDT"
+    assert profile.order_type == "limit"
+    # риск-режим swing из записи символа не наследуется
+    assert profile.risk_mode == settings.risk_mode
+    # поля символа — поверх стратегии сигнала
+    assert (profile.leverage, profile.size_position) == (3, 200)
+
+    # неизвестная стратегия сигнала — профиль без неё
+    assert profiles.resolve("bybit", "BTCUSDT", "unknown") is profiles.resolve("bybit", "BTCUSDT")
+
+
+@pytest.mark.parametrize("document, error", [
+    ({"symbols": {"BTCUSDT": {"strategy": "missing"}}}, ValueError),
+    ({"symbols": {"kraken:BTCUSDT": {"leverage": 2}}}, ValueError),
+    ({"defaults": {"leverage": 0}}, ValidationError),
+    ({"defaults": {"levrage": 2}}, ValidationError),
+])
+def test_invalid_files_are_rejected(document, error):
+    with pytest.raises(error):
+        compile_profiles(ProfilesFile.model_validate(document))
@@ -0,0 +1,109 @@
+import pytest
+
+from app.exchange.loader import import_ccxt
+from app.exchange.quantizer import DECIMAL_PLACES, MarketQuantizer
+
+TICK_SIZE = import_ccxt("ccxt.base.decimal_to_precision").TICK_SIZE
+
+
+def bybit_market() -> dict:
+    """BTC/USDT:USDT Bybit: шаги в TICK_SIZE, лимиты market-ордера только в info"""
+    return {
+        "symbol": "BTC/USDT:USDT",
+        "contractSize": 1.0,
+        "precision": {"amount": 0.001, "price": 0.1},
+        "limits": {
+            "amount": {"min": 0.001, "max": 1190.0},
+            "market": {"min": None, "max": None},
+            "cost": {"min": None, "max": None},
+        },
+        "info": {"lotSizeFilter": {"maxMktOrderQty": "119", "minNotionalValue": "5"}},
+    }
+
+
+def okx_market() -> dict:
+    """DOGE/USDT:USDT OKX: шаги в DECIMAL_PLACES, контракт = 1000 DOGE"""
+    return {
+        "symbol": "DOGE/USDT:USDT",
+        "contractSize": 1000.0,
+        "precision": {"amount": 2, "price": 5},
+        "limits": {
+            "amount": {"min": 0.01, "max": 10000.0},
+            "cost": {"min": 10.0, "max": None},
+        },
+        "info": {},
+    }
+
+
+@pytest.fixture
+def bybit() -> MarketQuantizer:
+    return MarketQuantizer.from_market(bybit_market(), TICK_SIZE)
+
+
+@pytest.fixture
+def okx() -> MarketQuantizer:
+    return MarketQuantizer.from_market(okx_market(), DECIMAL_PLACES)
+
+
+def test_steps_from_both_precision_modes(bybit, okx):
+    assert (bybit.amount_step, bybit.price_step) == (0.001, 0.1)
+    assert bybit.max_market_amount == 119.0
+    assert bybit.min_cost == 5.0
+    assert bybit.contract_size == 1.0
+
+    assert okx.amount_step == pytest.approx(0.01)
+    assert okx.price_step == pytest.approx(0.00001)
+    assert okx.max_market_amount == 10000.0
+    assert okx.contract_size == 1000.0
+
+
+def test_amount_floors_to_lot_step_without_float_error(bybit, okx):
+    # 0.29 / 0.01 = 28.999999999999996 — без EPS ушло бы в 0.28
+    assert okx.amount(0.29) == 0.29
+    assert okx.amount(0.2999) == 0.29
+    assert bybit.amount(1.2349) == 1.234
+    assert bybit.amount(0.0009) == 0.0
+
+
+def test_price_rounds_to_nearest_tick(bybit, okx):
+    assert bybit.price(43210.06) == 43210.1
+    assert bybit.price(43210.04) == 43210.0
+    assert okx.price(0.123456) == 0.12346
+    assert okx.price(0.123454) == 0.12345
+
+
+def test_market_orders_use_bybit_market_qty_limit(bybit):
+    order = dict(price=40000.0, stop_loss=39000.0, take_profit=42000.0, side="buy")
+
+    with pytest.raises(ValueError, match="больше максимального 119"):
+        bybit.quantize(120.0, order_type="market", **order)
+
+    # limit-ордер ограничен только общим максимумом лота
+    assert bybit.quantize(120.0, order_type="limit", entry_price=40000.0, **order).amount == 120.0
+    assert bybit.quantize(119.0, order_type="market", **order).amount == 119.0
+
+
+def test_min_cost_counts_contract_size(bybit, okx):
+    with pytest.raises(ValueError, match="номинал"):
+        bybit.quantize(0.001, 4000.0, 3900.0, 4200.0, "buy", "market")
+
+    # 0.01 контракта × 1000 DOGE × 0.1 = 1 USDT < 10
+    with pytest.raises(ValueError, match="номинал"):
+        okx.quantize(0.01, 0.1, 0.09, 0.12, "buy", "market")
+
+    quantized = okx.quantize(0.5, 0.1, 0.09, 0.12, "buy", "market")
+    assert quantized.notional == pytest.approx(50.0)
+    assert okx.notional(0.5, 0.1) == quantized.notional
+
+
+def test_stop_and_take_must_stay_on_their_side(bybit):
+    # сторона sell: TP ниже цены, SL выше
+    quantized = bybit.quantize(0.01, 40000.0, 41000.04, 38000.06, "sell", "market")
+    assert (quantized.stop_loss, quantized.take_profit) == (41000.0, 38000.1)
+
+    with pytest.raises(ValueError, match="схлопнулись"):
+        bybit.quantize(0.01, 40000.0, 41000.0, 38000.0, "buy", "market")
+
+    # SL в пределах полутика от цены после округления совпадает с ней
+    with pytest.raises(ValueError, match="схлопнулись"):
+        bybit.quantize(0.01, 40000.0, 39999.96, 42000.0, "buy", "market")
@@ -0,0 +1,64 @@
+import asyncio
+
+from app.exchange.pool import exchange_pool
+from app.exchange.reconciler import PositionReconciler
+
+
+class FakeClient:
+    exchange_name = "bybit"
+
+    def __init__(self, open_orders: list[dict]):
+        self.open_orders = open_orders
+        self.positions: list[dict] = []
+        self.cancelled: list[str] = []
+
+    async def fetch_positions(self):
+        return self.positions
+
+    async def fetch_open_orders(self, params=None):
+        return self.open_orders
+
+    async def cancel_order(self, order_id, symbol, params=None):
+        self.cancelled.append(order_id)
+
+
+def _reconcile(reconciler: PositionReconciler, client: FakeClient, monkeypatch) -> None:
+    async def get(exchange_name):
+        return client
+
+    monkeypatch.setattr(exchange_pool, "get", get)
+    asyncio.run(reconciler.reconcile("bybit"))
+
+
+def _expect(reconciler: PositionReconciler) -> None:
+    reconciler.expect(
+        "bybit", "BTC/USDT:USDT", "buy", 49000.0, 52000.0,
+        {"id": "sl-1"}, {"id": "tp-1"}, entry_order_id="entry-1",
+    )
+    reconciler._expected[("bybit", "BTC/USDT:USDT", "buy")].registered_at = 0.0
+
+
+def _orders(*ids: str) -> list[dict]:
+    return [{"id": order_id, "symbol": "BTC/USDT:USDT"} for order_id in ids]
+
+
+def test_resting_limit_entry_keeps_protection(monkeypatch):
+    reconciler = PositionReconciler(interval=0)
+    _expect(reconciler)
+    client = FakeClient(_orders("entry-1", "sl-1", "tp-1"))
+
+    _reconcile(reconciler, client, monkeypatch)
+
+    assert client.cancelled == []
+    assert len(reconciler.snapshot()) == 1
+
+
+def test_cancelled_entry_without_position_is_forgotten(monkeypatch):
+    reconciler = PositionReconciler(interval=0)
+    _expect(reconciler)
+    client = FakeClient(_orders("sl-1", "tp-1"))
+
+    _reconcile(reconciler, client, monkeypatch)
+
+    assert sorted(client.cancelled) == ["sl-1", "tp-1"]
+    assert reconciler.snapshot() == []
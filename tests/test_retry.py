@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.config.settings import settings
+from app.exchange.circuit_breaker import MARKET_DATA
+from app.exchange.retry import ccxt_errors, with_retry
+from app.utils.deadline import Deadline, use_deadline
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "retry_base_delay", 0.001)
+    monkeypatch.setattr(settings, "retry_max_delay", 0.001)
+
+
+def _flaky(error: Exception, failures: int):
+    calls = []
+
+    async def attempt():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error
+        return "ok"
+
+    return attempt, calls
+
+
+def test_retry_under_active_deadline():
+    attempt, calls = _flaky(ccxt_errors.RequestTimeout("timeout"), failures=1)
+
+    async def run():
+        with use_deadline(Deadline.for_signal(budget=30)):
+            return await with_retry("test-deadline", MARKET_DATA, "fetch_ticker", attempt)
+
+    assert asyncio.run(run()) == "ok"
+    assert len(calls) == 2
+
+
+def test_no_retry_when_deadline_is_shorter_than_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "retry_base_delay", 1.0)
+    monkeypatch.setattr(settings, "retry_max_delay", 1.0)
+    monkeypatch.setattr("app.exchange.retry.random.uniform", lambda low, high: high)
+    attempt, calls = _flaky(ccxt_errors.RequestTimeout("timeout"), failures=1)
+
+    async def run():
+        with use_deadline(Deadline.for_signal(budget=0.5)):
+            return await with_retry("test-short", MARKET_DATA, "fetch_ticker", attempt)
+
+    with pytest.raises(ccxt_errors.RequestTimeout):
+        asyncio.run(run())
+    assert len(calls) == 1